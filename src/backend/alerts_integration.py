@@ -11,6 +11,8 @@ from enum import Enum
 import requests
 import aiohttp
 
+from anomaly_rules import anomaly_rules
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -41,9 +43,16 @@ class AlertsManager:
         self.slack_webhook_url = None  # Set from environment
         self.teams_webhook_url = None  # Set from environment
         self.alerts_history = []
-        self.alert_rules = self._initialize_alert_rules()
+        self._alert_rules = None
         logger.info("✅ Alerts Manager initialized")
     
+    @property
+    def alert_rules(self) -> Dict[str, Any]:
+        """Alert rules, built on first use so a custom anomaly rule file is only consulted once loaded"""
+        if self._alert_rules is None:
+            self._alert_rules = self._initialize_alert_rules()
+        return self._alert_rules
+    
     def _initialize_alert_rules(self) -> Dict[str, Any]:
         """Define alert rules and thresholds"""
         return {
@@ -51,7 +60,7 @@ class AlertsManager:
                 "enabled": True,
                 "priority": AlertPriority.CRITICAL,
                 "channels": [AlertChannel.SLACK, AlertChannel.TEAMS],
-                "threshold": {"margin": 0},
+                "threshold": {"margin": anomaly_rules.threshold("low_margin", "margin")},
                 "message_template": "🚨 CRITICAL: Client {client_name} is operating at ${margin}/month loss"
             },
             "high_churn_risk": {
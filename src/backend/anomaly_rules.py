@@ -0,0 +1,302 @@
+"""
+Anomaly Rule Engine
+Declarative anomaly rules compiled once into vectorized predicates over ClientFrame tables
+"""
+import logging
+import os
+import string
+import time
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from client_frame import ClientFrame
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Single source of truth for the anomaly thresholds used by the API, realtime feed and alerts
+DEFAULT_ANOMALY_RULES: List[Dict[str, Any]] = [
+    {
+        "id": "low_margin",
+        "table": "clients",
+        "when": {"margin": {"lt": 0}},
+        "severity": "high",
+        "description": "Client operating at {margin} monthly loss",
+        "impact": "${annual_loss} annual loss",
+        "recommendation": "Renegotiate contract or terminate relationship"
+    },
+    {
+        "id": "high_support_load",
+        "table": "clients",
+        "when": {"tickets_last_month": {"gt": 30}},
+        "severity": "medium",
+        "description": "{tickets_last_month} tickets last month (above normal)",
+        "impact": "Increased support costs",
+        "recommendation": "Investigate root cause or adjust service level"
+    },
+    {
+        "id": "license_waste",
+        "table": "licenses",
+        "when": {"utilization": {"lt": 60}},
+        "severity": "medium",
+        "description": "{license_name}: {unused} unused licenses ({utilization:.1f}% utilization)",
+        "impact": "${monthly_waste}/month waste",
+        "recommendation": "Downgrade by {unused} licenses"
+    }
+]
+
+OPERATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "lt": np.less,
+    "le": np.less_equal,
+    "gt": np.greater,
+    "ge": np.greater_equal,
+    "eq": np.equal,
+    "ne": np.not_equal,
+    "between": lambda column, bounds: (column >= bounds[0]) & (column <= bounds[1]),
+    "in": lambda column, values: np.isin(column, list(values))
+}
+TEMPLATE_KEYS = ("description", "impact", "recommendation")
+
+
+class Amount(float):
+    """Float that renders whole dollar amounts without a trailing '.0' unless a format spec is given"""
+
+    def __format__(self, spec: str) -> str:
+        if spec:
+            return float.__format__(self, spec)
+        return str(int(self)) if self.is_integer() else float.__repr__(self)
+
+
+# Column providers per table; derived columns are only computed when a rule or template uses them
+TABLE_COLUMNS: Dict[str, Dict[str, Callable[[ClientFrame], np.ndarray]]] = {
+    "clients": {
+        "monthly_revenue": lambda f: f.monthly_revenue,
+        "monthly_cost": lambda f: f.monthly_cost,
+        "margin": lambda f: f.margin,
+        "contract_value": lambda f: f.contract_value,
+        "tickets_last_month": lambda f: f.tickets_last_month,
+        "security_incidents": lambda f: f.security_incidents,
+        "margin_percentage": lambda f: f.margin_percentage,
+        "annual_loss": lambda f: np.abs(f.margin) * 12
+    },
+    "licenses": {
+        "total": lambda f: f.license_total,
+        "used": lambda f: f.license_used,
+        "unused": lambda f: f.license_total - f.license_used,
+        "cost_per_license": lambda f: f.license_cost,
+        "utilization": lambda f: f.license_utilization,
+        "monthly_waste": lambda f: (f.license_total - f.license_used) * f.license_cost,
+        "license_type": lambda f: f.license_type_names[f.license_type_codes],
+        "license_name": lambda f: f.license_display_names
+    }
+}
+
+
+class _TableView:
+    """Lazily materialized columns of one table for a single evaluation"""
+
+    def __init__(self, frame: ClientFrame, table: str):
+        self.frame = frame
+        self.providers = TABLE_COLUMNS[table]
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = self.providers[name](self.frame)
+        return column
+
+
+class CompiledRule:
+    """A rule whose conditions are resolved to (column, operator, operand) predicates"""
+
+    def __init__(self, spec: Dict[str, Any], position: int):
+        self.id = spec["id"]
+        self.type = spec.get("type", self.id)
+        self.table = spec.get("table", "clients")
+        self.severity = spec.get("severity", "medium")
+        self.position = position
+        if self.table not in TABLE_COLUMNS:
+            raise ValueError(f"Rule '{self.id}': unknown table '{self.table}'")
+
+        columns = TABLE_COLUMNS[self.table]
+        self.conditions: List[Tuple[str, str, Any]] = []
+        for column, tests in spec.get("when", {}).items():
+            if column not in columns:
+                raise ValueError(f"Rule '{self.id}': unknown column '{column}' for table '{self.table}'")
+            for op, operand in tests.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Rule '{self.id}': unknown operator '{op}'")
+                self.conditions.append((column, op, tuple(operand) if isinstance(operand, list) else operand))
+        if not self.conditions:
+            raise ValueError(f"Rule '{self.id}' has no conditions")
+
+        self.templates = {key: spec.get(key, "") for key in TEMPLATE_KEYS}
+        self.template_fields = sorted({
+            field for template in self.templates.values()
+            for _, field, _, _ in string.Formatter().parse(template) if field
+        })
+        for field in self.template_fields:
+            if field not in columns:
+                raise ValueError(f"Rule '{self.id}': unknown template field '{field}'")
+
+    def threshold(self, column: str, op: Optional[str] = None) -> Any:
+        """Operand of the first condition on `column` (optionally restricted to one operator)"""
+        for cond_column, cond_op, operand in self.conditions:
+            if cond_column == column and (op is None or cond_op == op):
+                return operand
+        raise KeyError(f"Rule '{self.id}' has no condition on '{column}'")
+
+
+class RuleEvaluation:
+    """Row hits per rule for one frame, with timing"""
+
+    def __init__(self, frame: ClientFrame, hits: Dict[str, np.ndarray], rule_ms: Dict[str, float],
+                 elapsed_ms: float, views: Dict[str, _TableView]):
+        self.frame = frame
+        self.hits = hits
+        self.rule_ms = rule_ms
+        self.elapsed_ms = elapsed_ms
+        self.views = views
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self.hits),
+            "evaluation_ms": round(self.elapsed_ms, 3),
+            "per_rule": {
+                rule_id: {"hits": int(len(rows)), "eval_ms": round(self.rule_ms[rule_id], 3)}
+                for rule_id, rows in self.hits.items()
+            }
+        }
+
+
+class AnomalyRuleSet:
+    """
+    Compiled collection of anomaly rules
+    Identical predicates shared by several rules are evaluated once per frame
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = [CompiledRule(spec, position) for position, spec in enumerate(rules)]
+        ids = [rule.id for rule in self.rules]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Anomaly rule ids must be unique")
+        self._by_id = {rule.id: rule for rule in self.rules}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def get(self, rule_id: str) -> CompiledRule:
+        return self._by_id[rule_id]
+
+    def threshold(self, rule_id: str, column: str, op: Optional[str] = None) -> Any:
+        """
+        Threshold of one rule's condition on `column`
+        Custom rule files may leave out or reshape a built-in rule; the built-in threshold applies then.
+        """
+        rule = self._by_id.get(rule_id)
+        if rule is not None:
+            try:
+                return rule.threshold(column, op)
+            except KeyError:
+                pass
+        logger.warning(f"⚠️ No '{column}' condition on anomaly rule '{rule_id}', using the built-in threshold")
+        return DEFAULT_RULE_SET.get(rule_id).threshold(column, op)
+
+    def evaluate(self, frame: ClientFrame) -> RuleEvaluation:
+        """Evaluate every rule against the frame in one pass over the shared predicate cache"""
+        start = time.perf_counter()
+        views = {table: _TableView(frame, table) for table in TABLE_COLUMNS}
+        predicate_cache: Dict[Tuple[str, str, str, Any], np.ndarray] = {}
+        hits: Dict[str, np.ndarray] = {}
+        rule_ms: Dict[str, float] = {}
+
+        for rule in self.rules:
+            rule_start = time.perf_counter()
+            view = views[rule.table]
+            mask = None
+            for column, op, operand in rule.conditions:
+                key = (rule.table, column, op, operand)
+                predicate = predicate_cache.get(key)
+                if predicate is None:
+                    predicate = predicate_cache[key] = OPERATORS[op](view[column], operand)
+                mask = predicate if mask is None else mask & predicate
+            hits[rule.id] = np.flatnonzero(mask)
+            rule_ms[rule.id] = (time.perf_counter() - rule_start) * 1000
+
+        return RuleEvaluation(frame, hits, rule_ms, (time.perf_counter() - start) * 1000, views)
+
+    def materialize(self, evaluation: RuleEvaluation) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Render the hits as anomaly dicts grouped by client, then rule order, then row
+        Also returns a boolean mask marking the high-severity entries
+        """
+        frame = evaluation.frame
+        entries: List[Dict[str, Any]] = []
+        client_keys, high_severity = [], []
+
+        for rule in self.rules:
+            rows = evaluation.hits[rule.id]
+            if len(rows) == 0:
+                continue
+            view = evaluation.views[rule.table]
+            client_idx = rows if rule.table == "clients" else frame.license_client_idx[rows]
+            field_values = [view[field][rows].tolist() for field in rule.template_fields]
+
+            for i, (client_id, client_name) in enumerate(zip(
+                frame.ids[client_idx].tolist(), frame.names[client_idx].tolist()
+            )):
+                values = {
+                    field: Amount(column[i]) if isinstance(column[i], float) else column[i]
+                    for field, column in zip(rule.template_fields, field_values)
+                }
+                entries.append({
+                    "type": rule.type,
+                    "severity": rule.severity,
+                    "client_id": client_id,
+                    "client_name": client_name,
+                    "description": rule.templates["description"].format(**values),
+                    "impact": rule.templates["impact"].format(**values),
+                    "recommendation": rule.templates["recommendation"].format(**values)
+                })
+            client_keys.append(client_idx)
+            high_severity.append(np.full(len(rows), rule.severity == "high"))
+
+        if not entries:
+            return [], np.zeros(0, dtype=bool)
+        order = np.argsort(np.concatenate(client_keys), kind="stable")
+        return [entries[i] for i in order.tolist()], np.concatenate(high_severity)[order]
+
+    def detect(self, frame: ClientFrame) -> Dict[str, Any]:
+        """Evaluate and render in one call, shaped like the /anomalies/detect response"""
+        evaluation = self.evaluate(frame)
+        anomalies, _ = self.materialize(evaluation)
+        return {"anomalies": anomalies, "rule_stats": evaluation.stats()}
+
+
+def load_rules(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Load rule specs from a YAML/JSON file (ANOMALY_RULES_FILE), falling back to the defaults"""
+    path = path or os.getenv("ANOMALY_RULES_FILE")
+    if not path:
+        return DEFAULT_ANOMALY_RULES
+    if yaml is None:
+        logger.warning("⚠️ PyYAML not installed, ignoring ANOMALY_RULES_FILE")
+        return DEFAULT_ANOMALY_RULES
+    with open(path) as rules_file:
+        spec = yaml.safe_load(rules_file)
+    rules = spec.get("rules", []) if isinstance(spec, dict) else spec
+    logger.info(f"✅ Loaded {len(rules)} anomaly rules from {path}")
+    return rules
+
+
+# Built-in rules, the fallback for thresholds a custom rule file does not define
+DEFAULT_RULE_SET = AnomalyRuleSet(DEFAULT_ANOMALY_RULES)
+
+# Global compiled rule set
+anomaly_rules = AnomalyRuleSet(load_rules())
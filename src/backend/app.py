@@ -1,20 +1,30 @@
-from fastapi import HTTPException, BackgroundTasks
+from fastapi import HTTPException, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request , WebSocket, WebSocketDisconnect 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 import uvicorn
 import logging
 import boto3
 from botocore.exceptions import ClientError
 import os
-import json
 import random
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import asyncio
+import numpy as np
+
+from client_frame import ClientFrame
+from portfolio_aggregates import PortfolioAggregates
+import portfolio_analytics
+import digital_twin
+from response_cache import response_cache, etag_matches
+from compute_pool import compute_pool, scenario_batch_task
+from list_query import ListQuery, ListTable, paginate
+import fast_json
+from fast_json import FastJSONResponse, FastJSONRoute
 
 # Import AI CFO Agent modules with error handling
 try:
@@ -139,56 +149,106 @@ except ImportError:
         '_generate_portfolio_recommendations': lambda self, data: ["Implement automated monitoring"]
     })()
 
-# 🔧 FIX: Add missing mock services
-class MockSuperOpsAPI:
-    def __init__(self):
-        self.api_available = False
-        self.base_url = "mock://superops"
-        self.tenant_id = "mock_tenant"
-    
-    async def get_financial_dashboard_data(self):
-        return {"mock": True}
-    
-    async def get_all_clients(self):
-        return []
-
-superops_api = MockSuperOpsAPI()
+try:
+    from superops_integration import superops_api
+    from superops_sync import superops_sync
+    from superops_webhooks import superops_webhooks
+except ImportError:
+    # 🔧 FIX: Add missing mock services
+    class MockSuperOpsAPI:
+        def __init__(self):
+            self.api_available = False
+            self.base_url = "mock://superops"
+            self.tenant_id = "mock_tenant"
+        
+        async def get_financial_dashboard_data(self):
+            return {"mock": True}
+        
+        async def get_all_clients(self):
+            return []
+        
+        async def start(self):
+            pass
+        
+        async def close(self):
+            pass
+        
+        def connection_stats(self):
+            return {"session_open": False}
+        
+        def cache_stats(self):
+            return {"entries": 0}
+        
+        def dashboard_freshness(self):
+            return {"snapshot_age_seconds": None, "last_updated": None}
+        
+        def flow_control_stats(self):
+            return {"requests": 0}
+
+    superops_api = MockSuperOpsAPI()
+    superops_sync = type('MockSuperOpsSync', (), {
+        'start': lambda self: asyncio.sleep(0),
+        'stop': lambda self: asyncio.sleep(0),
+        'stats': lambda self: {"enabled": False}
+    })()
+    superops_webhooks = type('MockSuperOpsWebhooks', (), {
+        'publish': None,
+        'configured': False,
+        'start': lambda self: asyncio.sleep(0),
+        'stop': lambda self: asyncio.sleep(0),
+        'verify_signature': lambda self, body, signature: False,
+        'parse': lambda self, payload: [],
+        'submit': lambda self, events: 0,
+        'stats': lambda self: {"received": 0}
+    })()
 
-class MockConnectionManager:
-    def __init__(self):
-        self.active_connections = []
-    
-    async def connect(self, websocket):
-        pass
-    
-    def disconnect(self, websocket):
-        pass
-    
-    async def send_personal_message(self, message, websocket):
-        pass
-    
-    def update_subscription(self, websocket, subscriptions):
-        pass
-    
-    def get_connection_stats(self):
-        return {"active_connections": 0}
+try:
+    from realtime_updates import connection_manager, realtime_service
+except ImportError:
+    class MockConnectionManager:
+        def __init__(self):
+            self.active_connections = []
+        
+        async def connect(self, websocket):
+            pass
+        
+        def disconnect(self, websocket):
+            pass
+        
+        async def send_personal_message(self, message, websocket):
+            pass
+        
+        def update_subscription(self, websocket, subscriptions):
+            pass
+        
+        async def broadcast(self, message, subscription_type=None):
+            pass
+        
+        async def send_snapshot(self, websocket, topics=None):
+            pass
+        
+        async def refresh_topic(self, topic, changed=None, removed=None):
+            pass
+        
+        def get_connection_stats(self):
+            return {"active_connections": 0}
 
-connection_manager = MockConnectionManager()
+    connection_manager = MockConnectionManager()
 
-class MockRealtimeService:
-    async def start_service(self):
-        pass
-    
-    async def stop_service(self):
-        pass
-    
-    async def trigger_manual_update(self, update_type):
-        pass
-    
-    def get_service_stats(self):
-        return {"status": "mock"}
+    class MockRealtimeService:
+        async def start_service(self):
+            pass
+        
+        async def stop_service(self):
+            pass
+        
+        async def trigger_manual_update(self, update_type):
+            pass
+        
+        def get_service_stats(self):
+            return {"status": "mock"}
 
-realtime_service = MockRealtimeService()
+    realtime_service = MockRealtimeService()
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -196,8 +256,11 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="AI CFO Agent - Enhanced", 
     description="Autonomous CFO with Digital Twin, Multi-Agent AI, and Predictive Analytics for MSPs",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
+# Plain dict returns skip jsonable_encoder and go straight to the fast serializer
+app.router.route_class = FastJSONRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -206,6 +269,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Mount static files for React frontend (production)
@@ -258,11 +322,134 @@ MOCK_CLIENTS = {
     }
 }
 
+# Running totals over MOCK_CLIENTS; its version keys every derived cache below
+portfolio_aggregates = PortfolioAggregates(MOCK_CLIENTS)
+
+# Columnar view of MOCK_CLIENTS and the fused analysis computed from it, as (version, value)
+_client_frame: Optional[tuple] = None
+_portfolio_analysis: Optional[tuple] = None
+_list_tables: Optional[tuple] = None
+# List index over the cached SuperOps client snapshot, as (snapshot, table)
+_superops_list_table: Optional[tuple] = None
+
+def get_client_frame() -> ClientFrame:
+    """Return the ClientFrame for MOCK_CLIENTS, rebuilt once per data version"""
+    global _client_frame
+    version = portfolio_aggregates.version
+    if _client_frame is None or _client_frame[0] != version:
+        _client_frame = (version, ClientFrame.from_clients(MOCK_CLIENTS))
+    return _client_frame[1]
+
+def get_portfolio_analysis() -> Dict[str, Any]:
+    """Return every analytics section, computed in one pass per data version"""
+    global _portfolio_analysis
+    version = portfolio_aggregates.version
+    if _portfolio_analysis is None or _portfolio_analysis[0] != version:
+        _portfolio_analysis = (version, portfolio_analytics.analyze_portfolio(get_client_frame()))
+    return _portfolio_analysis[1]
+
+def get_list_tables() -> Dict[str, ListTable]:
+    """Sorted list indexes over clients and license optimization rows, rebuilt once per data version"""
+    global _list_tables
+    version = portfolio_aggregates.version
+    if _list_tables is None or _list_tables[0] != version:
+        frame = get_client_frame()
+        client_keys = np.array([portfolio_aggregates.position(client_id) for client_id in frame.ids.tolist()],
+                               dtype=np.int64)
+        # Same rows, in the same order, as the optimizations list of the licenses section
+        optimization_rows = np.flatnonzero(frame.license_total - frame.license_used > 0)
+        _list_tables = (version, {
+            "clients": ListTable.for_clients(frame, client_keys),
+            "licenses": ListTable.for_license_rows(frame, optimization_rows, client_keys)
+        })
+    return _list_tables[1]
+
+def get_superops_list_table(clients: List[Dict[str, Any]]) -> ListTable:
+    """
+    Sorted list index over a SuperOps client snapshot, rebuilt only when that snapshot changes
+    The read-through cache replaces its client list instead of mutating it (webhook patches included), so
+    the list's identity versions the index; paging follows upstream order.
+    """
+    global _superops_list_table
+    if _superops_list_table is None or _superops_list_table[0] is not clients:
+        frame = ClientFrame.from_records(clients)
+        _superops_list_table = (clients, ListTable.for_clients(frame, np.arange(len(frame), dtype=np.int64)))
+    return _superops_list_table[1]
+
+def list_query_params(limit: Optional[int] = None, cursor: Optional[str] = None,
+                      risk_level: Optional[str] = None, min_margin: Optional[float] = None,
+                      max_margin: Optional[float] = None, license_type: Optional[str] = None,
+                      fields: Optional[str] = None) -> ListQuery:
+    """Pagination (limit, cursor), filters and `fields=a,b` projection shared by the list endpoints"""
+    try:
+        return ListQuery(limit, cursor, risk_level, min_margin, max_margin, license_type, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def run_list_query(table: ListTable, query: ListQuery, key: str, render) -> Dict[str, Any]:
+    try:
+        return paginate(table, query, key, render)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Read-only analytics endpoints served from the ETag response cache; each must be derived only from the
+# client data that portfolio_aggregates.version tracks
+CACHED_GET_PATHS = {
+    "/profitability/clients",
+    "/licenses/optimization",
+    "/upsell/opportunities",
+    "/anomalies/detect"
+}
+
+def is_error_body(body: bytes) -> bool:
+    """Handlers in this file report failures as a 200 `{"error": ...}` body; those must not be cached"""
+    if b'"error"' not in body:
+        return False
+    try:
+        payload = fast_json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and "error" in payload
+
+@app.middleware("http")
+async def etag_cache_middleware(request: Request, call_next):
+    """Replay cached analytics bodies for the current data version and answer If-None-Match with 304"""
+    if request.method != "GET" or request.url.path not in CACHED_GET_PATHS:
+        return await call_next(request)
+    
+    key = (request.url.path, request.url.query, portfolio_aggregates.version)
+    entry = response_cache.get(key)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if is_error_body(body):
+            return Response(content=body, status_code=response.status_code, headers={"Cache-Control": "no-store"},
+                            media_type=response.headers.get("content-type", "application/json"))
+        entry = response_cache.put(key, body, response.headers.get("content-type", "application/json"))
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, headers=headers, media_type=entry.media_type)
+
 class ScenarioRequest(BaseModel):
     scenario_type: str
     client_id: str
     parameters: Dict[str, Any]
 
+class ClientSelector(BaseModel):
+    ids: Optional[List[str]] = None
+    risk_level: Optional[str] = None
+
+class BatchScenarioRequest(BaseModel):
+    scenario_type: str
+    grid: Dict[str, List[float]]
+    clients: ClientSelector = ClientSelector()
+    stream: bool = False
+
 @app.get("/")
 def read_root():
     # Serve React frontend in production
@@ -270,35 +457,15 @@ def read_root():
         return FileResponse("static/index.html")
     return {"message": "Welcome to AI CFO Agent - Autonomous CFO with Digital Twin for MSPs"}
 
-@app.get("/dashboard/overview")
-async def get_dashboard_overview():
-    """Get overall MSP financial overview with real-time data"""
+async def dashboard_overview_data() -> Dict[str, Any]:
+    """Overview payload shared by the dashboard and the weekly report"""
     try:
         # Try to get real data from SuperOps
         if superops_api.api_available:
-            dashboard_data = await superops_api.get_financial_dashboard_data()
-            return dashboard_data
+            return await superops_api.get_financial_dashboard_data()
         else:
             # Fallback to mock data
-            total_revenue = sum(client["monthly_revenue"] for client in MOCK_CLIENTS.values())
-            total_costs = sum(client["monthly_cost"] for client in MOCK_CLIENTS.values())
-            total_margin = total_revenue - total_costs
-            
-            unprofitable_clients = [
-                {"id": k, "name": v["name"], "margin": v["margin"]} 
-                for k, v in MOCK_CLIENTS.items() if v["margin"] < 0
-            ]
-            
-            return {
-                "total_monthly_revenue": total_revenue,
-                "total_monthly_costs": total_costs,
-                "total_margin": total_margin,
-                "margin_percentage": round((total_margin / total_revenue) * 100, 1),
-                "client_count": len(MOCK_CLIENTS),
-                "unprofitable_clients": unprofitable_clients,
-                "risk_alerts": len(unprofitable_clients),
-                "data_source": "mock"
-            }
+            return portfolio_aggregates.overview()
     except Exception as e:
         logger.error(f"Error getting dashboard overview: {e}")
         # Return basic mock data on error
@@ -313,182 +480,120 @@ async def get_dashboard_overview():
             "data_source": "error_fallback"
         }
 
+@app.get("/dashboard/overview")
+async def get_dashboard_overview():
+    """Get overall MSP financial overview with real-time data"""
+    dashboard_data = await dashboard_overview_data()
+    age = superops_api.dashboard_freshness()["snapshot_age_seconds"] if superops_api.api_available else None
+    headers = {"X-Snapshot-Age": str(age)} if age is not None else None
+    return FastJSONResponse(dashboard_data, headers=headers)
+
 @app.get("/profitability/clients")
-def get_client_profitability():
+def get_client_profitability(query: ListQuery = Depends(list_query_params)):
     """Get profitability analysis for all clients"""
-    clients = []
-    for client_id, data in MOCK_CLIENTS.items():
-        risk_level = "high" if data["margin"] < 0 else "medium" if data["margin"] < 500 else "low"
-        
-        clients.append({
-            "id": client_id,
-            "name": data["name"],
-            "monthly_revenue": data["monthly_revenue"],
-            "monthly_cost": data["monthly_cost"],
-            "margin": data["margin"],
-            "margin_percentage": round((data["margin"] / data["monthly_revenue"]) * 100, 1),
-            "risk_level": risk_level,
-            "contract_value": data["contract_value"],
-            "recommendation": get_profitability_recommendation(data)
-        })
-    
-    return {"clients": clients}
+    profitability = get_portfolio_analysis()["profitability"]
+    if query.is_plain:
+        return profitability
+    clients = profitability["clients"]
+    return run_list_query(get_list_tables()["clients"], query, "clients",
+                          lambda rows: [clients[row] for row in rows.tolist()])
 
 @app.get("/licenses/optimization")
-def get_license_optimization():
+def get_license_optimization(query: ListQuery = Depends(list_query_params)):
     """Get license optimization opportunities"""
-    optimizations = []
-    total_savings = 0
-    
-    for client_id, client_data in MOCK_CLIENTS.items():
-        for license_type, license_data in client_data["licenses"].items():
-            unused = license_data["total"] - license_data["used"]
-            if unused > 0:
-                monthly_savings = unused * license_data["cost_per_license"]
-                annual_savings = monthly_savings * 12
-                total_savings += annual_savings
-                
-                optimizations.append({
-                    "client_id": client_id,
-                    "client_name": client_data["name"],
-                    "license_type": license_type.replace("_", " ").title(),
-                    "total_licenses": license_data["total"],
-                    "used_licenses": license_data["used"],
-                    "unused_licenses": unused,
-                    "cost_per_license": license_data["cost_per_license"],
-                    "monthly_savings": monthly_savings,
-                    "annual_savings": annual_savings,
-                    "utilization_rate": round((license_data["used"] / license_data["total"]) * 100, 1)
-                })
-    
-    return {
-        "optimizations": optimizations,
-        "total_annual_savings": total_savings,
-        "total_monthly_savings": total_savings / 12
-    }
+    licenses = get_portfolio_analysis()["licenses"]
+    if query.is_plain:
+        return licenses
+    optimizations = licenses["optimizations"]
+    return run_list_query(get_list_tables()["licenses"], query, "optimizations",
+                          lambda rows: [optimizations[row] for row in rows.tolist()])
 
 @app.get("/upsell/opportunities")
 def get_upsell_opportunities():
     """Identify upsell opportunities based on ticket patterns"""
-    opportunities = []
-    
-    for client_id, client_data in MOCK_CLIENTS.items():
-        upsells = []
-        
-        # Security upsell based on incidents
-        if client_data["security_incidents"] >= 5:
-            upsells.append({
-                "service": "Premium Cybersecurity Package",
-                "monthly_value": 2000,
-                "annual_value": 24000,
-                "confidence": 85,
-                "reason": f"{client_data['security_incidents']} security incidents last month"
-            })
-        
-        # Backup upsell based on tickets
-        if client_data["tickets_last_month"] >= 20:
-            upsells.append({
-                "service": "Enhanced Backup & Recovery",
-                "monthly_value": 800,
-                "annual_value": 9600,
-                "confidence": 70,
-                "reason": f"{client_data['tickets_last_month']} support tickets indicate system instability"
-            })
-        
-        # Compliance upsell for healthcare
-        if "health" in client_data["name"].lower():
-            upsells.append({
-                "service": "HIPAA Compliance Monitoring",
-                "monthly_value": 1200,
-                "annual_value": 14400,
-                "confidence": 90,
-                "reason": "Healthcare industry requires enhanced compliance monitoring"
-            })
-        
-        if upsells:
-            opportunities.append({
-                "client_id": client_id,
-                "client_name": client_data["name"],
-                "current_monthly_revenue": client_data["monthly_revenue"],
-                "upsell_opportunities": upsells,
-                "total_potential_monthly": sum(u["monthly_value"] for u in upsells),
-                "total_potential_annual": sum(u["annual_value"] for u in upsells)
-            })
-    
-    return {"opportunities": opportunities}
+    return get_portfolio_analysis()["upsells"]
 
 @app.post("/scenario/simulate")
-def simulate_scenario(request: ScenarioRequest):
+async def simulate_scenario(request: ScenarioRequest):
     """Simulate what-if scenarios using Digital Twin"""
     client_data = MOCK_CLIENTS.get(request.client_id)
     if not client_data:
         raise HTTPException(status_code=404, detail="Client not found")
     
     if request.scenario_type == "client_churn":
-        return simulate_client_churn(request.client_id, client_data, request.parameters)
+        result = simulate_client_churn(request.client_id, client_data, request.parameters)
     elif request.scenario_type == "service_addition":
-        return simulate_service_addition(request.client_id, client_data, request.parameters)
+        result = simulate_service_addition(request.client_id, client_data, request.parameters)
     elif request.scenario_type == "price_increase":
-        return simulate_price_increase(request.client_id, client_data, request.parameters)
+        result = simulate_price_increase(request.client_id, client_data, request.parameters)
     else:
         raise HTTPException(status_code=400, detail="Invalid scenario type")
+    
+    # Monte Carlo mode adds P5/P50/P95 bands to the deterministic point estimate
+    if request.parameters.get("mode") == "monte_carlo":
+        try:
+            result["monte_carlo"] = await compute_pool.run(
+                digital_twin.run_monte_carlo, request.scenario_type, client_data, request.parameters
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return result
+
+@app.post("/scenario/simulate/batch")
+async def simulate_scenario_batch(request: BatchScenarioRequest):
+    """Evaluate a scenario over every (client, parameter combination) pair in one vectorized pass"""
+    frame = await asyncio.to_thread(get_client_frame)
+    try:
+        combos = digital_twin.build_parameter_grid(request.scenario_type, request.grid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = select_client_rows(frame, request.clients)
+    combo_count = len(next(iter(combos.values())))
+    if len(rows) * combo_count > digital_twin.MAX_GRID_CELLS:
+        raise HTTPException(status_code=400, detail=f"Grid exceeds {digital_twin.MAX_GRID_CELLS} cells")
+    
+    header = {
+        "scenario": request.scenario_type,
+        "parameters": list(combos),
+        "grid": np.column_stack(list(combos.values())).tolist(),
+        "client_count": len(rows)
+    }
+    
+    if request.stream:
+        def stream_rows():
+            yield fast_json.dumps({"type": "header", **header}) + b"\n"
+            for start in range(0, len(rows), BATCH_STREAM_CHUNK):
+                chunk = rows[start:start + BATCH_STREAM_CHUNK]
+                metrics = digital_twin.evaluate_scenario_grid(
+                    request.scenario_type, frame.monthly_revenue[chunk], frame.monthly_cost[chunk],
+                    frame.margin[chunk], combos
+                )
+                metrics = {name: values.tolist() for name, values in metrics.items()}
+                for i, client_id in enumerate(frame.ids[chunk].tolist()):
+                    row = {"type": "row", "client_id": client_id}
+                    row.update((name, values[i]) for name, values in metrics.items())
+                    yield fast_json.dumps(row) + b"\n"
+        return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+    
+    # Evaluation and serialization both run on the compute pool, against the shared client columns
+    body = await compute_pool.run(
+        scenario_batch_task, compute_pool.share_frame(frame, portfolio_aggregates.version),
+        request.scenario_type, rows, combos, header
+    )
+    return Response(content=body, media_type="application/json")
 
 @app.get("/anomalies/detect")
 def detect_anomalies():
     """Detect billing errors, low-margin clients, and budget overruns"""
-    anomalies = []
-    
-    for client_id, client_data in MOCK_CLIENTS.items():
-        # Low margin anomaly
-        if client_data["margin"] < 0:
-            anomalies.append({
-                "type": "low_margin",
-                "severity": "high",
-                "client_id": client_id,
-                "client_name": client_data["name"],
-                "description": f"Client operating at {client_data['margin']} monthly loss",
-                "impact": f"${abs(client_data['margin']) * 12} annual loss",
-                "recommendation": "Renegotiate contract or terminate relationship"
-            })
-        
-        # High ticket volume anomaly
-        if client_data["tickets_last_month"] > 30:
-            anomalies.append({
-                "type": "high_support_load",
-                "severity": "medium",
-                "client_id": client_id,
-                "client_name": client_data["name"],
-                "description": f"{client_data['tickets_last_month']} tickets last month (above normal)",
-                "impact": "Increased support costs",
-                "recommendation": "Investigate root cause or adjust service level"
-            })
-        
-        # License utilization anomaly
-        for license_type, license_data in client_data["licenses"].items():
-            utilization = (license_data["used"] / license_data["total"]) * 100
-            if utilization < 60:
-                unused = license_data["total"] - license_data["used"]
-                monthly_waste = unused * license_data["cost_per_license"]
-                anomalies.append({
-                    "type": "license_waste",
-                    "severity": "medium",
-                    "client_id": client_id,
-                    "client_name": client_data["name"],
-                    "description": f"{license_type.replace('_', ' ').title()}: {unused} unused licenses ({utilization:.1f}% utilization)",
-                    "impact": f"${monthly_waste}/month waste",
-                    "recommendation": f"Downgrade by {unused} licenses"
-                })
-    
-    return {"anomalies": anomalies}
+    return get_portfolio_analysis()["anomalies"]
 
 @app.get("/reports/weekly")
 async def get_weekly_report():
     """Generate automated weekly financial summary"""
-    overview = await get_dashboard_overview()
-    profitability = get_client_profitability()
-    licenses = get_license_optimization()
-    upsells = get_upsell_opportunities()
-    anomalies = detect_anomalies()
+    overview = await dashboard_overview_data()
+    analysis = get_portfolio_analysis()
     
     return {
         "report_date": datetime.now().isoformat(),
@@ -499,10 +604,10 @@ async def get_weekly_report():
             "total_margin": overview["total_margin"],
             "margin_percentage": overview["margin_percentage"],
             "at_risk_clients": len(overview["unprofitable_clients"]),
-            "potential_savings": licenses["total_annual_savings"],
-            "upsell_potential": sum(opp["total_potential_annual"] for opp in upsells["opportunities"])
+            "potential_savings": analysis["licenses"]["total_annual_savings"],
+            "upsell_potential": analysis["upsell_potential_annual"]
         },
-        "action_items": generate_action_items(anomalies["anomalies"], upsells["opportunities"])
+        "action_items": analysis["action_items"]
     }
 
 @app.get("/health")
@@ -679,18 +784,18 @@ async def autonomous_license_downgrade(client_id: str, background_tasks: Backgro
 # ============================================================================
 
 @app.get("/sustainability/overview")
-def get_sustainability_overview():
+async def get_sustainability_overview():
     """Get portfolio-wide sustainability overview"""
     try:
-        return sustainability_analytics.calculate_carbon_footprint()
+        return await compute_pool.run_service(sustainability_analytics, "calculate_carbon_footprint")
     except Exception as e:
         return {"error": str(e), "mock_data": True}
 
 @app.get("/sustainability/client/{client_id}")
-def get_client_sustainability(client_id: str):
+async def get_client_sustainability(client_id: str):
     """Get detailed sustainability analysis for specific client"""
     try:
-        return sustainability_analytics.calculate_carbon_footprint(client_id)
+        return await compute_pool.run_service(sustainability_analytics, "calculate_carbon_footprint", client_id)
     except Exception as e:
         return {"error": str(e), "mock_data": True}
 
@@ -721,18 +826,18 @@ async def implement_green_initiative(client_id: str, initiative: dict):
 # ============================================================================
 
 @app.get("/performance/scoreboard")
-def get_performance_scoreboard():
+async def get_performance_scoreboard():
     """Get overall MSP performance scoreboard"""
     try:
-        return performance_scoreboard.get_overall_scoreboard()
+        return await compute_pool.run_service(performance_scoreboard, "get_overall_scoreboard")
     except Exception as e:
         return {"error": str(e), "mock_data": True}
 
 @app.get("/performance/client/{client_id}")
-def get_client_performance(client_id: str):
+async def get_client_performance(client_id: str):
     """Get detailed performance analysis for specific client"""
     try:
-        return performance_scoreboard.get_client_performance_detail(client_id)
+        return await compute_pool.run_service(performance_scoreboard, "get_client_performance_detail", client_id)
     except Exception as e:
         return {"error": str(e), "mock_data": True}
 
@@ -790,7 +895,9 @@ def get_system_stats():
             "s3_store": getattr(s3_store, 'get_storage_stats', lambda: {"status": "mock"})(),
             "email_service": True,
             "sustainability_analytics": True,
-            "performance_scoreboard": True
+            "performance_scoreboard": True,
+            "response_cache": response_cache.stats(),
+            "compute_pool": compute_pool.stats()
         },
         "version": "2.0.0",
         "features": {
@@ -811,35 +918,46 @@ def get_system_stats():
 # CLIENT MANAGEMENT ENDPOINTS
 # ============================================================================
 
+def client_record(client_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Client as listed by GET /clients"""
+    return {
+        "id": client_id,
+        "name": data["name"],
+        "email": f"{data['name'].lower().replace(' ', '.')}@company.com",
+        "phone": "+1-555-0123",
+        "company": data["name"],
+        "monthly_revenue": data["monthly_revenue"],
+        "monthly_cost": data["monthly_cost"],
+        "contract_value": data["contract_value"],
+        "services": data["services"],
+        "industry": "Technology",
+        "contract_start": "2024-01-01",
+        "contract_end": "2024-12-31",
+        "billing_cycle": "monthly",
+        "payment_terms": "net_30",
+        "status": "active",
+        "margin": data["margin"]
+    }
+
 @app.get("/clients")
-def get_all_clients():
+def get_all_clients(query: ListQuery = Depends(list_query_params)):
     """Get all clients"""
-    clients = []
-    for client_id, data in MOCK_CLIENTS.items():
-        clients.append({
-            "id": client_id,
-            "name": data["name"],
-            "email": f"{data['name'].lower().replace(' ', '.')}@company.com",
-            "phone": "+1-555-0123",
-            "company": data["name"],
-            "monthly_revenue": data["monthly_revenue"],
-            "monthly_cost": data["monthly_cost"],
-            "contract_value": data["contract_value"],
-            "services": data["services"],
-            "industry": "Technology",
-            "contract_start": "2024-01-01",
-            "contract_end": "2024-12-31",
-            "billing_cycle": "monthly",
-            "payment_terms": "net_30",
-            "status": "active",
-            "margin": data["margin"]
-        })
-    return {"clients": clients}
+    if query.is_plain:
+        return {"clients": [client_record(client_id, data) for client_id, data in MOCK_CLIENTS.items()]}
+    ids = get_client_frame().ids
+    return run_list_query(get_list_tables()["clients"], query, "clients", lambda rows: [
+        client_record(client_id, MOCK_CLIENTS[client_id]) for client_id in ids[rows].tolist()
+    ])
 
 @app.post("/clients")
 def create_client(client_data: dict):
     """Create a new client"""
-    client_id = f"client_{len(MOCK_CLIENTS) + 1}"
+    suffix = len(MOCK_CLIENTS) + 1
+    client_id = f"client_{suffix}"
+    # Ids can be freed by deletes, so skip any that are still taken
+    while client_id in MOCK_CLIENTS:
+        suffix += 1
+        client_id = f"client_{suffix}"
     MOCK_CLIENTS[client_id] = {
         "name": client_data["name"],
         "monthly_revenue": client_data["monthly_revenue"],
@@ -848,13 +966,16 @@ def create_client(client_data: dict):
         "services": client_data["services"],
         "margin": client_data["margin"]
     }
+    portfolio_aggregates.add(client_id, MOCK_CLIENTS[client_id])
     return {"success": True, "client_id": client_id}
 
 @app.put("/clients/{client_id}")
 def update_client(client_id: str, client_data: dict):
     """Update an existing client"""
     if client_id in MOCK_CLIENTS:
+        previous = dict(MOCK_CLIENTS[client_id])
         MOCK_CLIENTS[client_id].update(client_data)
+        portfolio_aggregates.replace(client_id, previous, MOCK_CLIENTS[client_id])
         return {"success": True}
     return {"success": False, "error": "Client not found"}
 
@@ -862,7 +983,7 @@ def update_client(client_id: str, client_data: dict):
 def delete_client(client_id: str):
     """Delete a client"""
     if client_id in MOCK_CLIENTS:
-        del MOCK_CLIENTS[client_id]
+        portfolio_aggregates.remove(client_id, MOCK_CLIENTS.pop(client_id))
         return {"success": True}
     return {"success": False, "error": "Client not found"}
 
@@ -1204,22 +1325,25 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = fast_json.loads(data)
             
             if message.get("type") == "subscribe":
                 subscriptions = message.get("subscriptions", [])
                 connection_manager.update_subscription(websocket, subscriptions)
                 await connection_manager.send_personal_message(
-                    json.dumps({
+                    fast_json.dumps_str({
                         "type": "subscription_updated",
                         "subscriptions": subscriptions,
                         "timestamp": datetime.now().isoformat()
                     }),
                     websocket
                 )
+            elif message.get("type") == "resync":
+                # Sent by a client that saw a gap in a topic's sequence numbers
+                await connection_manager.send_snapshot(websocket, message.get("topics"))
             elif message.get("type") == "ping":
                 await connection_manager.send_personal_message(
-                    json.dumps({
+                    fast_json.dumps_str({
                         "type": "pong",
                         "timestamp": datetime.now().isoformat()
                     }),
@@ -1228,11 +1352,22 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         connection_manager.disconnect(websocket)
 
+async def publish_client_changes(topic: str, clients: List[Dict[str, Any]], removed: List[str]):
+    """Republish a topic after a SuperOps webhook batch refreshed `clients` and removed the `removed` ids"""
+    await connection_manager.refresh_topic(topic, clients, removed)
+
+superops_webhooks.publish = publish_client_changes
+
 # 🔧 FIX: Simplified startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     print("🚀 Starting AI CFO Agent services...")
+    if superops_api.api_available:
+        await superops_api.start()
+        await superops_sync.start()
+    await superops_webhooks.start()
+    await realtime_service.start_service()
     print("✅ AI CFO Agent startup complete")
 
 @app.on_event("shutdown")
@@ -1240,6 +1375,10 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     print("⏹️ Shutting down AI CFO Agent services...")
     await realtime_service.stop_service()
+    await superops_webhooks.stop()
+    await superops_sync.stop()
+    await superops_api.close()
+    compute_pool.shutdown()
     print("✅ AI CFO Agent shutdown complete")
 
 # New endpoints for enhanced functionality
@@ -1264,14 +1403,41 @@ def get_superops_status():
     return {
         "api_available": superops_api.api_available,
         "base_url": superops_api.base_url,
-        "tenant_id": superops_api.tenant_id
+        "tenant_id": superops_api.tenant_id,
+        "connection_pool": superops_api.connection_stats(),
+        "cache": superops_api.cache_stats(),
+        "dashboard_snapshot": superops_api.dashboard_freshness(),
+        "flow_control": superops_api.flow_control_stats(),
+        "sync": superops_sync.stats(),
+        "webhooks": superops_webhooks.stats()
     }
 
+@app.post("/superops/webhooks", status_code=202)
+async def receive_superops_webhook(request: Request):
+    """Accept SuperOps change events; they are applied asynchronously in micro-batches"""
+    if not superops_webhooks.configured:
+        raise HTTPException(status_code=503, detail="Webhook receiver not configured: set SUPEROPS_WEBHOOK_SECRET")
+    body = await request.body()
+    if not superops_webhooks.verify_signature(body, request.headers.get("X-SuperOps-Signature")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    try:
+        events = superops_webhooks.parse(fast_json.loads(body))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid webhook payload: {e}")
+    try:
+        accepted = superops_webhooks.submit(events)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Webhook queue full", headers={"Retry-After": "1"})
+    return {"accepted": accepted, "duplicates": len(events) - accepted}
+
 @app.get("/superops/clients")
-async def get_superops_clients():
+async def get_superops_clients(query: ListQuery = Depends(list_query_params)):
     """Get all clients from SuperOps"""
     clients = await superops_api.get_all_clients()
-    return {"clients": clients, "count": len(clients)}
+    if query.is_plain:
+        return {"clients": clients, "count": len(clients)}
+    table = await asyncio.to_thread(get_superops_list_table, clients)
+    return run_list_query(table, query, "clients", lambda rows: [clients[row] for row in rows.tolist()])
 
 @app.get("/nova-act/status")
 def get_nova_act_status():
@@ -1283,13 +1449,24 @@ def get_nova_act_status():
     }
 
 # Helper functions
-def get_profitability_recommendation(client_data):
-    if client_data["margin"] < 0:
-        return "URGENT: Renegotiate contract or consider termination"
-    elif client_data["margin"] < 500:
-        return "Review service delivery efficiency and pricing"
+BATCH_STREAM_CHUNK = 2048
+
+def select_client_rows(frame: ClientFrame, selector: ClientSelector) -> np.ndarray:
+    """Resolve a client selector to ClientFrame row indices, in portfolio order"""
+    if selector.ids is not None:
+        rows = np.array([frame.index_of(client_id) for client_id in selector.ids], dtype=np.int64)
+        missing = [client_id for client_id, row in zip(selector.ids, rows) if row < 0]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Clients not found: {missing}")
     else:
-        return "Healthy margin - consider upsell opportunities"
+        rows = np.arange(len(frame))
+    
+    if selector.risk_level is not None:
+        if selector.risk_level not in portfolio_analytics.RISK_LEVELS:
+            raise HTTPException(status_code=400, detail="Invalid risk level")
+        bands = portfolio_analytics.risk_band(frame.margin[rows])
+        rows = rows[portfolio_analytics.RISK_LEVELS[bands] == selector.risk_level]
+    return rows
 
 def simulate_client_churn(client_id, client_data, parameters):
     months_ahead = parameters.get("months", 3)
@@ -1339,30 +1516,6 @@ def simulate_price_increase(client_id, client_data, parameters):
         "churn_risk": "low" if increase_percentage <= 5 else "medium" if increase_percentage <= 15 else "high"
     }
 
-def generate_action_items(anomalies, upsell_opportunities):
-    actions = []
-    
-    # High priority anomalies
-    for anomaly in anomalies:
-        if anomaly["severity"] == "high":
-            actions.append({
-                "priority": "high",
-                "action": anomaly["recommendation"],
-                "client": anomaly["client_name"],
-                "impact": anomaly["impact"]
-            })
-    
-    # Top upsell opportunities
-    for opp in upsell_opportunities[:3]:  # Top 3
-        actions.append({
-            "priority": "medium",
-            "action": f"Present upsell proposal to {opp['client_name']}",
-            "client": opp["client_name"],
-            "impact": f"${opp['total_potential_annual']} annual potential"
-        })
-    
-    return actions
-
 # New endpoints for LangChain and Strand Agents integration
 
 @app.get("/langchain/status")
@@ -0,0 +1,86 @@
+"""
+ClientFrame Benchmark
+Per-request latency of the analytics routes at 1k, 10k and 100k synthetic clients
+
+Run from src/backend:  python -m benchmarks.bench_client_frame
+"""
+import asyncio
+import time
+import statistics
+
+import app
+import portfolio_analytics
+from list_query import ListQuery
+from benchmarks.synthetic import make_clients
+
+SIZES = (1_000, 10_000, 100_000)
+ROUTES = {
+    "/profitability/clients": lambda: app.get_client_profitability(ListQuery()),
+    "/licenses/optimization": lambda: app.get_license_optimization(ListQuery()),
+    "/upsell/opportunities": app.get_upsell_opportunities,
+    "/anomalies/detect": app.detect_anomalies,
+}
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _cold_weekly_report():
+    """Weekly report right after a data change: one fused scan plus the report assembly"""
+    app._portfolio_analysis = None  # force the fused scan without bumping the data version
+    asyncio.run(app.get_weekly_report())
+
+
+def legacy_profitability(clients):
+    """The pre-ClientFrame dict walk, kept here as the baseline"""
+    result = []
+    for client_id, data in clients.items():
+        risk_level = "high" if data["margin"] < 0 else "medium" if data["margin"] < 500 else "low"
+        result.append({
+            "id": client_id,
+            "name": data["name"],
+            "monthly_revenue": data["monthly_revenue"],
+            "monthly_cost": data["monthly_cost"],
+            "margin": data["margin"],
+            "margin_percentage": round((data["margin"] / data["monthly_revenue"]) * 100, 1),
+            "risk_level": risk_level,
+            "contract_value": data["contract_value"]
+        })
+    return result
+
+
+def main():
+    print(f"{'clients':>8} {'step':<34} {'median ms':>10}")
+    for size in SIZES:
+        clients = make_clients(size)
+        app.MOCK_CLIENTS.clear()
+        app.MOCK_CLIENTS.update(clients)
+        app.portfolio_aggregates.load(app.MOCK_CLIENTS)
+
+        start = time.perf_counter()
+        frame = app.get_client_frame()
+        build_ms = (time.perf_counter() - start) * 1000
+        repeat = 20 if size < 100_000 else 5
+
+        print(f"{size:>8} {'frame build (once per version)':<34} {build_ms:>10.2f}")
+        print(f"{size:>8} {'fused analysis, all five sections':<34} "
+              f"{_time_ms(lambda: portfolio_analytics.analyze_portfolio(frame), repeat):>10.2f}")
+        print(f"{size:>8} {'/reports/weekly (cold)':<34} {_time_ms(_cold_weekly_report, repeat):>10.2f}")
+        for route, handler in ROUTES.items():
+            print(f"{size:>8} {route + ' (warm view)':<34} {_time_ms(handler, repeat):>10.4f}")
+        print(f"{size:>8} {'/dashboard/overview (aggregates)':<34} "
+              f"{_time_ms(lambda: asyncio.run(app.get_dashboard_overview()), repeat):>10.4f}")
+        print(f"{size:>8} {'PUT /clients/{id} (aggregate update)':<34} "
+              f"{_time_ms(lambda: app.update_client('client_0', {'margin': -1}), repeat):>10.4f}")
+        print(f"{size:>8} {'legacy dict walk, profitability':<34} "
+              f"{_time_ms(lambda: legacy_profitability(clients), repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
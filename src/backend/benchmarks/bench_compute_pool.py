@@ -0,0 +1,65 @@
+"""
+Compute Pool Benchmark
+Throughput of concurrent CPU-bound analytics requests on the threadpool vs 1, 2 and 4 worker processes
+
+Run from src/backend:  python -m benchmarks.bench_compute_pool
+"""
+import asyncio
+import os
+import time
+
+import numpy as np
+
+import digital_twin
+from client_frame import ClientFrame
+from compute_pool import ComputePool, scenario_batch_task
+from performance_scoreboard import performance_scoreboard
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 20_000
+REQUESTS = 32
+WORKER_COUNTS = (0, 1, 2, 4)
+MONTE_CARLO_PARAMETERS = {"mode": "monte_carlo", "trials": 200_000, "seed": 1}
+GRID = {"percentage": list(range(1, 26))}
+
+
+async def _workload(pool: ComputePool, frame: ClientFrame) -> float:
+    """Fire REQUESTS concurrent requests (Monte Carlo, batch grid and scoreboard) and return requests/s"""
+    source = pool.share_frame(frame, version=1)
+    combos = digital_twin.build_parameter_grid("price_increase", GRID)
+    rows = np.arange(len(frame))
+    client = {"monthly_revenue": 3500, "monthly_cost": 2800}
+
+    def request(i: int):
+        kind = i % 3
+        if kind == 0:
+            return pool.run(digital_twin.run_monte_carlo, "price_increase", client, MONTE_CARLO_PARAMETERS)
+        if kind == 1:
+            return pool.run(scenario_batch_task, source, "price_increase", rows, combos, {})
+        return pool.run_service(performance_scoreboard, "get_overall_scoreboard")
+
+    # Warm-up: start the workers and attach the shared block in each of them
+    await asyncio.gather(*(request(1) for _ in range(max(pool.workers, 1))))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    frame = ClientFrame.from_clients(make_clients(CLIENTS))
+    print(f"{os.cpu_count()} CPUs, {CLIENTS} clients, {REQUESTS} concurrent requests per run")
+    print(f"{'mode':<12} {'req/s':>8} {'speedup':>8}")
+    baseline = None
+    for workers in WORKER_COUNTS:
+        pool = ComputePool(workers=workers)
+        try:
+            throughput = asyncio.run(_workload(pool, frame))
+        finally:
+            pool.shutdown()
+        baseline = baseline or throughput
+        label = "threads" if workers == 0 else f"{workers} procs"
+        print(f"{label:<12} {throughput:>8.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
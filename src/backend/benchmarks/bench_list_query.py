@@ -0,0 +1,64 @@
+"""
+List Query Benchmark
+Payload size and latency of full list responses vs filtered, projected 50-row pages at 20k and 100k clients
+
+Run from src/backend:  python -m benchmarks.bench_list_query
+"""
+import json
+import statistics
+import time
+
+import app
+from list_query import ListQuery
+from benchmarks.synthetic import make_clients
+
+SIZES = (20_000, 100_000)
+PAGE = 50
+QUERIES = {
+    "full body (legacy)": {},
+    "page": {"limit": PAGE},
+    "page, risk_level=high": {"limit": PAGE, "risk_level": "high"},
+    "page, margin in [0, 500]": {"limit": PAGE, "min_margin": 0, "max_margin": 500},
+    "page, license_type + risk": {"limit": PAGE, "license_type": "adobe_creative", "risk_level": "low"},
+    "page, two fields": {"limit": PAGE},
+}
+# Handler and the two fields projected for each route
+ROUTES = {
+    "/clients": (app.get_all_clients, "id,margin"),
+    "/profitability/clients": (app.get_client_profitability, "id,margin"),
+    "/licenses/optimization": (app.get_license_optimization, "client_id,monthly_savings"),
+}
+
+
+def _time_ms(fn, repeat: int = 20) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    print(f"{'clients':>8} {'route':<24} {'query':<28} {'ms':>9} {'bytes':>11}")
+    for size in SIZES:
+        app.MOCK_CLIENTS.clear()
+        app.MOCK_CLIENTS.update(make_clients(size))
+        app.portfolio_aggregates.load(app.MOCK_CLIENTS)
+
+        start = time.perf_counter()
+        app.get_list_tables()
+        print(f"{size:>8} {'index build (per version)':<53} {(time.perf_counter() - start) * 1000:>9.2f}")
+        app.get_portfolio_analysis()
+
+        for route, (handler, fields) in ROUTES.items():
+            for label, params in QUERIES.items():
+                query = ListQuery(**params, fields=fields if label == "page, two fields" else None)
+                repeat = 3 if query.is_plain and route == "/clients" else 20
+                elapsed = _time_ms(lambda: handler(query), repeat)
+                payload = len(json.dumps(handler(query)))
+                print(f"{size:>8} {route:<24} {label:<28} {elapsed:>9.3f} {payload:>11}")
+
+
+if __name__ == "__main__":
+    main()
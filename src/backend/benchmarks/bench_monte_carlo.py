@@ -0,0 +1,36 @@
+"""
+Monte Carlo Digital Twin Benchmark
+Latency of one /scenario/simulate request in monte_carlo mode versus trial count
+
+Run from src/backend:  python -m benchmarks.bench_monte_carlo
+"""
+import time
+import statistics
+
+import digital_twin
+
+CLIENT = {"monthly_revenue": 5000, "monthly_cost": 3200}
+SCENARIOS = {
+    "client_churn": {"months": 12},
+    "service_addition": {"monthly_revenue": 1000, "monthly_cost": 600},
+    "price_increase": {"percentage": 10},
+}
+TRIALS = (10_000, 50_000, 200_000)
+
+
+def main():
+    print(f"{'scenario':<18} {'trials':>8} {'median ms':>10} {'p95 ms':>8}")
+    for scenario, parameters in SCENARIOS.items():
+        for trials in TRIALS:
+            samples = []
+            for seed in range(30):
+                start = time.perf_counter()
+                digital_twin.run_monte_carlo(scenario, CLIENT, {**parameters, "trials": trials, "seed": seed})
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            print(f"{scenario:<18} {trials:>8} {statistics.median(samples):>10.2f} "
+                  f"{samples[int(len(samples) * 0.95) - 1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
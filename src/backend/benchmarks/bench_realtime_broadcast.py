@@ -0,0 +1,118 @@
+"""
+Realtime Broadcast Load Test
+Thousands of simulated WebSockets, a share of them deliberately slow: delivery latency to the healthy clients
+with the old serial broadcast against per-connection send queues under each slow-consumer policy
+
+Run from src/backend:  python -m benchmarks.bench_realtime_broadcast
+"""
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from fastapi.websockets import WebSocketState
+
+from realtime_updates import ConnectionManager, SLOW_CONSUMER_POLICIES
+
+SOCKETS = 5_000
+SLOW_SHARE = 0.02
+# Seconds a slow client takes to accept one frame; fast clients only yield to the loop
+SLOW_SEND_SECONDS = 0.2
+MESSAGES = 20
+PUBLISH_INTERVAL = 0.05
+QUEUE_SIZE = 8
+# The serial broadcast waits on every slow client per message, so it only gets a couple of messages
+SERIAL_MESSAGES = 2
+TOPICS = ("financial", "licenses", "anomalies", "upsells")
+
+
+class SimulatedSocket:
+    def __init__(self, slow: bool):
+        self.client_state = WebSocketState.CONNECTED
+        self.slow = slow
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(SLOW_SEND_SECONDS if self.slow else 0)
+        self.received.append((message, time.perf_counter()))
+
+    async def close(self, code: int = 1000):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def _sockets():
+    slow_every = round(1 / SLOW_SHARE)
+    return [SimulatedSocket(slow=i % slow_every == 0) for i in range(SOCKETS)]
+
+
+def _message(i: int) -> str:
+    return json.dumps({"type": f"{TOPICS[i % len(TOPICS)]}_update", "sent": time.perf_counter(), "seq": i})
+
+
+def _latencies(sockets):
+    return [(received - json.loads(message)["sent"]) * 1000
+            for socket in sockets if not socket.slow for message, received in socket.received]
+
+
+def _report(name, sockets, publish_seconds, messages, manager=None):
+    latencies = sorted(_latencies(sockets))
+    fast = [socket for socket in sockets if not socket.slow]
+    slow = [socket for socket in sockets if socket.slow]
+    complete = sum(1 for socket in fast if len(socket.received) == messages) / len(fast)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan")
+    counters = manager.send_counters if manager is not None else {}
+    print(f"{name:<22} {publish_seconds * 1000 / messages:>10.2f} {statistics.median(latencies):>9.1f} "
+          f"{p99:>9.1f} {complete:>9.1%} {sum(len(s.received) for s in slow) / len(slow):>10.1f} "
+          f"{counters.get('dropped', 0):>8} {counters.get('coalesced', 0):>9} "
+          f"{counters.get('slow_disconnects', 0):>6}")
+
+
+async def _serial():
+    """The pre-queue broadcast: send_text awaited on each subscriber in turn"""
+    sockets = _sockets()
+    publish = 0.0
+    for i in range(SERIAL_MESSAGES):
+        message = _message(i)
+        started = time.perf_counter()
+        for socket in sockets:
+            await socket.send_text(message)
+        publish += time.perf_counter() - started
+    _report("serial broadcast", sockets, publish, SERIAL_MESSAGES)
+
+
+async def _queued(policy: str):
+    sockets = _sockets()
+    manager = ConnectionManager(queue_size=QUEUE_SIZE, policy=policy)
+    for socket in sockets:
+        await manager.connect(socket, ["all"])
+    publish = 0.0
+    for i in range(MESSAGES):
+        message = _message(i)
+        started = time.perf_counter()
+        await manager.broadcast(message, TOPICS[i % len(TOPICS)])
+        publish += time.perf_counter() - started
+        await asyncio.sleep(PUBLISH_INTERVAL)
+    # Fast clients catch up well within one slow send
+    await asyncio.sleep(SLOW_SEND_SECONDS)
+    _report(f"queued, {policy}", sockets, publish, MESSAGES, manager)
+    for socket in sockets:
+        manager.disconnect(socket)
+
+
+async def main():
+    logging.disable(logging.ERROR)
+    print(f"{SOCKETS} sockets, {SLOW_SHARE:.0%} slow ({SLOW_SEND_SECONDS * 1000:.0f} ms per frame), "
+          f"{MESSAGES} messages every {PUBLISH_INTERVAL * 1000:.0f} ms, send queue {QUEUE_SIZE}\n")
+    print(f"{'mode':<22} {'publish ms':>10} {'p50 ms':>9} {'p99 ms':>9} {'complete':>9} {'slow recv':>10} "
+          f"{'dropped':>8} {'coalesced':>9} {'kicked':>6}")
+    await _serial()
+    for policy in SLOW_CONSUMER_POLICIES:
+        await _queued(policy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Realtime Delta Streaming Benchmark
+Bytes pushed per subscriber on a synthetic 10k-client portfolio when a handful of clients change each cycle:
+the full snapshot the updater used to send on every change against sequenced keyed deltas
+
+Run from src/backend:  python -m benchmarks.bench_realtime_deltas
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+
+from fastapi.websockets import WebSocketState
+
+import fast_json
+from realtime_updates import ConnectionManager, REALTIME_TOPICS
+from superops_integration import SuperOpsAPI
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 10_000
+CYCLES = 20
+CHANGES_PER_CYCLE = 5
+
+
+class CountingSocket:
+    client_state = WebSocketState.CONNECTED
+
+    def __init__(self):
+        self.bytes = {topic: 0 for topic in REALTIME_TOPICS}
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.bytes[fast_json.loads(message)["topic"]] += len(message.encode())
+        self.frames += 1
+
+
+async def _drain(manager: ConnectionManager, socket: CountingSocket):
+    """Let the writer deliver everything queued"""
+    while manager.channels[socket].pending:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def _topic_data(clients):
+    return {
+        "financial": SuperOpsAPI.dashboard_summary(clients),
+        "licenses": ConnectionManager.license_optimization_data(clients),
+        "anomalies": ConnectionManager.anomaly_data(clients),
+        "upsells": ConnectionManager.upsell_data(clients)
+    }
+
+
+def _mutate(clients, rng: random.Random):
+    """A contract change, a ticket spike or a license true-up on a few random clients"""
+    for i in rng.sample(range(len(clients)), CHANGES_PER_CYCLE):
+        client = dict(clients[i])
+        change = rng.choice(("revenue", "tickets", "licenses"))
+        if change == "revenue":
+            client["monthly_revenue"] = rng.randint(800, 9000)
+            client["margin"] = client["monthly_revenue"] - client["monthly_cost"]
+        elif change == "tickets":
+            client["tickets_last_month"] = rng.randint(0, 60)
+        else:
+            name, license_data = rng.choice(list(client["licenses"].items()))
+            used = rng.randint(0, license_data["total"])
+            client["licenses"] = {**client["licenses"], name: {**license_data, "used": used}}
+        clients[i] = client
+
+
+async def main():
+    logging.disable(logging.INFO)
+    rng = random.Random(3)
+    clients = [{"id": client_id, **client} for client_id, client in make_clients(CLIENTS).items()]
+    manager = ConnectionManager(queue_size=1_000)
+    socket = CountingSocket()
+    await manager.connect(socket, ["all"])
+
+    sources = ConnectionManager.client_sources(clients)
+    for topic, data in _topic_data(clients).items():
+        await manager.publish_topic(topic, data, sources if topic != "financial" else None)
+    await _drain(manager, socket)
+    initial = dict(socket.bytes)
+    for topic in socket.bytes:
+        socket.bytes[topic] = 0
+
+    full = {topic: 0 for topic in REALTIME_TOPICS}
+    publish_seconds = compare_seconds = 0.0
+    for _ in range(CYCLES):
+        _mutate(clients, rng)
+        sources = ConnectionManager.client_sources(clients)
+        for topic, data in _topic_data(clients).items():
+            # The previous change check: serialize the cached and the new payload and compare the bytes
+            start = time.perf_counter()
+            cached = manager.data_cache[REALTIME_TOPICS[topic].data_key]
+            fast_json.dumps(cached, sort_keys=True) != fast_json.dumps(data, sort_keys=True)
+            compare_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            seq = await manager.publish_topic(topic, data, sources if topic != "financial" else None)
+            publish_seconds += time.perf_counter() - start
+            if seq is not None:
+                # What the updater used to push: the whole dataset on every change
+                full[topic] += len(fast_json.dumps({"type": REALTIME_TOPICS[topic].message_type, "data": data,
+                                                    "timestamp": datetime.now().isoformat()}))
+        await _drain(manager, socket)
+
+    print(f"{CLIENTS} clients, {CHANGES_PER_CYCLE} client changes per cycle, {CYCLES} cycles, one subscriber\n")
+    print(f"{'topic':<11} {'snapshot KB':>12} {'full KB/cycle':>14} {'delta KB/cycle':>15} {'saved':>8}")
+    for topic in REALTIME_TOPICS:
+        print(f"{topic:<11} {initial[topic] / 1024:>12.1f} {full[topic] / 1024 / CYCLES:>14.1f} "
+              f"{socket.bytes[topic] / 1024 / CYCLES:>15.2f} {1 - socket.bytes[topic] / max(full[topic], 1):>8.2%}")
+    total_full, total_delta = sum(full.values()), sum(socket.bytes.values())
+    print(f"{'total':<11} {sum(initial.values()) / 1024:>12.1f} {total_full / 1024 / CYCLES:>14.1f} "
+          f"{total_delta / 1024 / CYCLES:>15.2f} {1 - total_delta / total_full:>8.2%}")
+    print(f"\nold change check alone (serialize both payloads): {compare_seconds * 1000 / CYCLES:.1f} ms per cycle")
+    print(f"fingerprint check + delta + encode:               {publish_seconds * 1000 / CYCLES:.1f} ms per cycle")
+    print(manager.delta_counters)
+    manager.disconnect(socket)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
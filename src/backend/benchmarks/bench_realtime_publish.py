@@ -0,0 +1,98 @@
+"""
+Realtime Publish Micro-Benchmark
+Cost of publishing one topic update against its subscriber count, with the other topics' subscribers also
+connected: the old scan over every connection against the topic index, plus disconnect cost
+
+Run from src/backend:  python -m benchmarks.bench_realtime_publish
+"""
+import asyncio
+import gc
+import logging
+import time
+
+from fastapi.websockets import WebSocketState
+
+import fast_json
+from realtime_updates import ConnectionManager
+
+CONNECTIONS = 20_000
+SUBSCRIBER_COUNTS = (10, 100, 1_000, 10_000)
+OTHER_TOPICS = ("financial", "anomalies", "upsells")
+PUBLISHES = 200
+MESSAGE = {"type": "license_update", "data": {"optimizations": [], "total_annual_savings": 0}}
+
+
+class IdleSocket:
+    """Never written to during the measurement: writers only run once the loop gets control back"""
+
+    client_state = WebSocketState.CONNECTED
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        pass
+
+
+async def _scan_publish(manager: ConnectionManager, topic: str):
+    """The pre-index broadcast: check every connection's subscription set"""
+    frame = fast_json.dumps_str(MESSAGE)
+    for connection in manager.active_connections:
+        subscriptions = manager.connection_subscriptions[connection]
+        if topic not in subscriptions and "all" not in subscriptions:
+            continue
+        manager.channels[connection].enqueue(frame, topic)
+
+
+async def _per_publish_us(manager: ConnectionManager, publish) -> float:
+    # Start each measurement from empty queues and a collected heap, so neither pays for the other's frames
+    for channel in manager.channels.values():
+        channel.pending.clear()
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(PUBLISHES):
+        await publish()
+    return (time.perf_counter() - start) * 1e6 / PUBLISHES
+
+
+async def _run(subscribers: int):
+    manager = ConnectionManager(queue_size=PUBLISHES * 2, policy="drop_oldest")
+    sockets = [IdleSocket() for _ in range(CONNECTIONS)]
+    for i, socket in enumerate(sockets):
+        topic = "licenses" if i < subscribers else OTHER_TOPICS[i % len(OTHER_TOPICS)]
+        await manager.connect(socket, [topic])
+
+    scan = await _per_publish_us(manager, lambda: _scan_publish(manager, "licenses"))
+    indexed = await _per_publish_us(manager, lambda: manager.publish(MESSAGE, "licenses"))
+    encodes = manager.frames_encoded / PUBLISHES
+
+    # Disconnect a quarter of the connections: list.remove was O(n) per call
+    leaving = sockets[::4]
+    as_list = list(sockets)
+    start = time.perf_counter()
+    for socket in leaving:
+        as_list.remove(socket)
+    list_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for socket in leaving:
+        manager.disconnect(socket)
+    index_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{subscribers:>11} {scan:>12.0f} {indexed:>12.0f} {scan / indexed:>8.1f}x {encodes:>8.0f} "
+          f"{list_ms:>12.1f} {index_ms:>12.1f}")
+    for socket in sockets:
+        manager.disconnect(socket)
+    await asyncio.sleep(0)
+
+
+async def main():
+    logging.disable(logging.ERROR)
+    print(f"{CONNECTIONS} connections, publishing to 'licenses'; the rest subscribe to other topics\n")
+    print(f"{'subscribers':>11} {'scan us':>12} {'indexed us':>12} {'speedup':>9} {'encodes':>8} "
+          f"{'list rm ms':>12} {'index rm ms':>12}")
+    for subscribers in SUBSCRIBER_COUNTS:
+        await _run(subscribers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
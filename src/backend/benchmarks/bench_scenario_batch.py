@@ -0,0 +1,42 @@
+"""
+Batch Scenario Grid Benchmark
+One /scenario/simulate/batch sweep versus the equivalent per-client /scenario/simulate calls
+
+Run from src/backend:  python -m benchmarks.bench_scenario_batch
+"""
+import time
+
+import app
+from benchmarks.synthetic import make_clients
+
+SIZES = (1_000, 10_000)
+PERCENTAGES = [float(p) for p in range(1, 21)]
+
+
+def main():
+    print(f"{'clients':>8} {'cells':>9} {'batch ms':>10} {'per-call loop ms':>17}")
+    for size in SIZES:
+        app.MOCK_CLIENTS.clear()
+        app.MOCK_CLIENTS.update(make_clients(size))
+        app.portfolio_aggregates.load(app.MOCK_CLIENTS)
+        app.get_client_frame()
+
+        request = app.BatchScenarioRequest(scenario_type="price_increase", grid={"percentage": PERCENTAGES})
+        start = time.perf_counter()
+        app.simulate_scenario_batch(request)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        # Handler cost only; real per-call traffic also pays an HTTP round trip per cell
+        start = time.perf_counter()
+        for client_id in app.MOCK_CLIENTS:
+            for percentage in PERCENTAGES:
+                app.simulate_scenario(app.ScenarioRequest(
+                    scenario_type="price_increase", client_id=client_id, parameters={"percentage": percentage}
+                ))
+        loop_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{size:>8} {size * len(PERCENTAGES):>9} {batch_ms:>10.2f} {loop_ms:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Serialization Benchmark
+jsonable_encoder + stdlib json vs the fast serializer on the largest endpoints, with end-to-end p50/p99 latency
+
+Run from src/backend:  python -m benchmarks.bench_serialization
+"""
+import json
+import statistics
+import time
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+import app
+import fast_json
+from fast_json import FastJSONResponse, FastJSONRoute
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 20_000
+ENDPOINTS = {
+    "/reports/weekly": app.get_weekly_report,
+    "/performance/scoreboard": app.get_performance_scoreboard,
+    "/system/complete-status": app.get_complete_system_status,
+    "/profitability/clients": app.get_client_profitability,
+    "/licenses/optimization": app.get_license_optimization,
+}
+REQUESTS = 60
+
+
+def _median_ms(fn, repeat: int = 10) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _latency(client: TestClient, path: str):
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def _mirror(fast: bool) -> TestClient:
+    """The benchmarked routes on a bare app (no ETag cache), with or without the fast JSON path"""
+    mirror = FastAPI(default_response_class=FastJSONResponse) if fast else FastAPI()
+    if fast:
+        mirror.router.route_class = FastJSONRoute
+    for path, handler in ENDPOINTS.items():
+        mirror.add_api_route(path, handler, methods=["GET"])
+    return TestClient(mirror)
+
+
+def main():
+    app.MOCK_CLIENTS.clear()
+    app.MOCK_CLIENTS.update(make_clients(CLIENTS))
+    app.portfolio_aggregates.load(app.MOCK_CLIENTS)
+    app.get_portfolio_analysis()
+    print(f"{CLIENTS} synthetic clients, serializer backend: {fast_json.backend}\n")
+
+    before_client, after_client = _mirror(fast=False), _mirror(fast=True)
+    print(f"{'endpoint':<26} {'bytes':>10} {'stdlib ms':>10} {'fast ms':>9} {'speedup':>8}")
+    for path in ENDPOINTS:
+        body = fast_json.loads(after_client.get(path).content)
+        size = len(fast_json.dumps(body))
+        before = _median_ms(lambda: json.dumps(jsonable_encoder(body)).encode())
+        after = _median_ms(lambda: fast_json.dumps(body))
+        print(f"{path:<26} {size:>10} {before:>10.2f} {after:>9.2f} {before / after:>7.1f}x")
+
+    print(f"\n{'endpoint':<26} {'p50 before':>11} {'p99 before':>11} {'p50 after':>10} {'p99 after':>10}")
+    for path in ENDPOINTS:
+        p50_before, p99_before = _latency(before_client, path)
+        p50_after, p99_after = _latency(after_client, path)
+        print(f"{path:<26} {p50_before:>11.2f} {p99_before:>11.2f} {p50_after:>10.2f} {p99_after:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+SuperOps Enrichment Benchmark
+Serial per-client enrichment vs the bounded fan-out against a local stand-in with injected latency
+
+Run from src/backend:  python -m benchmarks.bench_superops_enrichment
+"""
+import asyncio
+import time
+
+import aiohttp
+
+from superops_integration import SuperOpsAPI
+from superops_standin import SuperOpsStandIn
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 2_000
+LATENCY = 0.02
+# The serial path is timed on a subset and extrapolated; a full run would take CLIENTS * 3 * LATENCY seconds
+SERIAL_SAMPLE = 100
+CONCURRENCY = (1, 8, 16, 32, 64)
+
+
+async def _serial(api: SuperOpsAPI, sample: int) -> float:
+    """The previous path: one client at a time, contracts, tickets and licenses one after another"""
+    async with aiohttp.ClientSession() as session:
+        clients = [client async for client in api.iter_clients()][:sample]
+        start = time.perf_counter()
+        for client in clients:
+            await api._get_client_financial_metrics(session, client["id"])
+            await api._get_client_tickets(session, client["id"])
+            await api._fetch_license_usage_data(client["id"])
+        return time.perf_counter() - start
+
+
+async def _fan_out(api: SuperOpsAPI, concurrency: int):
+    """(seconds to the first streamed client, seconds for the whole tenant, clients received)"""
+    start = time.perf_counter()
+    first, received = None, 0
+    async for _ in api.iter_all_clients(concurrency=concurrency):
+        received += 1
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, received
+
+
+async def main():
+    standin = SuperOpsStandIn(make_clients(CLIENTS), latency=LATENCY)
+    api = SuperOpsAPI(base_url=await standin.start(), api_key="bench", tenant_id="bench")
+    print(f"{CLIENTS} clients, {LATENCY * 1000:.0f} ms injected latency per request\n")
+    print(f"{'mode':<16} {'first ms':>9} {'total s':>9} {'clients/s':>10} {'peak in flight':>15} {'speedup':>8}")
+    try:
+        serial = await _serial(api, SERIAL_SAMPLE) * CLIENTS / SERIAL_SAMPLE
+        print(f"{'serial (est.)':<16} {LATENCY * 3000:>9.0f} {serial:>9.2f} {CLIENTS / serial:>10.1f} {1:>15} {1:>7.1f}x")
+        for concurrency in CONCURRENCY:
+            standin.reset_stats()
+            first, total, received = await _fan_out(api, concurrency)
+            assert received == CLIENTS
+            print(f"{f'fan-out {concurrency}':<16} {first * 1000:>9.0f} {total:>9.2f} {CLIENTS / total:>10.1f} "
+                  f"{standin.peak_in_flight:>15} {serial / total:>7.1f}x")
+    finally:
+        await api.close()
+        await standin.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
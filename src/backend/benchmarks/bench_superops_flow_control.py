@@ -0,0 +1,92 @@
+"""
+SuperOps Flow Control Benchmark
+Enrichment against a fault-injecting stand-in (rate limit with Retry-After, random 502s, latency growing under
+overload) with no flow control, retries only, AIMD + retries, and AIMD + retries + a per-tenant token bucket
+
+Run from src/backend:  python -m benchmarks.bench_superops_flow_control
+"""
+import asyncio
+import logging
+import time
+
+from flow_control import AIMDLimiter, FlowControl, RetryPolicy
+from superops_integration import SuperOpsAPI, CONNECTION_LIMIT_PER_HOST
+from superops_standin import SuperOpsStandIn
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 500
+LATENCY = 0.02
+# Upstream behaviour: requests per second before 429s, random 502 share, concurrency before latency degrades
+SERVER_RATE_LIMIT = 400
+ERROR_RATE = 0.05
+SERVER_CAPACITY = 32
+ENRICH_CONCURRENCY = 64
+# Latency the adaptive window treats as overload: a few times the unloaded round trip
+LATENCY_TARGET = LATENCY * 3
+
+
+def _unbounded() -> AIMDLimiter:
+    """An effectively unlimited window, for the modes without adaptive concurrency"""
+    return AIMDLimiter(initial=10_000, maximum=10_000)
+
+
+def _adaptive() -> AIMDLimiter:
+    return AIMDLimiter(maximum=CONNECTION_LIMIT_PER_HOST, latency_target=LATENCY_TARGET)
+
+
+MODES = {
+    "no flow control": lambda: FlowControl(limiter=_unbounded(), retry=RetryPolicy(max_attempts=1)),
+    "retries only": lambda: FlowControl(limiter=_unbounded()),
+    "AIMD + retries": lambda: FlowControl(limiter=_adaptive()),
+    "AIMD + retries + bucket": lambda: FlowControl(rate=SERVER_RATE_LIMIT * 0.9, limiter=_adaptive()),
+}
+
+
+def _wrong(clients, expected) -> int:
+    """Clients whose enrichment silently lost data to an upstream error"""
+    return sum(
+        1 for client in clients
+        if client["monthly_revenue"] != expected[client["id"]]["monthly_revenue"]
+        or client["tickets_last_month"] != expected[client["id"]]["tickets_last_month"]
+        or set(client["licenses"]) != set(expected[client["id"]]["licenses"])
+    )
+
+
+async def _run(name: str, flow_control: FlowControl, expected):
+    standin = SuperOpsStandIn(make_clients(CLIENTS), latency=LATENCY, error_rate=ERROR_RATE,
+                              rate_limit=SERVER_RATE_LIMIT, capacity=SERVER_CAPACITY, seed=11)
+    api = SuperOpsAPI(base_url=await standin.start(), api_key="bench", tenant_id="bench",
+                      enrich_concurrency=ENRICH_CONCURRENCY, flow_control=flow_control)
+    try:
+        start = time.perf_counter()
+        try:
+            clients = await api._fetch_all_clients()
+            wrong = str(_wrong(clients, expected))
+        except Exception:
+            # get_all_clients would have served mock data for the whole tenant
+            wrong = "all"
+        elapsed = time.perf_counter() - start
+        served = standin.stats()
+        control = flow_control.stats()
+        print(f"{name:<26} {elapsed:>8.2f} {served['total_requests']:>9} {served['rejections'].get(429, 0):>6} "
+              f"{served['rejections'].get(502, 0):>6} {control['retries']:>8} {served['peak_in_flight']:>6} "
+              f"{wrong:>6}")
+    finally:
+        await api.close()
+        await standin.stop()
+
+
+async def main():
+    logging.disable(logging.ERROR)
+    expected = make_clients(CLIENTS)
+    print(f"{CLIENTS} clients, {LATENCY * 1000:.0f} ms latency, server limit {SERVER_RATE_LIMIT} req/s, "
+          f"{ERROR_RATE:.0%} random 502s, degrades beyond {SERVER_CAPACITY} concurrent, "
+          f"enrichment fan-out {ENRICH_CONCURRENCY}\n")
+    print(f"{'mode':<26} {'seconds':>8} {'requests':>9} {'429s':>6} {'502s':>6} {'retries':>8} {'peak':>6} "
+          f"{'wrong':>6}")
+    for name, build in MODES.items():
+        await _run(name, build(), expected)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
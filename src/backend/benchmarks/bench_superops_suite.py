@@ -0,0 +1,92 @@
+"""
+SuperOps End-to-End Benchmark Suite
+get_all_clients, get_financial_dashboard_data and streaming enrichment through the live HTTP paths of
+SuperOpsAPI, against synthetic stand-in tenants (or a recorded session) with tunable latency and error rate
+
+Run from src/backend:  python -m benchmarks.bench_superops_suite [--latency 0.02] [--error-rate 0.01]
+                       python -m benchmarks.bench_superops_suite --replay captured.jsonl
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from superops_integration import SuperOpsAPI
+from superops_standin import SuperOpsStandIn, ResponseRecording
+from benchmarks.synthetic import make_clients
+
+# (name, clients, tickets per client)
+TENANTS = (
+    ("small", 100, 10),
+    ("medium", 500, 20),
+    ("large", 2_000, 40),
+)
+
+
+async def _get_all_clients(api: SuperOpsAPI):
+    api.cache.clear()
+    return len(await api.get_all_clients())
+
+
+async def _dashboard_cold(api: SuperOpsAPI):
+    api.cache.clear()
+    return (await api.get_financial_dashboard_data())["total_clients"]
+
+
+async def _dashboard_warm(api: SuperOpsAPI):
+    return (await api.get_financial_dashboard_data())["total_clients"]
+
+
+async def _enrichment_stream(api: SuperOpsAPI):
+    return sum([1 async for _ in api.iter_all_clients()])
+
+
+SCENARIOS = (
+    ("get_all_clients (cold)", _get_all_clients),
+    ("dashboard (cold cache)", _dashboard_cold),
+    ("dashboard (warm cache)", _dashboard_warm),
+    ("enrichment stream", _enrichment_stream),
+)
+
+
+async def _run_tenant(name: str, standin: SuperOpsStandIn):
+    api = SuperOpsAPI(base_url=await standin.start(), api_key="bench", tenant_id="bench")
+    try:
+        for scenario, run in SCENARIOS:
+            standin.reset_stats()
+            retries_before = api.flow_control_stats()["retries"]
+            start = time.perf_counter()
+            clients = await run(api)
+            elapsed = time.perf_counter() - start
+            stats = standin.stats()
+            print(f"{name:<10} {scenario:<24} {clients:>8} {elapsed:>9.3f} {stats['total_requests']:>9} "
+                  f"{api.flow_control_stats()['retries'] - retries_before:>8} {stats['peak_in_flight']:>6}")
+    finally:
+        await api.close()
+        await standin.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--replay", help="run against a recorded session instead of synthetic tenants")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    print(f"latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.1%}\n")
+    print(f"{'tenant':<10} {'scenario':<24} {'clients':>8} {'seconds':>9} {'requests':>9} {'retries':>8} "
+          f"{'peak':>6}")
+    if args.replay:
+        recording = ResponseRecording.load(args.replay)
+        await _run_tenant("replay", SuperOpsStandIn(replay=recording, latency=args.latency,
+                                                    error_rate=args.error_rate, seed=1))
+        return
+    for name, clients, tickets in TENANTS:
+        standin = SuperOpsStandIn(make_clients(clients, tickets_per_client=tickets), latency=args.latency,
+                                  error_rate=args.error_rate, seed=1)
+        await _run_tenant(name, standin)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
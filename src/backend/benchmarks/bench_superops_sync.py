@@ -0,0 +1,82 @@
+"""
+SuperOps Sync Benchmark
+Upstream requests and latency of a full re-download vs watermark-based incremental sync, and dashboard reads
+served from the local store vs from SuperOps
+
+Run from src/backend:  python -m benchmarks.bench_superops_sync
+"""
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from superops_integration import SuperOpsAPI
+from superops_standin import SuperOpsStandIn
+from superops_sync import SuperOpsSync
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 2_000
+LATENCY = 0.02
+CHANGED_FRACTION = 0.01
+CYCLES = 3
+
+
+def _mutate(standin: SuperOpsStandIn, rng: random.Random):
+    """Touch CHANGED_FRACTION of the clients: a contract change, a new ticket or a license change each"""
+    for client_id in rng.sample(list(standin.clients), int(CLIENTS * CHANGED_FRACTION)):
+        change = rng.randrange(3)
+        if change == 0:
+            standin.set_monthly_revenue(client_id, rng.randint(800, 9000))
+        elif change == 1:
+            standin.add_ticket(client_id)
+        else:
+            name = next(iter(standin.clients[client_id]["licenses"]))
+            standin.set_license_usage(client_id, name, 0)
+
+
+async def _measure(standin: SuperOpsStandIn, fn):
+    standin.reset_stats()
+    start = time.perf_counter()
+    result = await fn()
+    return result, time.perf_counter() - start, standin.stats()["total_requests"]
+
+
+async def main():
+    rng = random.Random(3)
+    standin = SuperOpsStandIn(make_clients(CLIENTS), latency=LATENCY)
+    api = SuperOpsAPI(base_url=await standin.start(), api_key="bench", tenant_id="bench")
+    db_path = os.path.join(tempfile.mkdtemp(), "superops.db")
+    sync = SuperOpsSync(api, db_path)
+    print(f"{CLIENTS} clients, {LATENCY * 1000:.0f} ms injected latency, "
+          f"{CHANGED_FRACTION:.0%} of clients changed between refreshes\n")
+    print(f"{'refresh':<34} {'requests':>9} {'records':>9} {'seconds':>9}")
+    try:
+        _, elapsed, requests = await _measure(standin, api._fetch_all_clients)
+        print(f"{'full re-download (fan-out 16)':<34} {requests:>9} {CLIENTS:>9} {elapsed:>9.2f}")
+
+        pulled, elapsed, requests = await _measure(standin, sync.sync)
+        print(f"{'initial sync':<34} {requests:>9} {sum(pulled.values()):>9} {elapsed:>9.2f}")
+        for cycle in range(CYCLES):
+            _mutate(standin, rng)
+            pulled, elapsed, requests = await _measure(standin, sync.sync)
+            print(f"{f'incremental sync #{cycle + 1}':<34} {requests:>9} {sum(pulled.values()):>9} {elapsed:>9.2f}")
+        pulled, elapsed, requests = await _measure(standin, sync.sync)
+        print(f"{'incremental sync, nothing changed':<34} {requests:>9} {sum(pulled.values()):>9} {elapsed:>9.2f}")
+
+        print(f"\n{'dashboard read':<34} {'requests':>9} {'ms':>9}")
+        api.cache.clear()
+        _, elapsed, requests = await _measure(standin, api.get_financial_dashboard_data)
+        print(f"{'from SuperOps (cold cache)':<34} {requests:>9} {elapsed * 1000:>9.1f}")
+        sync.attach()
+        api.cache.clear()
+        _, elapsed, requests = await _measure(standin, api.get_financial_dashboard_data)
+        print(f"{'from local store (cold cache)':<34} {requests:>9} {elapsed * 1000:>9.1f}")
+    finally:
+        await sync.stop()
+        await api.close()
+        await standin.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+SuperOps Webhooks Benchmark
+Sustained change events per second through the webhook queue at several batch sizes, against rebuilding the
+whole client list for every event (what the polling refresh amounts to)
+
+Run from src/backend:  python -m benchmarks.bench_superops_webhooks
+"""
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from superops_integration import SuperOpsAPI
+from superops_standin import SuperOpsStandIn
+from superops_sync import SuperOpsSync
+from superops_webhooks import WebhookProcessor
+from benchmarks.synthetic import make_clients
+
+CLIENTS = 2_000
+EVENTS = 20_000
+# Events per HTTP delivery, as SuperOps would post them
+DELIVERY_SIZE = 50
+BATCH_SIZES = (1, 50, 500)
+FULL_REBUILD_SAMPLE = 20
+
+
+def _make_events(standin: SuperOpsStandIn, count: int, rng: random.Random):
+    """Contract changes and new tickets on random clients, as the payloads SuperOps would deliver"""
+    client_ids = list(standin.clients)
+    events = []
+    while len(events) < count:
+        client_id = rng.choice(client_ids)
+        if rng.random() < 0.5:
+            standin.set_monthly_revenue(client_id, rng.randint(800, 9000))
+            events += [standin.webhook_event("contracts", record) for record in standin.records("contracts", client_id)]
+        else:
+            ticket_id = standin.add_ticket(client_id)
+            events += [standin.webhook_event("tickets", record, "created")
+                       for record in standin.records("tickets", client_id) if record["id"] == ticket_id]
+    return events[:count]
+
+
+async def _pushes(topic, clients):
+    pass
+
+
+async def main():
+    logging.disable(logging.INFO)
+    rng = random.Random(5)
+    standin = SuperOpsStandIn(make_clients(CLIENTS))
+    api = SuperOpsAPI(base_url=await standin.start(), api_key="bench", tenant_id="bench")
+    sync = SuperOpsSync(api, os.path.join(tempfile.mkdtemp(), "superops.db"))
+    try:
+        sync.attach()
+        await sync.sync()
+        await api.get_all_clients()
+        print(f"{CLIENTS} clients in the local store, {EVENTS} events in deliveries of {DELIVERY_SIZE}\n")
+        print(f"{'mode':<28} {'events/s':>10} {'batches':>8} {'avg batch':>10} {'refreshed':>10}")
+
+        sample = _make_events(standin, FULL_REBUILD_SAMPLE, rng)
+        start = time.perf_counter()
+        for _ in sample:
+            api.cache.invalidate(("clients",))
+            await api.get_all_clients()
+        rate = len(sample) / (time.perf_counter() - start)
+        print(f"{'full rebuild per event':<28} {rate:>10,.0f} {len(sample):>8} {1:>10} {CLIENTS * len(sample):>10}")
+
+        for batch_size in BATCH_SIZES:
+            events = _make_events(standin, EVENTS, rng)
+            processor = WebhookProcessor(api, sync, secret="", queue_size=EVENTS, batch_size=batch_size,
+                                         publish=_pushes)
+            deliveries = [processor.parse({"events": events[i:i + DELIVERY_SIZE]})
+                          for i in range(0, len(events), DELIVERY_SIZE)]
+            start = time.perf_counter()
+            for delivery in deliveries:
+                processor.submit(delivery)
+                # Let the consumer run between deliveries, as it would between HTTP requests
+                await asyncio.sleep(0)
+            await processor.drain()
+            elapsed = time.perf_counter() - start
+            stats = processor.stats()
+            await processor.stop()
+            print(f"{f'webhooks, batch {batch_size}':<28} {EVENTS / elapsed:>10,.0f} {stats['batches']:>8} "
+                  f"{stats['average_batch']:>10} {stats['clients_refreshed']:>10}")
+    finally:
+        await sync.stop()
+        await api.close()
+        await standin.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
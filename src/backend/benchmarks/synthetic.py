@@ -0,0 +1,49 @@
+"""
+Synthetic Portfolio Generator
+Builds MOCK_CLIENTS-shaped portfolios of arbitrary size for benchmarks
+"""
+import random
+from typing import Dict, Any, Optional
+
+LICENSE_CATALOG = {
+    "microsoft_365": 12,
+    "adobe_creative": 52,
+    "antivirus": 8,
+    "security_suite": 45,
+    "backup_agent": 15,
+    "rmm_agent": 3
+}
+SERVICES = ["IT Support", "Cloud Management", "Network Management", "Backup Services",
+            "Cybersecurity", "Compliance Management"]
+NAME_PARTS = ["Tech", "Retail", "Health", "Finance", "Legal", "Logistics", "Media", "Build"]
+
+
+def make_clients(count: int, seed: int = 7, tickets_per_client: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Generate `count` clients with 1-4 licenses each and `tickets_per_client` tickets (random 0-60 by default)"""
+    rng = random.Random(seed)
+    clients = {}
+    for i in range(count):
+        revenue = rng.randint(800, 9000)
+        cost = int(revenue * rng.uniform(0.6, 1.3))
+        licenses = {}
+        for license_type in rng.sample(list(LICENSE_CATALOG), rng.randint(1, 4)):
+            total = rng.randint(5, 80)
+            licenses[license_type] = {
+                "total": total,
+                "used": rng.randint(0, total),
+                "cost_per_license": LICENSE_CATALOG[license_type]
+            }
+        clients[f"client_{i}"] = {
+            "name": f"{rng.choice(NAME_PARTS)} Client {i}",
+            "monthly_revenue": revenue,
+            "monthly_cost": cost,
+            "margin": revenue - cost,
+            "contract_value": revenue * 12,
+            "services": rng.sample(SERVICES, 2),
+            "tickets_last_month": rng.randint(0, 60),
+            "security_incidents": rng.randint(0, 10),
+            "licenses": licenses
+        }
+        if tickets_per_client is not None:
+            clients[f"client_{i}"]["tickets_last_month"] = tickets_per_client
+    return clients
@@ -0,0 +1,141 @@
+"""
+Client Frame
+Columnar, NumPy-backed portfolio store for vectorized client analytics
+"""
+import logging
+from functools import cached_property
+from typing import Dict, List, Any, Iterable, Mapping
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ClientFrame:
+    """
+    Columnar view of the client portfolio
+    Holds one array per client metric plus a flattened license table keyed by client index
+    """
+
+    def __init__(self, ids: List[str], names: List[str], services: List[List[str]],
+                 columns: Dict[str, np.ndarray], license_types: List[str],
+                 license_columns: Dict[str, np.ndarray]):
+        self.ids = np.array(ids, dtype=object)
+        self.names = np.array(names, dtype=object)
+        self.services = services
+        self.monthly_revenue = columns["monthly_revenue"]
+        self.monthly_cost = columns["monthly_cost"]
+        self.margin = columns["margin"]
+        self.contract_value = columns["contract_value"]
+        self.tickets_last_month = columns["tickets_last_month"]
+        self.security_incidents = columns["security_incidents"]
+        self.is_healthcare = np.fromiter(
+            ("health" in name.lower() for name in names), dtype=bool, count=len(names)
+        )
+
+        # Flattened license table: one row per (client, license type)
+        self.license_client_idx = license_columns["client_idx"]
+        self.license_total = license_columns["total"]
+        self.license_used = license_columns["used"]
+        self.license_cost = license_columns["cost_per_license"]
+        self.license_type_codes, self.license_type_names = self._encode_license_types(license_types)
+
+        self._index = {client_id: i for i, client_id in enumerate(ids)}
+
+    @classmethod
+    def from_clients(cls, clients: Mapping[str, Dict[str, Any]]) -> "ClientFrame":
+        """Build a frame from the id-keyed client mapping used by the API"""
+        return cls.from_records({"id": client_id, **data} for client_id, data in clients.items())
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ClientFrame":
+        """Build a frame from a list of client dicts carrying their own 'id' (SuperOps shape)"""
+        ids, names, services = [], [], []
+        revenue, cost, margin, contract_value, tickets, incidents = [], [], [], [], [], []
+        license_client_idx, license_types, license_total, license_used, license_cost = [], [], [], [], []
+
+        for i, client in enumerate(records):
+            ids.append(client.get("id"))
+            names.append(client.get("name", ""))
+            services.append(client.get("services", []))
+            client_revenue = client.get("monthly_revenue", 0)
+            client_cost = client.get("monthly_cost", 0)
+            revenue.append(client_revenue)
+            cost.append(client_cost)
+            margin.append(client.get("margin", client_revenue - client_cost))
+            contract_value.append(client.get("contract_value", 0))
+            tickets.append(client.get("tickets_last_month", 0))
+            incidents.append(client.get("security_incidents", 0))
+
+            for license_type, license_data in (client.get("licenses") or {}).items():
+                license_client_idx.append(i)
+                license_types.append(license_type)
+                license_total.append(license_data.get("total", 0))
+                license_used.append(license_data.get("used", 0))
+                license_cost.append(license_data.get("cost_per_license", 0))
+
+        columns = {
+            "monthly_revenue": cls._money_column(revenue),
+            "monthly_cost": cls._money_column(cost),
+            "margin": cls._money_column(margin),
+            "contract_value": cls._money_column(contract_value),
+            "tickets_last_month": np.array(tickets, dtype=np.int64),
+            "security_incidents": np.array(incidents, dtype=np.int64),
+        }
+        license_columns = {
+            "client_idx": np.array(license_client_idx, dtype=np.int64),
+            "total": np.array(license_total, dtype=np.int64),
+            "used": np.array(license_used, dtype=np.int64),
+            "cost_per_license": cls._money_column(license_cost),
+        }
+        return cls(ids, names, services, columns, license_types, license_columns)
+
+    @staticmethod
+    def _money_column(values: List[Any]) -> np.ndarray:
+        """int64 when every amount is a whole-number int, so rendered rows keep the API's integers; else float64"""
+        if all(type(value) is int for value in values):
+            return np.array(values, dtype=np.int64)
+        return np.array(values, dtype=np.float64)
+
+    @staticmethod
+    def _encode_license_types(license_types: List[str]):
+        """Dictionary-encode license type names so per-type work runs once per distinct type"""
+        if not license_types:
+            return np.zeros(0, dtype=np.int64), np.array([], dtype=object)
+        names, codes = np.unique(np.array(license_types, dtype=object), return_inverse=True)
+        return codes.astype(np.int64), names
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def license_count(self) -> int:
+        return len(self.license_client_idx)
+
+    @staticmethod
+    def ratio_percent(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        """(numerator / denominator) * 100 element-wise, 0 where the denominator is 0"""
+        result = np.zeros(np.shape(numerator), dtype=np.float64)
+        np.divide(numerator, denominator, out=result, where=denominator != 0)
+        return result * 100
+
+    @cached_property
+    def margin_percentage(self) -> np.ndarray:
+        """Unrounded margin as a percentage of monthly revenue"""
+        return self.ratio_percent(self.margin, self.monthly_revenue)
+
+    @cached_property
+    def license_utilization(self) -> np.ndarray:
+        """Unrounded used / total percentage for every license row"""
+        return self.ratio_percent(self.license_used.astype(np.float64), self.license_total)
+
+    @cached_property
+    def license_display_names(self) -> np.ndarray:
+        """Human-readable license names per license row, formatted once per distinct type"""
+        display = np.array([name.replace("_", " ").title() for name in self.license_type_names], dtype=object)
+        return display[self.license_type_codes]
+
+    def index_of(self, client_id: str) -> int:
+        """Row index of a client, or -1 if it is not in the frame"""
+        return self._index.get(client_id, -1)
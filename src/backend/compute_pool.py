@@ -0,0 +1,239 @@
+"""
+Compute Pool
+Process-pool execution tier for CPU-bound analytics, with client columns published through shared memory
+"""
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Callable, Optional, Tuple, Union
+
+import numpy as np
+
+import digital_twin
+import fast_json
+from client_frame import ClientFrame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ClientFrame columns published to the workers; ids are stored as fixed-width unicode
+SHARED_COLUMNS = (
+    "ids", "monthly_revenue", "monthly_cost", "margin", "contract_value", "tickets_last_month",
+    "security_incidents", "license_client_idx", "license_total", "license_used", "license_cost"
+)
+# Modules whose global service instance shares the module's name and may run inside a worker
+SERVICE_MODULES = ("performance_scoreboard", "sustainability_analytics")
+COLUMN_ALIGNMENT = 64
+# Published generations kept alive so tasks queued against the previous data version still resolve
+RETAINED_SEGMENTS = 2
+
+
+class SharedFrameHandle:
+    """Picklable reference to one published block: segment name, data version and column layout"""
+
+    __slots__ = ("segment", "version", "layout")
+
+    def __init__(self, segment: str, version: int, layout: Dict[str, Tuple[int, str, int]]):
+        self.segment = segment
+        self.version = version
+        self.layout = layout
+
+    def __getstate__(self):
+        return self.segment, self.version, self.layout
+
+    def __setstate__(self, state):
+        self.segment, self.version, self.layout = state
+
+
+class SharedFrameView:
+    """Read-only numpy views over a published block, exposing the shared ClientFrame columns"""
+
+    def __init__(self, handle: SharedFrameHandle, buffer: memoryview):
+        self.version = handle.version
+        for column, (offset, dtype, length) in handle.layout.items():
+            view = np.ndarray((length,), dtype=dtype, buffer=buffer, offset=offset)
+            view.flags.writeable = False
+            setattr(self, column, view)
+
+    def __len__(self) -> int:
+        return len(self.monthly_revenue)
+
+
+def _column(frame: ClientFrame, column: str) -> np.ndarray:
+    array = getattr(frame, column)
+    return array.astype(str) if array.dtype == object else np.ascontiguousarray(array)
+
+
+def publish_frame(frame: ClientFrame, version: int) -> Tuple[shared_memory.SharedMemory, SharedFrameHandle]:
+    """Copy the shared columns into a new shared memory block, once per data version"""
+    columns = {column: _column(frame, column) for column in SHARED_COLUMNS}
+    layout, size = {}, 0
+    for column, array in columns.items():
+        size = -(-size // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+        layout[column] = (size, array.dtype.str, len(array))
+        size += array.nbytes
+
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for column, (offset, dtype, length) in layout.items():
+        np.ndarray((length,), dtype=dtype, buffer=segment.buf, offset=offset)[:] = columns[column]
+    return segment, SharedFrameHandle(segment.name, version, layout)
+
+
+def _open_segment(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: the parent owns the block, so the worker must not register it for cleanup
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Per-process attachments, keyed by segment name
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, SharedFrameView]] = {}
+
+
+def attach_frame(source: Union[ClientFrame, SharedFrameHandle]) -> Union[ClientFrame, SharedFrameView]:
+    """Resolve a task's frame argument; inline tasks receive the ClientFrame itself"""
+    if not isinstance(source, SharedFrameHandle):
+        return source
+    entry = _attached.get(source.segment)
+    if entry is None:
+        # A newer version supersedes everything this worker attached before
+        for name in list(_attached):
+            segment, _ = _attached.pop(name)
+            try:
+                segment.close()
+            except BufferError:
+                pass  # A view is still referenced; the mapping goes away with it
+        segment = _open_segment(source.segment)
+        entry = _attached[source.segment] = (segment, SharedFrameView(source, segment.buf))
+    return entry[1]
+
+
+def call_service(module: str, method: str, *args) -> Any:
+    """Call a method on a module's global service instance within the current process"""
+    if module not in SERVICE_MODULES:
+        raise ValueError(f"Service module '{module}' cannot run on the compute pool")
+    service = getattr(importlib.import_module(module), module)
+    return getattr(service, method)(*args)
+
+
+def scenario_batch_task(source: Union[ClientFrame, SharedFrameHandle], scenario_type: str, rows: np.ndarray,
+                        combos: Dict[str, np.ndarray], header: Dict[str, Any]) -> bytes:
+    """Evaluate a batch what-if grid and serialize the /scenario/simulate/batch body"""
+    frame = attach_frame(source)
+    metrics = digital_twin.evaluate_scenario_grid(
+        scenario_type, frame.monthly_revenue[rows], frame.monthly_cost[rows], frame.margin[rows], combos
+    )
+    return fast_json.dumps({
+        **header,
+        "client_ids": frame.ids[rows].tolist(),
+        "metrics": list(metrics),
+        "results": {name: values.tolist() for name, values in metrics.items()},
+        "totals": {name: values.sum(axis=0).tolist() for name, values in metrics.items()}
+    })
+
+
+class ComputePool:
+    """
+    Runs CPU-bound analytics in worker processes so they stop contending for the GIL
+    With ANALYTICS_WORKERS=0 (the default) tasks run on the default threadpool, as sync routes did before
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = int(os.getenv("ANALYTICS_WORKERS", "0")) if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._segments: List[shared_memory.SharedMemory] = []
+        self._handle: Optional[SharedFrameHandle] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_ms = 0.0
+        self.publishes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers must not inherit the event loop, sockets or threads of the server process
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"✅ Compute pool started with {self.workers} worker processes")
+        return self._executor
+
+    def share_frame(self, frame: ClientFrame, version: int) -> Union[ClientFrame, SharedFrameHandle]:
+        """Frame argument for tasks: the frame itself inline, a shared memory handle for workers"""
+        if not self.enabled:
+            return frame
+        if self._handle is None or self._handle.version != version:
+            segment, self._handle = publish_frame(frame, version)
+            self._segments.append(segment)
+            self.publishes += 1
+            while len(self._segments) > RETAINED_SEGMENTS:
+                self._release(self._segments.pop(0))
+        return self._handle
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a module-level function on the pool (or the threadpool when disabled)"""
+        executor = self._get_executor() if self.enabled else None
+        self.submitted += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.total_ms += (time.perf_counter() - start) * 1000
+        self.completed += 1
+        return result
+
+    async def run_service(self, service: Any, method: str, *args) -> Any:
+        """Run a service method on the pool; mock fallbacks defined in app.py stay on the threadpool"""
+        module = type(service).__module__
+        if module in SERVICE_MODULES:
+            return await self.run(call_service, module, method, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, getattr(service, method), *args)
+
+    @staticmethod
+    def _release(segment: shared_memory.SharedMemory):
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for segment in self._segments:
+            self._release(segment)
+        self._segments.clear()
+        self._handle = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "processes" if self.enabled else "threads",
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.submitted - self.completed - self.failed,
+            "avg_task_ms": round(self.total_ms / (self.completed + self.failed), 3)
+            if self.completed + self.failed else 0.0,
+            "shared_frame_version": self._handle.version if self._handle else None,
+            "shared_frame_bytes": self._segments[-1].size if self._segments else 0,
+            "shared_frame_publishes": self.publishes
+        }
+
+
+# Global compute pool for the analytics endpoints
+compute_pool = ComputePool()
@@ -0,0 +1,207 @@
+"""
+Digital Twin Engine
+Vectorized Monte Carlo bands for single-client scenarios and batch what-if grids over the portfolio
+"""
+import logging
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRIALS = 10_000
+MAX_TRIALS = 500_000
+DEFAULT_HORIZON_MONTHS = 12
+
+# Sampling assumptions, overridable per request through ScenarioRequest.parameters
+DEFAULT_ASSUMPTIONS = {
+    "churn_probability": 0.05,    # mean probability the revenue stream is lost within the horizon
+    "churn_concentration": 20.0,  # Beta distribution concentration around that mean
+    "elasticity_mean": 1.5,       # churn probability added per 100% price increase
+    "elasticity_sd": 0.5,
+    "cost_drift_mean": 0.03,      # annualized cost growth
+    "cost_drift_sd": 0.02
+}
+# A churn scenario asks "what if this client leaves", so losing it is the expected case
+CHURN_SCENARIO_PROBABILITY = 0.5
+
+
+def _bands(values: np.ndarray) -> Dict[str, float]:
+    """P5/P50/P95 and mean of a trial outcome"""
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {
+        "p5": round(float(p5), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "mean": round(float(values.mean()), 2)
+    }
+
+
+class MonteCarloTwin:
+    """
+    Monte Carlo digital twin of a single client
+    Samples churn probability, price elasticity and cost drift across many vectorized trials
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    def _sample_churn_probability(self, mean: float, concentration: float, trials: int) -> np.ndarray:
+        mean = float(np.clip(mean, 1e-6, 1 - 1e-6))
+        return self.rng.beta(mean * concentration, (1 - mean) * concentration, size=trials)
+
+    def _simulate_stream(self, monthly_revenue: float, monthly_cost: float, churn_probability: np.ndarray,
+                         cost_drift: np.ndarray, months: int) -> Dict[str, np.ndarray]:
+        """
+        Closed-form margin and cashflow of one revenue stream per trial
+        A churned stream stops at a uniformly drawn month; revenue is collected one month in arrears (net 30)
+        """
+        trials = len(churn_probability)
+        churned = self.rng.random(trials) < churn_probability
+        churn_month = self.rng.integers(0, months, size=trials)
+        active_months = np.where(churned, churn_month, months).astype(np.float64)
+
+        # Cost grows linearly with the annualized drift: month t costs cost * (1 + drift * t / 12)
+        cost_paid = monthly_cost * (active_months + cost_drift * active_months * (active_months + 1) / 24)
+        revenue_earned = monthly_revenue * active_months
+        # The final month of a stream that runs to the horizon is still outstanding
+        revenue_collected = monthly_revenue * np.where(churned, active_months, np.maximum(active_months - 1, 0))
+
+        return {
+            "margin": revenue_earned - cost_paid,
+            "cashflow": revenue_collected - cost_paid,
+            "churned": churned
+        }
+
+    def simulate(self, scenario_type: str, client_data: Dict[str, Any],
+                 parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the scenario for `trials` samples and summarize the outcome distribution"""
+        start = time.perf_counter()
+        trials = int(parameters.get("trials", DEFAULT_TRIALS))
+        if not 1 <= trials <= MAX_TRIALS:
+            raise ValueError(f"trials must be between 1 and {MAX_TRIALS}")
+        months = int(parameters.get("months", DEFAULT_HORIZON_MONTHS))
+        if months < 1:
+            raise ValueError("months must be at least 1")
+
+        assumptions = {key: float(parameters.get(key, default)) for key, default in DEFAULT_ASSUMPTIONS.items()}
+        if scenario_type == "client_churn" and "churn_probability" not in parameters:
+            assumptions["churn_probability"] = CHURN_SCENARIO_PROBABILITY
+
+        revenue = float(client_data["monthly_revenue"])
+        cost = float(client_data["monthly_cost"])
+        cost_drift = self.rng.normal(assumptions["cost_drift_mean"], assumptions["cost_drift_sd"], size=trials)
+        churn_probability = self._sample_churn_probability(
+            assumptions["churn_probability"], assumptions["churn_concentration"], trials
+        )
+
+        if scenario_type == "price_increase":
+            increase = float(parameters.get("percentage", 10)) / 100
+            elasticity = self.rng.normal(assumptions["elasticity_mean"], assumptions["elasticity_sd"], size=trials)
+            churn_probability = np.clip(churn_probability + np.maximum(elasticity, 0) * increase, 0, 1)
+            revenue *= 1 + increase
+        elif scenario_type == "service_addition":
+            revenue += float(parameters.get("monthly_revenue", 1000))
+            cost += float(parameters.get("monthly_cost", 600))
+        elif scenario_type != "client_churn":
+            raise ValueError(f"Unsupported scenario type: {scenario_type}")
+
+        outcome = self._simulate_stream(revenue, cost, churn_probability, cost_drift, months)
+        baseline_margin = float(client_data["monthly_revenue"] - client_data["monthly_cost"]) * months
+
+        return {
+            "trials": trials,
+            "horizon_months": months,
+            "assumptions": assumptions,
+            "margin": _bands(outcome["margin"]),
+            "margin_vs_baseline": _bands(outcome["margin"] - baseline_margin),
+            "cashflow": _bands(outcome["cashflow"]),
+            "churn_rate": round(float(outcome["churned"].mean()), 4),
+            "probability_of_loss": round(float((outcome["margin"] < 0).mean()), 4),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+
+def run_monte_carlo(scenario_type: str, client_data: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Simulate a scenario with a fresh, optionally seeded, RNG"""
+    seed = parameters.get("seed")
+    result = MonteCarloTwin(seed=None if seed is None else int(seed)).simulate(
+        scenario_type, client_data, parameters
+    )
+    result["seed"] = seed
+    return result
+
+
+# Grid parameters per scenario and their defaults, mirroring the single-client simulators in app.py
+GRID_PARAMETERS = {
+    "client_churn": {"months": 3},
+    "service_addition": {"monthly_revenue": 1000, "monthly_cost": 600, "months": 12},
+    "price_increase": {"percentage": 10}
+}
+MAX_GRID_CELLS = 5_000_000
+
+
+def build_parameter_grid(scenario_type: str, grid: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """
+    Expand a parameter grid into its cartesian product
+    Returns one flat array per scenario parameter, all of length = number of combinations
+    """
+    if scenario_type not in GRID_PARAMETERS:
+        raise ValueError(f"Unsupported scenario type: {scenario_type}")
+    defaults = GRID_PARAMETERS[scenario_type]
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown grid parameters for {scenario_type}: {sorted(unknown)}")
+
+    axes = []
+    for name, default in defaults.items():
+        values = grid.get(name, [default])
+        if len(values) == 0:
+            raise ValueError(f"Grid parameter '{name}' has no values")
+        axes.append(np.asarray(values, dtype=np.float64))
+
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return {name: axis.ravel() for name, axis in zip(defaults, mesh)}
+
+
+def evaluate_scenario_grid(scenario_type: str, monthly_revenue: np.ndarray, monthly_cost: np.ndarray,
+                           margin: np.ndarray, combos: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every (client, parameter combination) pair in one broadcast
+    Client columns have shape (n,), combination columns shape (k,); every metric comes back as (n, k)
+    """
+    revenue = monthly_revenue[:, None]
+    cost = monthly_cost[:, None]
+
+    if scenario_type == "client_churn":
+        months = combos["months"][None, :]
+        revenue_loss = revenue * months
+        cost_savings = cost * months
+        return {
+            "revenue_loss": revenue_loss,
+            "cost_savings": cost_savings,
+            "net_impact": cost_savings - revenue_loss
+        }
+
+    if scenario_type == "service_addition":
+        service_margin = (combos["monthly_revenue"] - combos["monthly_cost"])[None, :]
+        months = combos["months"][None, :]
+        roi = np.zeros(combos["monthly_cost"].shape)
+        np.divide(combos["monthly_revenue"] - combos["monthly_cost"], combos["monthly_cost"], out=roi,
+                  where=combos["monthly_cost"] != 0)
+        return {
+            "annual_margin_improvement": np.broadcast_to(service_margin * months, (len(revenue), len(roi))),
+            "new_total_margin": (margin[:, None] + service_margin) * months,
+            "roi_percentage": np.broadcast_to(np.round(roi * 100, 1)[None, :], (len(revenue), len(roi)))
+        }
+
+    if scenario_type == "price_increase":
+        new_revenue = revenue * (1 + combos["percentage"][None, :] / 100)
+        return {
+            "new_monthly_revenue": new_revenue,
+            "annual_margin_improvement": (new_revenue - revenue) * 12
+        }
+
+    raise ValueError(f"Unsupported scenario type: {scenario_type}")
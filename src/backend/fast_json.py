@@ -0,0 +1,132 @@
+"""
+Fast JSON
+Pluggable serializer for API responses and realtime broadcasts (orjson when installed, stdlib json otherwise)
+"""
+import dataclasses
+import functools
+import inspect
+import json
+import logging
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable
+
+import numpy as np
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    """Types neither backend encodes natively; the stdlib backend also needs Enum and datetime here"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(",", ":")).encode()
+
+
+BACKENDS = {"json": _stdlib_dumps}
+if orjson is not None:
+    BACKENDS["orjson"] = _orjson_dumps
+
+backend = "orjson" if orjson is not None else "json"
+_dumps: Callable[..., bytes] = BACKENDS[backend]
+
+
+def set_backend(name: str):
+    """Switch the process-wide serializer ("orjson" or "json")"""
+    global backend, _dumps
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable JSON backend: {name}")
+    backend, _dumps = name, BACKENDS[name]
+    logger.info(f"✅ JSON serializer: {name}")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    return _dumps(obj, sort_keys)
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    """Text form for websocket frames"""
+    return _dumps(obj, sort_keys).decode()
+
+
+def loads(data: Any) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured fast serializer"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _as_response(result: Any) -> Any:
+    return result if isinstance(result, Response) else FastJSONResponse(result)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route that hands plain return values straight to FastJSONResponse
+    FastAPI otherwise walks every response through jsonable_encoder before rendering it; routes that
+    declare a response model keep FastAPI's validation path.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        response_model = kwargs.get("response_model")
+        declared = response_model is not None and not isinstance(response_model, DefaultPlaceholder)
+        streaming = inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint)
+        if not declared and not streaming and kwargs.get("status_code") is None \
+                and inspect.signature(endpoint).return_annotation is inspect.Signature.empty:
+            endpoint = self._wrap(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _wrap(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                return _as_response(await endpoint(*args, **kwargs))
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(*args, **kwargs):
+                return _as_response(endpoint(*args, **kwargs))
+        return wrapper
+
+
+if os.getenv("JSON_SERIALIZER"):
+    set_backend(os.getenv("JSON_SERIALIZER"))
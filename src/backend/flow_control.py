@@ -0,0 +1,295 @@
+"""
+Flow Control
+Adaptive concurrency (AIMD), per-tenant token buckets and Retry-After aware retries for outbound API calls
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional
+
+import aiohttp
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "slow down": they shrink the concurrency window and are always safe to retry
+THROTTLE_STATUSES = (429, 503)
+# Transient server failures, retried only for idempotent methods
+RETRY_STATUSES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or an HTTP date), None when absent or invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class TokenBucket:
+    """
+    Request budget: `rate` tokens per second, holding at most `burst`; rate <= 0 means unlimited
+    `pause` holds every acquirer back until a deadline, which is how a server's Retry-After is applied to
+    the whole tenant rather than only to the request that received it.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    async def acquire(self):
+        paused = self.paused_until - self.clock()
+        if paused > 0:
+            self.waits += 1
+            self.waited_seconds += paused
+            await asyncio.sleep(paused)
+        if self.rate <= 0:
+            return
+        self._refill()
+        # Tokens may go negative: each waiter reserves its token and sleeps off its share of the debt
+        self.tokens -= 1
+        if self.tokens < 0:
+            delay = -self.tokens / self.rate
+            self.waits += 1
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+
+class AIMDLimiter:
+    """
+    Concurrency window that grows by one slot per window of successes and halves on overload
+    Overload is a throttling response (429/503), a connection failure or a latency above `latency_target`.
+    Only requests started after the last decrease can trigger another one, so a burst of rejections from
+    the same window halves it once rather than collapsing it to the minimum.
+    """
+
+    def __init__(self, initial: int = 16, minimum: int = 1, maximum: int = 64, latency_target: float = 2.0,
+                 backoff: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.clock = clock
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._waiters: deque = deque()
+
+    async def acquire(self):
+        """Wait for a slot; pair with `release`, passing the clock reading taken when the request went out"""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+                raise
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, started: float, overloaded: bool = False, sample: bool = True):
+        """Free a slot; `sample=False` (a cancelled request) leaves the window unchanged"""
+        self.in_flight -= 1
+        latency = self.clock() - started
+        if not sample:
+            pass
+        elif overloaded or latency > self.latency_target:
+            if started > self._last_decrease:
+                self.limit = max(float(self.minimum), self.limit * self.backoff)
+                self._last_decrease = self.clock()
+                self.decreases += 1
+        elif self.limit < self.maximum:
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self.increases += 1
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            # Waiters from an event loop that has since closed can never run again
+            if not waiter.done() and not waiter.get_loop().is_closed():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": len(self._waiters),
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter; a server's Retry-After is honoured as the minimum wait
+    `max_delay` caps only our own backoff. A Retry-After is never shortened: one longer than
+    `max_retry_after` is not worth waiting for, so the request gives up instead.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.2, max_delay: float = 10.0,
+                 max_retry_after: float = 300.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is None:
+            return backoff
+        # The jitter on top spreads the retries of everyone told to come back at the same moment
+        return retry_after + backoff
+
+    def honours(self, retry_after: Optional[float]) -> bool:
+        """Whether a Retry-After is short enough to wait out"""
+        return retry_after is None or retry_after <= self.max_retry_after
+
+
+class FlowControl:
+    """
+    aiohttp client middleware combining the three controls for every outbound request
+    Each attempt takes a token from its tenant's bucket (keyed by the X-Tenant-ID header), then a slot in the
+    AIMD window, so requests waiting out a rate limit or Retry-After pause never hold slots; throttling and
+    transient failures are retried with backoff outside the window.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: Optional[float] = None, limiter: Optional[AIMDLimiter] = None,
+                 retry: Optional[RetryPolicy] = None):
+        self.rate = rate
+        self.burst = burst
+        self.limiter = limiter or AIMDLimiter()
+        self.retry = retry or RetryPolicy()
+        self.buckets: Dict[Optional[str], TokenBucket] = {}
+        self.counters = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "retry_after_honored": 0,
+            "retry_after_too_long": 0,
+            "gave_up": 0
+        }
+
+    def bucket(self, tenant: Optional[str]) -> TokenBucket:
+        bucket = self.buckets.get(tenant)
+        if bucket is None:
+            bucket = self.buckets[tenant] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def middleware(self, request: aiohttp.ClientRequest, handler) -> aiohttp.ClientResponse:
+        counters = self.counters
+        counters["requests"] += 1
+        bucket = self.bucket(request.headers.get("X-Tenant-ID"))
+        idempotent = request.method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retry.max_attempts):
+            last_attempt = attempt == self.retry.max_attempts - 1
+            # Token first, then slot: a tenant paused by Retry-After must not sit on slots other tenants could use
+            await bucket.acquire()
+            await self.limiter.acquire()
+            started = self.limiter.clock()
+            try:
+                counters["attempts"] += 1
+                response = await handler(request)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self.limiter.release(started, overloaded=True)
+                counters["connection_errors"] += 1
+                if last_attempt or not idempotent:
+                    counters["gave_up"] += 1
+                    raise
+                delay = self.retry.delay(attempt)
+            except BaseException:
+                self.limiter.release(started, sample=False)
+                raise
+            else:
+                throttled = response.status in THROTTLE_STATUSES
+                retryable = throttled or (idempotent and response.status in RETRY_STATUSES)
+                self.limiter.release(started, overloaded=throttled)
+                if not retryable:
+                    return response
+                counters["throttled" if throttled else "server_errors"] += 1
+                if last_attempt:
+                    counters["gave_up"] += 1
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if not self.retry.honours(retry_after):
+                    # Surface the response without pausing the tenant: this request has chosen not to wait
+                    counters["retry_after_too_long"] += 1
+                    counters["gave_up"] += 1
+                    return response
+                if retry_after is not None:
+                    counters["retry_after_honored"] += 1
+                    bucket.pause(retry_after)
+                delay = self.retry.delay(attempt, retry_after)
+                response.release()
+            counters["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "concurrency": self.limiter.stats(),
+            "rate_per_tenant": self.rate,
+            "bucket_waits": sum(bucket.waits for bucket in self.buckets.values()),
+            "bucket_waited_seconds": round(sum(bucket.waited_seconds for bucket in self.buckets.values()), 3)
+        }
+
+
+def flow_control_from_env(maximum: int) -> FlowControl:
+    """FlowControl configured from the SUPEROPS_* environment variables"""
+    return FlowControl(
+        rate=float(os.getenv('SUPEROPS_RATE_LIMIT', '0')),
+        burst=float(os.getenv('SUPEROPS_RATE_BURST')) if os.getenv('SUPEROPS_RATE_BURST') else None,
+        limiter=AIMDLimiter(
+            initial=int(os.getenv('SUPEROPS_AIMD_INITIAL', '16')),
+            maximum=maximum,
+            latency_target=float(os.getenv('SUPEROPS_LATENCY_TARGET', '2.0'))
+        ),
+        retry=RetryPolicy(
+            max_attempts=int(os.getenv('SUPEROPS_RETRY_ATTEMPTS', '4')),
+            base_delay=float(os.getenv('SUPEROPS_RETRY_BASE_SECONDS', '0.2')),
+            max_delay=float(os.getenv('SUPEROPS_RETRY_MAX_SECONDS', '10')),
+            max_retry_after=float(os.getenv('SUPEROPS_RETRY_AFTER_MAX_SECONDS', '300'))
+        )
+    )
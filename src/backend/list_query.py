@@ -0,0 +1,224 @@
+"""
+List Queries
+Cursor pagination, index-backed filters and field projection for the list endpoints
+"""
+import base64
+import json
+import logging
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from client_frame import ClientFrame
+from portfolio_analytics import RISK_LEVELS, risk_band
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+# Rows examined per step when a secondary filter has to be checked row by row
+SCAN_CHUNK = 1024
+# License row keys pack (client key, position among the client's licenses) into one int64
+LICENSE_ORDINAL_BITS = 16
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict) or "k" not in payload:
+        raise ValueError("Invalid cursor")
+    return payload
+
+
+class ListQuery:
+    """Pagination, filter and projection parameters shared by the list endpoints"""
+
+    def __init__(self, limit: Optional[int] = None, cursor: Optional[str] = None, risk_level: Optional[str] = None,
+                 min_margin: Optional[float] = None, max_margin: Optional[float] = None,
+                 license_type: Optional[str] = None, fields: Optional[str] = None):
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        if risk_level is not None and risk_level not in RISK_LEVELS:
+            raise ValueError("Invalid risk level")
+        if min_margin is not None and max_margin is not None and min_margin > max_margin:
+            raise ValueError("min_margin must not exceed max_margin")
+
+        self.limit = limit
+        self.risk_level = risk_level
+        self.min_margin = min_margin
+        self.max_margin = max_margin
+        # Accept both the raw key ("microsoft_365") and the display name ("Microsoft 365")
+        self.license_type = license_type.strip().lower().replace(" ", "_") if license_type else None
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        self.cursor = decode_cursor(cursor) if cursor else None
+        if self.cursor is not None and self.cursor.get("f") != self.filters():
+            raise ValueError("Cursor does not match the query filters")
+
+    @property
+    def is_plain(self) -> bool:
+        """No paging, filtering or projection requested: the endpoint returns its full legacy body"""
+        return self.limit is None and self.cursor is None and self.fields is None and not any(
+            value is not None for value in self.filters()
+        )
+
+    @property
+    def by_margin(self) -> bool:
+        return self.min_margin is not None or self.max_margin is not None
+
+    def filters(self) -> List[Any]:
+        return [self.risk_level, self.min_margin, self.max_margin, self.license_type]
+
+    def project(self, items: List[Dict[str, Any]], available: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Keep only the requested fields; `available` defaults to the keys of the first item"""
+        if not self.fields:
+            return items
+        known = set(available) if available is not None else set(items[0]) if items else set(self.fields)
+        unknown = [field for field in self.fields if field not in known]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+        return [{field: item.get(field) for field in self.fields} for item in items]
+
+
+class ListTable:
+    """
+    One paginated table whose rows are kept in stable key order
+    Each filter is served from a sorted index (posting lists per risk level and license type, a margin-sorted
+    row order), so a page driven by a single filter costs O(log n + page) instead of a portfolio scan.
+    Cursors carry the key of the last row returned, so paging survives creates and deletes in between.
+    """
+
+    def __init__(self, keys: np.ndarray, margin: np.ndarray, type_postings: Dict[str, np.ndarray]):
+        self.keys = keys
+        self.margin = margin
+        self.bands = risk_band(margin)
+        self.risk_postings = {level: np.flatnonzero(self.bands == band) for band, level in enumerate(RISK_LEVELS)}
+        self.type_postings = type_postings
+        self.margin_order = np.argsort(margin, kind="stable")
+        self.margin_sorted = margin[self.margin_order]
+        self._type_masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def for_clients(cls, frame: ClientFrame, client_keys: np.ndarray) -> "ListTable":
+        """Client rows; the license_type filter selects clients holding at least one such license"""
+        postings = {
+            name: np.unique(frame.license_client_idx[frame.license_type_codes == code])
+            for code, name in enumerate(frame.license_type_names.tolist())
+        }
+        return cls(client_keys, frame.margin, postings)
+
+    @classmethod
+    def for_license_rows(cls, frame: ClientFrame, rows: np.ndarray, client_keys: np.ndarray) -> "ListTable":
+        """A subset of license rows (in frame order), filtered through the owning client's margin and risk"""
+        client_idx = frame.license_client_idx[rows]
+        ordinal = rows - np.searchsorted(frame.license_client_idx, client_idx)
+        keys = (client_keys[client_idx].astype(np.int64) << LICENSE_ORDINAL_BITS) | ordinal
+        codes = frame.license_type_codes[rows]
+        postings = {name: np.flatnonzero(codes == code) for code, name in enumerate(frame.license_type_names.tolist())}
+        return cls(keys, frame.margin[client_idx], postings)
+
+    def _type_mask(self, license_type: str) -> np.ndarray:
+        mask = self._type_masks.get(license_type)
+        if mask is None:
+            mask = self._type_masks[license_type] = np.zeros(len(self), dtype=bool)
+            mask[self.type_postings.get(license_type, _EMPTY)] = True
+        return mask
+
+    def _driver(self, query: ListQuery) -> Tuple[Optional[np.ndarray], int, str]:
+        """Most selective index for the query: (row order or None for all rows, offset in margin order, index used)"""
+        if query.by_margin:
+            lo = 0 if query.min_margin is None else int(np.searchsorted(self.margin_sorted, query.min_margin, "left"))
+            hi = len(self) if query.max_margin is None else int(np.searchsorted(self.margin_sorted, query.max_margin, "right"))
+            return self.margin_order[lo:max(lo, hi)], lo, "margin"
+        if query.license_type is not None:
+            return self.type_postings.get(query.license_type, _EMPTY), 0, "license_type"
+        if query.risk_level is not None:
+            return self.risk_postings[query.risk_level], 0, "risk_level"
+        return None, 0, "all"
+
+    def _resume(self, driver: Optional[np.ndarray], offset: int, index: str, cursor: Optional[Dict[str, Any]]) -> int:
+        """Position in the driver just after the cursor's row"""
+        if cursor is None:
+            return 0
+        if index == "margin":
+            margin = cursor.get("m")
+            if margin is None:
+                raise ValueError("Cursor does not match the query filters")
+            lo = int(np.searchsorted(self.margin_sorted, margin, "left"))
+            hi = int(np.searchsorted(self.margin_sorted, margin, "right"))
+            # Rows with equal margin stay in key order inside the stable margin sort
+            position = lo + int(np.searchsorted(self.keys[self.margin_order[lo:hi]], cursor["k"], "right"))
+            return max(position - offset, 0)
+        row = int(np.searchsorted(self.keys, cursor["k"], "right"))
+        return row if driver is None else int(np.searchsorted(driver, row, "left"))
+
+    def _residual(self, query: ListQuery, index: str) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """Filters not covered by the driving index, checked on the candidate rows only"""
+        checks = []
+        if query.risk_level is not None and index != "risk_level":
+            band = list(RISK_LEVELS).index(query.risk_level)
+            checks.append(lambda rows: self.bands[rows] == band)
+        if query.license_type is not None and index != "license_type":
+            type_mask = self._type_mask(query.license_type)
+            checks.append(lambda rows: type_mask[rows])
+        if not checks:
+            return None
+
+        def check(rows: np.ndarray) -> np.ndarray:
+            mask = checks[0](rows)
+            for extra in checks[1:]:
+                mask &= extra(rows)
+            return mask
+        return check
+
+    def page(self, query: ListQuery) -> Tuple[np.ndarray, Optional[str]]:
+        """Row positions of the requested page and the cursor for the next one (None on the last page)"""
+        driver, offset, index = self._driver(query)
+        size = len(self) if driver is None else len(driver)
+        limit = query.limit or max(size, 1)
+        position = self._resume(driver, offset, index, query.cursor)
+        residual = self._residual(query, index)
+
+        pages, taken = [], 0
+        while taken < limit and position < size:
+            step = limit - taken if residual is None else max(SCAN_CHUNK, limit - taken)
+            end = min(position + step, size)
+            chunk = np.arange(position, end) if driver is None else driver[position:end]
+            if residual is None:
+                kept, position = chunk, end
+            else:
+                hits = np.flatnonzero(residual(chunk))
+                if len(hits) > limit - taken:
+                    hits = hits[:limit - taken]
+                    position += int(hits[-1]) + 1
+                else:
+                    position = end
+                kept = chunk[hits]
+            pages.append(kept)
+            taken += len(kept)
+
+        rows = np.concatenate(pages) if pages else _EMPTY
+        if position >= size or len(rows) == 0:
+            return rows, None
+        last = int(rows[-1])
+        payload = {"k": int(self.keys[last]), "f": query.filters()}
+        if index == "margin":
+            payload["m"] = float(self.margin[last])
+        return rows, encode_cursor(payload)
+
+
+def paginate(table: ListTable, query: ListQuery, key: str, render: Callable[[np.ndarray], List[Dict[str, Any]]],
+             available: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Run the query against the table and render only the rows on the page"""
+    rows, next_cursor = table.page(query)
+    items = query.project(render(rows), available)
+    return {key: items, "count": len(items), "next_cursor": next_cursor}
@@ -0,0 +1,115 @@
+"""
+Portfolio Aggregates
+Materialized portfolio totals maintained incrementally on every client mutation
+"""
+import logging
+from itertools import count
+from typing import Dict, Any, Mapping, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def client_license_waste(client_data: Dict[str, Any]) -> float:
+    """Monthly cost of the unused licenses held by one client"""
+    waste = 0
+    for license_data in (client_data.get("licenses") or {}).values():
+        unused = license_data.get("total", 0) - license_data.get("used", 0)
+        if unused > 0:
+            waste += unused * license_data.get("cost_per_license", 0)
+    return waste
+
+
+class PortfolioAggregates:
+    """
+    Running portfolio totals updated in O(1) per client change
+    Every mutation bumps `version`, which downstream caches use as their key
+    """
+
+    def __init__(self, clients: Optional[Mapping[str, Dict[str, Any]]] = None):
+        self.version = 0
+        self.load(clients or {})
+
+    def load(self, clients: Mapping[str, Dict[str, Any]]):
+        """Rebuild every aggregate from scratch (startup or bulk replace)"""
+        self.total_revenue = 0
+        self.total_costs = 0
+        self.total_license_waste = 0
+        self.client_count = 0
+        self._unprofitable: Dict[str, Dict[str, Any]] = {}
+        self._positions: Dict[str, int] = {}
+        self._sequence = count()
+        self._overview: Optional[Dict[str, Any]] = None
+
+        for client_id, client_data in clients.items():
+            self._apply(client_id, client_data, sign=1)
+        self._bump()
+
+    def add(self, client_id: str, client_data: Dict[str, Any]):
+        """Account for a newly created client"""
+        self._apply(client_id, client_data, sign=1)
+        self._bump()
+
+    def remove(self, client_id: str, client_data: Dict[str, Any]):
+        """Account for a deleted client"""
+        self._apply(client_id, client_data, sign=-1)
+        self._positions.pop(client_id, None)
+        self._bump()
+
+    def replace(self, client_id: str, old_data: Dict[str, Any], new_data: Dict[str, Any]):
+        """Account for an updated client by retracting its old values and applying the new ones"""
+        self._apply(client_id, old_data, sign=-1)
+        self._apply(client_id, new_data, sign=1)
+        self._bump()
+
+    def position(self, client_id: str) -> int:
+        """Stable, increasing portfolio position of a client; list cursors key on it"""
+        return self._positions[client_id]
+
+    def _apply(self, client_id: str, client_data: Dict[str, Any], sign: int):
+        self.total_revenue += sign * client_data.get("monthly_revenue", 0)
+        self.total_costs += sign * client_data.get("monthly_cost", 0)
+        self.total_license_waste += sign * client_license_waste(client_data)
+        self.client_count += sign
+
+        if client_id not in self._positions:
+            self._positions[client_id] = next(self._sequence)
+
+        margin = client_data.get("margin", 0)
+        if sign > 0 and margin < 0:
+            self._unprofitable[client_id] = {
+                "id": client_id,
+                "name": client_data.get("name"),
+                "margin": margin
+            }
+        elif sign < 0:
+            self._unprofitable.pop(client_id, None)
+
+    def _bump(self):
+        self.version += 1
+        self._overview = None
+
+    def overview(self) -> Dict[str, Any]:
+        """Dashboard overview built from the running totals, materialized once per version"""
+        if self._overview is None:
+            total_revenue = round(self.total_revenue, 2)
+            total_costs = round(self.total_costs, 2)
+            total_margin = round(total_revenue - total_costs, 2)
+            # Report unprofitable clients in portfolio order, not in the order they became unprofitable
+            unprofitable_clients = sorted(
+                self._unprofitable.values(), key=lambda c: self._positions[c["id"]]
+            )
+
+            self._overview = {
+                "total_monthly_revenue": total_revenue,
+                "total_monthly_costs": total_costs,
+                "total_margin": total_margin,
+                "margin_percentage": round((total_margin / total_revenue) * 100, 1) if total_revenue else 0,
+                "client_count": self.client_count,
+                "unprofitable_clients": unprofitable_clients,
+                "risk_alerts": len(unprofitable_clients),
+                "total_license_waste_monthly": round(self.total_license_waste, 2),
+                "data_version": self.version,
+                "data_source": "mock"
+            }
+        return self._overview
@@ -0,0 +1,271 @@
+"""
+Portfolio Analytics
+Fused, vectorized profitability, license, upsell and anomaly analysis over a ClientFrame
+"""
+import logging
+from typing import Dict, List, Any
+
+import numpy as np
+
+from client_frame import ClientFrame
+from anomaly_rules import AnomalyRuleSet, anomaly_rules
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Profitability bands (monthly margin in $)
+HIGH_RISK_MARGIN = 0
+MEDIUM_RISK_MARGIN = 500
+
+PROFITABILITY_RECOMMENDATIONS = np.array([
+    "URGENT: Renegotiate contract or consider termination",
+    "Review service delivery efficiency and pricing",
+    "Healthy margin - consider upsell opportunities"
+], dtype=object)
+RISK_LEVELS = np.array(["high", "medium", "low"], dtype=object)
+
+# Upsell catalog, evaluated in order for every client
+SECURITY_UPSELL = {
+    "service": "Premium Cybersecurity Package",
+    "monthly_value": 2000,
+    "annual_value": 24000,
+    "confidence": 85
+}
+BACKUP_UPSELL = {
+    "service": "Enhanced Backup & Recovery",
+    "monthly_value": 800,
+    "annual_value": 9600,
+    "confidence": 70
+}
+COMPLIANCE_UPSELL = {
+    "service": "HIPAA Compliance Monitoring",
+    "monthly_value": 1200,
+    "annual_value": 14400,
+    "confidence": 90,
+    "reason": "Healthcare industry requires enhanced compliance monitoring"
+}
+SECURITY_UPSELL_INCIDENTS = 5
+BACKUP_UPSELL_TICKETS = 20
+
+
+def risk_band(margin: np.ndarray) -> np.ndarray:
+    """0 = high risk, 1 = medium risk, 2 = low risk"""
+    return np.where(margin < HIGH_RISK_MARGIN, 0, np.where(margin < MEDIUM_RISK_MARGIN, 1, 2))
+
+
+class PortfolioScan:
+    """
+    Single pass over a ClientFrame
+    Computes every mask and derived column shared by the report sections exactly once
+    """
+
+    def __init__(self, frame: ClientFrame):
+        self.frame = frame
+
+        # Client table
+        self.risk_bands = risk_band(frame.margin)
+        self.unprofitable = np.nonzero(self.risk_bands == 0)[0]
+        self.margin_percentage = np.round(frame.margin_percentage, 1)
+        self.security_upsell = frame.security_incidents >= SECURITY_UPSELL_INCIDENTS
+        self.backup_upsell = frame.tickets_last_month >= BACKUP_UPSELL_TICKETS
+        self.compliance_upsell = frame.is_healthcare
+        self.upsell_monthly = (
+            self.security_upsell * SECURITY_UPSELL["monthly_value"]
+            + self.backup_upsell * BACKUP_UPSELL["monthly_value"]
+            + self.compliance_upsell * COMPLIANCE_UPSELL["monthly_value"]
+        )
+        self.upsell_candidates = np.nonzero(
+            self.security_upsell | self.backup_upsell | self.compliance_upsell
+        )[0]
+
+        # License table
+        self.license_unused = frame.license_total - frame.license_used
+        self.license_monthly_waste = self.license_unused * frame.license_cost
+        self.license_utilization = frame.license_utilization
+        self.license_display_names = frame.license_display_names
+        self.unused_licenses = np.nonzero(self.license_unused > 0)[0]
+
+
+def _overview_section(scan: PortfolioScan) -> Dict[str, Any]:
+    """Portfolio totals and unprofitable clients"""
+    frame = scan.frame
+    total_revenue = frame.monthly_revenue.sum().item()
+    total_costs = frame.monthly_cost.sum().item()
+    total_margin = total_revenue - total_costs
+
+    rows = scan.unprofitable
+    unprofitable_clients = [
+        {"id": client_id, "name": name, "margin": margin}
+        for client_id, name, margin in zip(
+            frame.ids[rows].tolist(), frame.names[rows].tolist(), frame.margin[rows].tolist()
+        )
+    ]
+
+    return {
+        "total_monthly_revenue": total_revenue,
+        "total_monthly_costs": total_costs,
+        "total_margin": total_margin,
+        "margin_percentage": round((total_margin / total_revenue) * 100, 1) if total_revenue else 0,
+        "client_count": len(frame),
+        "unprofitable_clients": unprofitable_clients,
+        "risk_alerts": len(unprofitable_clients),
+        "data_source": "mock"
+    }
+
+
+def _profitability_section(scan: PortfolioScan) -> Dict[str, Any]:
+    """Per-client margin, risk level and recommendation"""
+    frame = scan.frame
+    clients = [
+        {
+            "id": client_id,
+            "name": name,
+            "monthly_revenue": revenue,
+            "monthly_cost": cost,
+            "margin": margin,
+            "margin_percentage": pct,
+            "risk_level": risk_level,
+            "contract_value": contract_value,
+            "recommendation": recommendation
+        }
+        for client_id, name, revenue, cost, margin, pct, risk_level, contract_value, recommendation in zip(
+            frame.ids.tolist(),
+            frame.names.tolist(),
+            frame.monthly_revenue.tolist(),
+            frame.monthly_cost.tolist(),
+            frame.margin.tolist(),
+            scan.margin_percentage.tolist(),
+            RISK_LEVELS[scan.risk_bands].tolist(),
+            frame.contract_value.tolist(),
+            PROFITABILITY_RECOMMENDATIONS[scan.risk_bands].tolist()
+        )
+    ]
+    return {"clients": clients}
+
+
+def _license_section(scan: PortfolioScan) -> Dict[str, Any]:
+    """Unused licenses and the savings from downgrading them"""
+    frame = scan.frame
+    rows = scan.unused_licenses
+    monthly_savings = scan.license_monthly_waste[rows]
+    annual_savings = monthly_savings * 12
+    client_idx = frame.license_client_idx[rows]
+    total_savings = annual_savings.sum().item()
+
+    optimizations = [
+        {
+            "client_id": client_id,
+            "client_name": client_name,
+            "license_type": license_type,
+            "total_licenses": total,
+            "used_licenses": used,
+            "unused_licenses": unused_count,
+            "cost_per_license": cost,
+            "monthly_savings": monthly,
+            "annual_savings": annual,
+            "utilization_rate": rate
+        }
+        for client_id, client_name, license_type, total, used, unused_count, cost, monthly, annual, rate in zip(
+            frame.ids[client_idx].tolist(),
+            frame.names[client_idx].tolist(),
+            scan.license_display_names[rows].tolist(),
+            frame.license_total[rows].tolist(),
+            frame.license_used[rows].tolist(),
+            scan.license_unused[rows].tolist(),
+            frame.license_cost[rows].tolist(),
+            monthly_savings.tolist(),
+            annual_savings.tolist(),
+            np.round(scan.license_utilization[rows], 1).tolist()
+        )
+    ]
+
+    return {
+        "optimizations": optimizations,
+        "total_annual_savings": total_savings,
+        "total_monthly_savings": total_savings / 12
+    }
+
+
+def _upsell_section(scan: PortfolioScan) -> Dict[str, Any]:
+    """Upsell opportunities derived from incident and ticket patterns"""
+    frame = scan.frame
+    rows = scan.upsell_candidates
+
+    opportunities = []
+    for client_id, name, revenue, incidents, tickets, has_security, has_backup, has_compliance, monthly in zip(
+        frame.ids[rows].tolist(),
+        frame.names[rows].tolist(),
+        frame.monthly_revenue[rows].tolist(),
+        frame.security_incidents[rows].tolist(),
+        frame.tickets_last_month[rows].tolist(),
+        scan.security_upsell[rows].tolist(),
+        scan.backup_upsell[rows].tolist(),
+        scan.compliance_upsell[rows].tolist(),
+        scan.upsell_monthly[rows].tolist()
+    ):
+        upsells = []
+        if has_security:
+            upsells.append({**SECURITY_UPSELL, "reason": f"{incidents} security incidents last month"})
+        if has_backup:
+            upsells.append({
+                **BACKUP_UPSELL,
+                "reason": f"{tickets} support tickets indicate system instability"
+            })
+        if has_compliance:
+            upsells.append(dict(COMPLIANCE_UPSELL))
+
+        opportunities.append({
+            "client_id": client_id,
+            "client_name": name,
+            "current_monthly_revenue": revenue,
+            "upsell_opportunities": upsells,
+            "total_potential_monthly": monthly,
+            "total_potential_annual": monthly * 12
+        })
+
+    return {"opportunities": opportunities}
+
+
+def _action_items(high_severity: List[Dict[str, Any]], opportunities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """High-severity anomalies followed by the top 3 upsell opportunities"""
+    actions = [
+        {
+            "priority": "high",
+            "action": anomaly["recommendation"],
+            "client": anomaly["client_name"],
+            "impact": anomaly["impact"]
+        }
+        for anomaly in high_severity
+    ]
+    actions.extend(
+        {
+            "priority": "medium",
+            "action": f"Present upsell proposal to {opp['client_name']}",
+            "client": opp["client_name"],
+            "impact": f"${opp['total_potential_annual']} annual potential"
+        }
+        for opp in opportunities[:3]
+    )
+    return actions
+
+
+def analyze_portfolio(frame: ClientFrame, rules: AnomalyRuleSet = anomaly_rules) -> Dict[str, Any]:
+    """
+    Run every portfolio analysis from one shared scan of the frame
+    Returns the overview, profitability, licenses, upsells, anomalies and action_items sections
+    """
+    scan = PortfolioScan(frame)
+    upsells = _upsell_section(scan)
+    evaluation = rules.evaluate(frame)
+    anomalies, high_severity = rules.materialize(evaluation)
+    high_severity_entries = [anomalies[i] for i in np.flatnonzero(high_severity).tolist()]
+
+    return {
+        "overview": _overview_section(scan),
+        "profitability": _profitability_section(scan),
+        "licenses": _license_section(scan),
+        "upsells": upsells,
+        "anomalies": {"anomalies": anomalies, "rule_stats": evaluation.stats()},
+        "action_items": _action_items(high_severity_entries, upsells["opportunities"]),
+        "upsell_potential_annual": int(scan.upsell_monthly[scan.upsell_candidates].sum()) * 12
+    }
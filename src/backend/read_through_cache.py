@@ -0,0 +1,179 @@
+"""
+Read-Through Cache
+Async read-through cache with per-key TTL, stale-while-revalidate and single-flight loading
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """Loaded value and the window in which it may be served"""
+
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl")
+
+    def __init__(self, value: Any, stored_at: float, ttl: float, stale_ttl: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+
+class ReadThroughCache:
+    """
+    Caches the results of async loaders by key
+    A fresh entry (younger than its TTL) is served directly. A stale entry (within the stale-while-revalidate
+    window after that) is served immediately while one background load refreshes it. Concurrent misses for
+    the same key share a single in-flight load instead of each calling upstream. Loader errors are never
+    cached: they propagate to every caller waiting on that load, and a failed background refresh leaves the
+    stale entry in place.
+    """
+
+    def __init__(self, ttl: float = 30.0, stale_ttl: float = 120.0, max_entries: int = 4096,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.load_errors = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                  ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> Any:
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self.clock() - entry.stored_at
+            if age < entry.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < entry.ttl + entry.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if self._running_load(key) is None:
+                    self.refreshes += 1
+                    self._start_load(key, loader, ttl, stale_ttl, background=True)
+                return entry.value
+
+        task = self._running_load(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_load(key, loader, ttl, stale_ttl)
+        # Shielded so that one caller giving up does not cancel the load for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """The cached value if it is still servable (fresh or stale), without counting or loading"""
+        entry = self._entries.get(key)
+        if entry is None or self.clock() - entry.stored_at >= entry.ttl + entry.stale_ttl:
+            return None
+        return entry.value
+
+    def latest(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """The last value stored for `key` and its age in seconds, even past its serving window"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.value, self.clock() - entry.stored_at
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None):
+        """Store a value computed outside the cache (e.g. patched in place); a load in flight for it is dropped"""
+        self._inflight.pop(key, None)
+        self._store(key, value, self.ttl if ttl is None else ttl, self.stale_ttl if stale_ttl is None else stale_ttl)
+
+    def invalidate(self, key: Hashable):
+        """Drop one key; a load already in flight for it will not be stored"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        for key in [key for key in self._entries if predicate(key)]:
+            self._entries.pop(key, None)
+        for key in [key for key in self._inflight if predicate(key)]:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
+
+    def _running_load(self, key: Hashable) -> Optional[asyncio.Task]:
+        """The in-flight load for `key`, ignoring loads left behind by another (possibly closed) event loop"""
+        task = self._inflight.get(key)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float, stale_ttl: float,
+                    background: bool = False) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader, ttl, stale_ttl))
+        self._inflight[key] = task
+        if background:
+            task.add_done_callback(self._log_refresh_failure)
+        else:
+            # Every caller may have given up before a failing load finishes; its error is still consumed
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float, stale_ttl: float) -> Any:
+        current = asyncio.current_task()
+        try:
+            value = await loader()
+        except Exception:
+            self.load_errors += 1
+            raise
+        finally:
+            registered = self._inflight.get(key) is current
+            if registered:
+                del self._inflight[key]
+        if registered:
+            self._store(key, value, ttl, stale_ttl)
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: float, stale_ttl: float):
+        self._entries[key] = CacheEntry(value, self.clock(), ttl, stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed, serving stale data: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 3) if lookups else 0,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_ttl
+        }
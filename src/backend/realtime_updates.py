@@ -3,52 +3,350 @@ Real-time Updates and WebSocket Support
 Live dashboard updates and real-time data synchronization
 """
 import asyncio
-import json
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Set
+import os
+import random
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import websockets
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.websockets import WebSocketState
 import uvicorn
-from threading import Thread
 import time
 
+import fast_json
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds between update cycles, each spread by up to +/- this fraction so instances don't poll in lockstep
+UPDATE_INTERVAL = float(os.getenv('REALTIME_UPDATE_INTERVAL', '30'))
+UPDATE_JITTER = float(os.getenv('REALTIME_UPDATE_JITTER', '0.1'))
+# Seconds before a background updater that died unexpectedly is restarted
+UPDATER_RESTART_DELAY = 5.0
+
+# Outbound frames buffered per connection, what to do when a slow client lets its buffer fill
+# (drop_oldest, coalesce or disconnect), and seconds a single send may block before the client is dropped
+SEND_QUEUE_SIZE = int(os.getenv('REALTIME_SEND_QUEUE_SIZE', '64'))
+SLOW_CONSUMER_POLICY = os.getenv('REALTIME_SLOW_CONSUMER_POLICY', 'coalesce')
+SEND_TIMEOUT = float(os.getenv('REALTIME_SEND_TIMEOUT', '10'))
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+# Close code sent to clients disconnected for falling behind (1013: try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# A delta touching more than this share of a topic's row groups is sent as a full snapshot instead
+DELTA_MAX_RATIO = 0.5
+
+# Update type -> ConnectionManager stage, in the order a full cycle runs them
+UPDATE_STAGES = {
+    "financial": "_update_financial_data",
+    "licenses": "_update_license_data",
+    "anomalies": "_update_anomaly_data",
+    "upsells": "_update_upsell_data"
+}
+
+
+def _digest(value: Any) -> bytes:
+    """128-bit structural hash of a JSON-shaped value (key order does not matter)"""
+    return hashlib.blake2b(fast_json.dumps(value, sort_keys=True), digest_size=16).digest()
+
+
+class TopicFingerprint:
+    """
+    Merkle-style fingerprint of one version of a topic's data
+    Rows sharing a key hash into one group hash; the root hashes every group hash (in order) and every
+    scalar field hash, so any change anywhere changes the root. Comparing roots detects a change, and
+    comparing group hashes finds exactly which keys changed. `sources` remembers the object each group
+    was derived from (its client record), so the next version reuses the group hash when that object is
+    unchanged instead of serializing the rows again.
+    """
+
+    __slots__ = ("groups", "group_hashes", "field_hashes", "sources", "root", "hashed", "reused")
+
+    def __init__(self, groups: Dict[Any, List[Dict[str, Any]]], group_hashes: Dict[Any, bytes],
+                 field_hashes: Dict[str, bytes], sources: Dict[Any, Any], root: bytes, hashed: int, reused: int):
+        self.groups = groups
+        self.group_hashes = group_hashes
+        self.field_hashes = field_hashes
+        self.sources = sources
+        self.root = root
+        self.hashed = hashed
+        self.reused = reused
+
+
+class TopicSpec:
+    """
+    How one realtime topic is cached, labelled and diffed
+    A topic's data is a dict holding one list of rows (`rows_field`, grouped by `row_key`) plus scalar
+    fields. A delta names the key, the row groups to replace (`upserts`: every current row of each changed
+    key), the keys to drop (`removes`) and the changed scalar `fields`. A client applies it by dropping all
+    rows whose key appears in either list, appending the upserts and merging the fields.
+    """
+
+    def __init__(self, data_key: str, message_type: str, rows_field: str, row_key: str):
+        self.data_key = data_key
+        self.message_type = message_type
+        self.rows_field = rows_field
+        self.row_key = row_key
+
+    def fingerprint(self, data: Dict[str, Any], sources: Optional[Dict[Any, Any]] = None,
+                    previous: Optional[TopicFingerprint] = None) -> TopicFingerprint:
+        """
+        Fingerprint `data`, hashing only the row groups whose source changed since `previous`
+        `sources` maps row keys to the records the rows were built from. Those records are replaced, never
+        mutated (copy-on-write client snapshots), so an identical source object means identical rows.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        row_key = self.row_key
+        for row in data.get(self.rows_field, []):
+            key = row.get(row_key)
+            if key in groups:
+                groups[key].append(row)
+            else:
+                groups[key] = [row]
+
+        sources = sources or {}
+        previous_sources = previous.sources if previous is not None else {}
+        group_hashes: Dict[Any, bytes] = {}
+        group_sources: Dict[Any, Any] = {}
+        root = hashlib.blake2b(digest_size=16)
+        hashed = reused = 0
+        for key, rows in groups.items():
+            source = sources.get(key)
+            if source is not None and source is previous_sources.get(key):
+                group_hash = previous.group_hashes[key]
+                reused += len(rows)
+            else:
+                group_hash = _digest(rows[0]) if len(rows) == 1 else _digest(rows)
+                hashed += len(rows)
+            if source is not None:
+                group_sources[key] = source
+            group_hashes[key] = group_hash
+            root.update(group_hash)
+        field_hashes = {field: _digest(value) for field, value in data.items() if field != self.rows_field}
+        for field in sorted(field_hashes):
+            root.update(field.encode())
+            root.update(field_hashes[field])
+        return TopicFingerprint(groups, group_hashes, field_hashes, group_sources, root.digest(), hashed, reused)
+
+    def diff(self, old: TopicFingerprint, new: TopicFingerprint, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Keyed delta from the `old` version to `data` (fingerprinted as `new`), None when a snapshot is as small"""
+        changed = [key for key, group_hash in new.group_hashes.items() if old.group_hashes.get(key) != group_hash]
+        removes = [key for key in old.group_hashes if key not in new.group_hashes]
+        if len(changed) + len(removes) > DELTA_MAX_RATIO * max(len(new.group_hashes), 1):
+            return None
+        return {
+            "key": self.row_key,
+            "upserts": [row for key in changed for row in new.groups[key]],
+            "removes": removes,
+            "fields": {
+                field: data[field] for field, field_hash in new.field_hashes.items()
+                if old.field_hashes.get(field) != field_hash
+            }
+        }
+
+
+# topic -> data cache key, message type and row layout
+REALTIME_TOPICS = {
+    "financial": TopicSpec("financial_dashboard", "financial_update", "unprofitable_clients", "id"),
+    "licenses": TopicSpec("license_optimizations", "license_update", "optimizations", "client_id"),
+    "anomalies": TopicSpec("anomalies", "anomaly_update", "anomalies", "client_id"),
+    "upsells": TopicSpec("upsell_opportunities", "upsell_update", "opportunities", "client_id")
+}
+
+
+class ConnectionChannel:
+    """
+    Bounded outbound queue for one WebSocket, drained by its own writer task
+    Enqueueing never waits on the network, so a slow client only ever delays itself. When the queue is full
+    the policy decides: `drop_oldest` discards the oldest pending frame, `coalesce` discards pending frames
+    of the same topic, falling back to the oldest frame, and `disconnect` closes the connection.
+    Topic updates are sequenced deltas, so discarding one leaves a gap: a coalesced topic gets one fresh
+    snapshot frame (from `snapshot`) in place of its discarded frames and the new one, which keeps the
+    client consistent without a resync round trip. Any other dropped frame shows up as a sequence gap and
+    the client asks for a resync.
+    """
+
+    def __init__(self, websocket: WebSocket, subscriptions: Set[str], counters: Dict[str, int],
+                 on_closed: Callable[["ConnectionChannel"], None], queue_size: int = SEND_QUEUE_SIZE,
+                 policy: str = SLOW_CONSUMER_POLICY, send_timeout: float = SEND_TIMEOUT,
+                 snapshot: Optional[Callable[[str], Optional[str]]] = None):
+        self.websocket = websocket
+        self.subscriptions = subscriptions
+        self.counters = counters
+        self.on_closed = on_closed
+        self.snapshot = snapshot
+        self.queue_size = max(1, queue_size)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.pending: deque = deque()
+        self.closed = False
+        self._ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.writer = asyncio.get_running_loop().create_task(self._write())
+
+    def enqueue(self, message: str, topic: Optional[str] = None) -> bool:
+        """Queue a frame for this connection; False when the connection is (or has just been) closed"""
+        if self.closed:
+            return False
+        if len(self.pending) >= self.queue_size:
+            if self.policy == "disconnect":
+                self.counters["slow_disconnects"] += 1
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return False
+            if self.policy == "coalesce" and topic is not None:
+                kept = deque(entry for entry in self.pending if entry[0] != topic)
+                coalesced = len(self.pending) - len(kept)
+                self.pending = kept
+                snapshot = self.snapshot(topic) if coalesced and self.snapshot is not None else None
+                if coalesced:
+                    self.counters["coalesced"] += coalesced
+                if snapshot is not None:
+                    # The current snapshot already includes this frame's change
+                    message = snapshot
+                    self.counters["resnapshots"] += 1
+            if len(self.pending) >= self.queue_size:
+                self.pending.popleft()
+                self.counters["dropped"] += 1
+        self.pending.append((topic, message))
+        self.counters["enqueued"] += 1
+        self._ready.set()
+        return True
+
+    async def _write(self):
+        try:
+            while True:
+                while not self.pending:
+                    self._ready.clear()
+                    await self._ready.wait()
+                _, message = self.pending.popleft()
+                if self.websocket.client_state != WebSocketState.CONNECTED:
+                    break
+                await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+                self.counters["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.counters["send_errors"] += 1
+            logger.error(f"Error sending to WebSocket: {e!r}")
+        self.close()
+
+    def close(self, code: Optional[int] = None):
+        """Stop the writer, drop anything still queued and unregister; `code` also closes the socket"""
+        if self.closed:
+            return
+        self.closed = True
+        self.pending.clear()
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        if code is not None:
+            asyncio.get_running_loop().create_task(self._close_socket(code))
+        self.on_closed(self)
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception as e:
+            logger.debug(f"Error closing slow WebSocket: {e!r}")
+
 
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time updates
     """
     
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size: int = SEND_QUEUE_SIZE, policy: str = SLOW_CONSUMER_POLICY,
+                 send_timeout: float = SEND_TIMEOUT):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
         self.connection_subscriptions: Dict[WebSocket, Set[str]] = {}
+        self.channels: Dict[WebSocket, ConnectionChannel] = {}
+        # topic -> subscribed connections (dicts as insertion-ordered sets); "all" is indexed like any topic
+        self.topic_subscribers: Dict[str, Dict[WebSocket, ConnectionChannel]] = {}
+        self.frames_encoded = 0
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.send_counters = {
+            "enqueued": 0,
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "resnapshots": 0,
+            "slow_disconnects": 0,
+            "send_errors": 0
+        }
         self.data_cache = {}
         self.last_update = {}
-        self.update_interval = 30  # seconds
+        # Fingerprint of each topic's cached data: change detection and delta rows without re-serializing it
+        self.fingerprints: Dict[str, TopicFingerprint] = {}
+        # Per-topic sequence numbers, incremented on every published snapshot or delta
+        self.sequences: Dict[str, int] = {}
+        # topic -> (seq, encoded snapshot) for resyncs and coalesced channels
+        self.snapshot_frames: Dict[str, Tuple[int, str]] = {}
+        self.delta_counters = {"snapshots": 0, "deltas": 0, "resyncs": 0, "rows_hashed": 0, "rows_reused": 0}
+        self.update_interval = UPDATE_INTERVAL
+        self.update_jitter = UPDATE_JITTER
         self.is_running = False
-        self.update_thread = None
+        self.update_task: Optional[asyncio.Task] = None
+        self._updating = False
+        self.cycles = 0
+        self.skipped_cycles = 0
+        self.updater_restarts = 0
+        self.last_cycle: Dict[str, Any] = {}
+        self.stage_timings: Dict[str, Dict[str, Any]] = {}
         
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.channels)
+    
     async def connect(self, websocket: WebSocket, subscriptions: List[str] = None):
-        """Accept a new WebSocket connection"""
+        """Accept a new WebSocket connection and start its writer"""
         await websocket.accept()
-        self.active_connections.append(websocket)
         self.connection_subscriptions[websocket] = set(subscriptions or [])
-        logger.info(f"✅ WebSocket connected. Total connections: {len(self.active_connections)}")
+        channel = ConnectionChannel(websocket, self.connection_subscriptions[websocket], self.send_counters,
+                                    self._channel_closed, self.queue_size, self.policy, self.send_timeout,
+                                    self._snapshot_frame)
+        self.channels[websocket] = channel
+        self._index(channel)
+        channel.start()
+        logger.info(f"✅ WebSocket connected. Total connections: {len(self.channels)}")
     
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.connection_subscriptions:
-            del self.connection_subscriptions[websocket]
-        logger.info(f"❌ WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            self._unindex(channel)
+            channel.close()
+        self.connection_subscriptions.pop(websocket, None)
+        logger.info(f"❌ WebSocket disconnected. Total connections: {len(self.channels)}")
+    
+    def _index(self, channel: ConnectionChannel):
+        for topic in channel.subscriptions:
+            self.topic_subscribers.setdefault(topic, {})[channel.websocket] = channel
+    
+    def _unindex(self, channel: ConnectionChannel):
+        for topic in channel.subscriptions:
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.pop(channel.websocket, None)
+                if not subscribers:
+                    del self.topic_subscribers[topic]
+    
+    def _channel_closed(self, channel: ConnectionChannel):
+        if self.channels.get(channel.websocket) is channel:
+            self.disconnect(channel.websocket)
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send message to a specific WebSocket"""
+        """Send message to a specific WebSocket (queued behind anything already pending for it)"""
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            channel.enqueue(message)
+            return
         try:
             if websocket.client_state == WebSocketState.CONNECTED:
                 await websocket.send_text(message)
@@ -57,275 +355,393 @@ class ConnectionManager:
             self.disconnect(websocket)
     
     async def broadcast(self, message: str, subscription_type: str = None):
-        """Broadcast message to all connected clients"""
-        if not self.active_connections:
+        """
+        Queue an already-encoded frame for every subscribed client; each connection's writer delivers it
+        Only the topic's subscribers (and "all" subscribers) are visited. Every recipient shares the same
+        frame object. The lists are copied because a full queue under the disconnect policy unregisters
+        its connection mid-loop.
+        """
+        if subscription_type is None:
+            for channel in list(self.channels.values()):
+                channel.enqueue(message)
             return
-        
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                # Check if client is subscribed to this type of update
-                if subscription_type and connection in self.connection_subscriptions:
-                    subscriptions = self.connection_subscriptions[connection]
-                    if subscription_type not in subscriptions and "all" not in subscriptions:
-                        continue
-                
-                if connection.client_state == WebSocketState.CONNECTED:
-                    await connection.send_text(message)
-                else:
-                    disconnected.append(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting to connection: {e}")
-                disconnected.append(connection)
-        
-        # Clean up disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        everyone = self.topic_subscribers.get("all", {})
+        for channel in list(everyone.values()):
+            channel.enqueue(message, subscription_type)
+        for channel in list(self.topic_subscribers.get(subscription_type, {}).values()):
+            if channel.websocket not in everyone:
+                channel.enqueue(message, subscription_type)
+    
+    async def publish(self, message: Dict[str, Any], subscription_type: str = None):
+        """Serialize a message once and broadcast the resulting frame"""
+        frame = fast_json.dumps_str(message)
+        self.frames_encoded += 1
+        await self.broadcast(frame, subscription_type)
     
     def update_subscription(self, websocket: WebSocket, subscriptions: List[str]):
         """Update subscription preferences for a connection"""
         if websocket in self.connection_subscriptions:
             self.connection_subscriptions[websocket] = set(subscriptions)
+            channel = self.channels.get(websocket)
+            if channel is not None:
+                self._unindex(channel)
+                channel.subscriptions = self.connection_subscriptions[websocket]
+                self._index(channel)
             logger.info(f"Updated subscriptions: {subscriptions}")
     
     def start_background_updates(self):
-        """Start background thread for periodic updates"""
-        if not self.is_running:
-            self.is_running = True
-            self.update_thread = Thread(target=self._background_update_loop, daemon=True)
-            self.update_thread.start()
-            logger.info("🔄 Started background update thread")
-    
-    def stop_background_updates(self):
-        """Stop background update thread"""
+        """Start the periodic updater as a task on the running event loop (the one serving the WebSockets)"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._spawn_updater()
+        logger.info("🔄 Started background update task")
+    
+    async def stop_background_updates(self):
+        """Cancel the updater and wait for it, interrupting any cycle in progress"""
         self.is_running = False
-        if self.update_thread:
-            self.update_thread.join()
-        logger.info("⏹️ Stopped background update thread")
+        task, self.update_task = self.update_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        logger.info("⏹️ Stopped background update task")
+    
+    def _spawn_updater(self, delay: float = 0.0):
+        self.update_task = asyncio.get_running_loop().create_task(self._background_update_loop(delay))
+        self.update_task.add_done_callback(self._supervise_updater)
     
-    def _background_update_loop(self):
-        """Background loop for periodic data updates"""
+    def _supervise_updater(self, task: asyncio.Task):
+        """Restart the updater if it ends while the service is still meant to be running"""
+        if task.cancelled() or not self.is_running or task is not self.update_task:
+            return
+        self.updater_restarts += 1
+        logger.error(f"Background updater stopped unexpectedly ({task.exception()!r}), restarting")
+        if not task.get_loop().is_closed():
+            self._spawn_updater(UPDATER_RESTART_DELAY)
+    
+    def _next_delay(self) -> float:
+        return max(0.0, self.update_interval * (1 + random.uniform(-self.update_jitter, self.update_jitter)))
+    
+    async def _background_update_loop(self, delay: float = 0.0):
+        """Run an update cycle every interval (jittered), measured from the start of the previous cycle"""
+        await asyncio.sleep(delay)
         while self.is_running:
-            try:
-                # Run the async update in a new event loop
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self._perform_background_update())
-                loop.close()
-            except Exception as e:
-                logger.error(f"Error in background update: {e}")
-            
-            time.sleep(self.update_interval)
+            started = time.monotonic()
+            await self._perform_background_update()
+            # A cycle that overran its interval is followed immediately by the next, never by a backlog
+            await asyncio.sleep(max(0.0, self._next_delay() - (time.monotonic() - started)))
+    
+    async def _perform_background_update(self) -> bool:
+        """Run every update stage once; returns False (and does nothing) if a cycle is already in progress"""
+        return await self.run_update("all")
     
-    async def _perform_background_update(self):
-        """Perform background data update and broadcast"""
+    async def run_update(self, update_type: str = "all") -> bool:
+        """
+        Run the stages for one update type ("all" for every stage), timing each one
+        Cycles never overlap: while one is running, another request is skipped rather than queued, since the
+        running cycle is already publishing current data.
+        """
+        if self._updating:
+            self.skipped_cycles += 1
+            return False
+        self._updating = True
+        started = time.perf_counter()
         try:
-            # Update financial data
-            await self._update_financial_data()
-            
-            # Update license data
-            await self._update_license_data()
-            
-            # Update anomaly data
-            await self._update_anomaly_data()
-            
-            # Update upsell opportunities
-            await self._update_upsell_data()
-            
+            for update, stage in UPDATE_STAGES.items():
+                if update_type in ("all", update):
+                    await self._run_stage(stage)
+        finally:
+            self._updating = False
+        self.cycles += 1
+        self.last_cycle = {
+            "update_type": update_type,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "finished_at": datetime.now().isoformat()
+        }
+        return True
+    
+    async def _run_stage(self, stage: str, *args):
+        started = time.perf_counter()
+        failed = False
+        try:
+            await getattr(self, stage)(*args)
         except Exception as e:
-            logger.error(f"Error in background update: {e}")
+            failed = True
+            logger.error(f"Error in background update stage {stage}: {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            timing = self.stage_timings.setdefault(stage, {"runs": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            timing["runs"] += 1
+            timing["errors"] += failed
+            timing["total_ms"] += elapsed_ms
+            timing["last_ms"] = round(elapsed_ms, 2)
+            timing["max_ms"] = round(max(timing["max_ms"], elapsed_ms), 2)
+    
+    def get_update_stats(self) -> Dict[str, Any]:
+        """Updater state and per-stage timings across cycles"""
+        return {
+            "running": self.update_task is not None and not self.update_task.done(),
+            "cycles": self.cycles,
+            "skipped_cycles": self.skipped_cycles,
+            "restarts": self.updater_restarts,
+            "interval_seconds": self.update_interval,
+            "jitter": self.update_jitter,
+            "last_cycle": self.last_cycle,
+            "stages": {
+                stage: {
+                    "runs": timing["runs"],
+                    "errors": timing["errors"],
+                    "last_ms": timing["last_ms"],
+                    "avg_ms": round(timing["total_ms"] / timing["runs"], 2),
+                    "max_ms": timing["max_ms"]
+                }
+                for stage, timing in self.stage_timings.items()
+            }
+        }
+    
+    async def refresh_topic(self, topic: str, changed: Optional[List[Dict[str, Any]]] = None,
+                            removed: Optional[List[Any]] = None):
+        """
+        Rebuild and publish one topic outside the update cycle, e.g. after a SuperOps webhook batch
+        The `changed` clients replace their entries in the current client snapshot and `removed` ids are
+        dropped from it, so the push carries the batch even if the snapshot was reloaded in the meantime.
+        The stage publishes through publish_topic like any cycle: subscribers get a sequenced delta of just
+        those clients' rows, removed clients as delta removes.
+        """
+        stage = UPDATE_STAGES[topic]
+        if not changed and not removed:
+            await self._run_stage(stage)
+            return
+        from superops_integration import superops_api
+        
+        clients = self.patch_clients(await superops_api.get_all_clients(), changed or [], removed or [])
+        await self._run_stage(stage, clients)
     
-    async def _update_financial_data(self):
-        """Update financial dashboard data"""
+    @staticmethod
+    def patch_clients(clients: List[Dict[str, Any]], changed: List[Dict[str, Any]],
+                      removed: List[Any]) -> List[Dict[str, Any]]:
+        """A new client list with `changed` records in place (new ones appended) and `removed` ids left out"""
+        by_id = {client.get('id'): client for client in changed}
+        removed = set(removed)
+        patched = [by_id.pop(client.get('id'), client) for client in clients if client.get('id') not in removed]
+        patched.extend(by_id.values())
+        return patched
+    
+    async def _update_financial_data(self, clients: Optional[List[Dict[str, Any]]] = None):
+        """Update financial dashboard data (built from SuperOps' own snapshot, which webhooks patch first)"""
         from superops_integration import superops_api
         
         try:
             dashboard_data = await superops_api.get_financial_dashboard_data()
-            
-            # Check if data has changed
-            data_key = "financial_dashboard"
-            if self._has_data_changed(data_key, dashboard_data):
-                self.data_cache[data_key] = dashboard_data
-                self.last_update[data_key] = datetime.now()
-                
-                message = {
-                    "type": "financial_update",
-                    "data": dashboard_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                await self.broadcast(json.dumps(message), "financial")
-                logger.info("📊 Broadcasted financial data update")
+            await self.publish_topic("financial", dashboard_data)
         except Exception as e:
             logger.error(f"Error updating financial data: {e}")
     
-    async def _update_license_data(self):
+    async def _update_license_data(self, clients: Optional[List[Dict[str, Any]]] = None):
         """Update license optimization data"""
         from superops_integration import superops_api
         
         try:
-            clients = await superops_api.get_all_clients()
-            license_optimizations = []
-            total_savings = 0
-            
-            for client in clients:
-                client_optimizations = []
-                for license_type, license_data in client.get('licenses', {}).items():
-                    unused = license_data.get('total', 0) - license_data.get('used', 0)
-                    if unused > 0:
-                        monthly_savings = unused * license_data.get('cost_per_license', 0)
-                        total_savings += monthly_savings * 12
-                        
-                        client_optimizations.append({
-                            "license_type": license_type,
-                            "unused_licenses": unused,
-                            "monthly_savings": monthly_savings,
-                            "annual_savings": monthly_savings * 12
-                        })
-                
-                if client_optimizations:
-                    license_optimizations.append({
-                        "client_id": client.get('id'),
-                        "client_name": client.get('name'),
-                        "optimizations": client_optimizations
-                    })
-            
-            data_key = "license_optimizations"
-            optimization_data = {
-                "optimizations": license_optimizations,
-                "total_annual_savings": total_savings
-            }
-            
-            if self._has_data_changed(data_key, optimization_data):
-                self.data_cache[data_key] = optimization_data
-                self.last_update[data_key] = datetime.now()
-                
-                message = {
-                    "type": "license_update",
-                    "data": optimization_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                await self.broadcast(json.dumps(message), "licenses")
-                logger.info("🔑 Broadcasted license optimization update")
+            if clients is None:
+                clients = await superops_api.get_all_clients()
+            await self.publish_topic("licenses", self.license_optimization_data(clients), self.client_sources(clients))
         except Exception as e:
             logger.error(f"Error updating license data: {e}")
     
-    async def _update_anomaly_data(self):
+    async def _update_anomaly_data(self, clients: Optional[List[Dict[str, Any]]] = None):
         """Update anomaly detection data"""
         from superops_integration import superops_api
         
         try:
-            clients = await superops_api.get_all_clients()
-            anomalies = []
-            
-            for client in clients:
-                # Check for low margin anomaly
-                if client.get('margin', 0) < 0:
-                    anomalies.append({
-                        "type": "low_margin",
-                        "severity": "high",
-                        "client_id": client.get('id'),
-                        "client_name": client.get('name'),
-                        "description": f"Client operating at {client.get('margin')} monthly loss",
-                        "impact": f"${abs(client.get('margin')) * 12} annual loss"
-                    })
-                
-                # Check for high ticket volume
-                if client.get('tickets_last_month', 0) > 30:
-                    anomalies.append({
-                        "type": "high_support_load",
-                        "severity": "medium",
-                        "client_id": client.get('id'),
-                        "client_name": client.get('name'),
-                        "description": f"{client.get('tickets_last_month')} tickets last month",
-                        "impact": "Increased support costs"
-                    })
-            
-            data_key = "anomalies"
-            anomaly_data = {"anomalies": anomalies}
-            
-            if self._has_data_changed(data_key, anomaly_data):
-                self.data_cache[data_key] = anomaly_data
-                self.last_update[data_key] = datetime.now()
-                
-                message = {
-                    "type": "anomaly_update",
-                    "data": anomaly_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                await self.broadcast(json.dumps(message), "anomalies")
-                logger.info(f"🔍 Broadcasted {len(anomalies)} anomalies")
+            if clients is None:
+                clients = await superops_api.get_all_clients()
+            await self.publish_topic("anomalies", self.anomaly_data(clients), self.client_sources(clients))
         except Exception as e:
             logger.error(f"Error updating anomaly data: {e}")
     
-    async def _update_upsell_data(self):
+    async def _update_upsell_data(self, clients: Optional[List[Dict[str, Any]]] = None):
         """Update upsell opportunities data"""
         from superops_integration import superops_api
         
         try:
-            clients = await superops_api.get_all_clients()
-            opportunities = []
-            
-            for client in clients:
-                client_opportunities = []
-                
-                # Security upsell based on incidents
-                if client.get('security_incidents', 0) >= 5:
-                    client_opportunities.append({
-                        "service": "Premium Cybersecurity Package",
-                        "monthly_value": 2000,
-                        "annual_value": 24000,
-                        "confidence": 85,
-                        "reason": f"{client.get('security_incidents')} security incidents"
-                    })
-                
-                # Support upsell based on tickets
-                if client.get('tickets_last_month', 0) > 20:
-                    client_opportunities.append({
-                        "service": "Enhanced Support & Monitoring",
-                        "monthly_value": 1200,
-                        "annual_value": 14400,
-                        "confidence": 75,
-                        "reason": f"{client.get('tickets_last_month')} support tickets"
-                    })
-                
-                if client_opportunities:
-                    opportunities.append({
-                        "client_id": client.get('id'),
-                        "client_name": client.get('name'),
-                        "opportunities": client_opportunities,
-                        "total_potential_annual": sum(o['annual_value'] for o in client_opportunities)
-                    })
-            
-            data_key = "upsell_opportunities"
-            upsell_data = {"opportunities": opportunities}
-            
-            if self._has_data_changed(data_key, upsell_data):
-                self.data_cache[data_key] = upsell_data
-                self.last_update[data_key] = datetime.now()
-                
-                message = {
-                    "type": "upsell_update",
-                    "data": upsell_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                await self.broadcast(json.dumps(message), "upsells")
-                logger.info(f"📈 Broadcasted {len(opportunities)} upsell opportunities")
+            if clients is None:
+                clients = await superops_api.get_all_clients()
+            await self.publish_topic("upsells", self.upsell_data(clients), self.client_sources(clients))
         except Exception as e:
             logger.error(f"Error updating upsell data: {e}")
     
-    def _has_data_changed(self, data_key: str, new_data: Dict[str, Any]) -> bool:
-        """Check if data has changed since last update"""
-        if data_key not in self.data_cache:
-            return True
+    @staticmethod
+    def client_sources(clients: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """Client id -> record, the source of every per-client row in the topics"""
+        return {client.get('id'): client for client in clients}
+    
+    @staticmethod
+    def license_optimization_data(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Unused licenses per client and the portfolio's annual savings"""
+        license_optimizations = []
+        total_savings = 0
+        
+        for client in clients:
+            client_optimizations = []
+            for license_type, license_data in client.get('licenses', {}).items():
+                unused = license_data.get('total', 0) - license_data.get('used', 0)
+                if unused > 0:
+                    monthly_savings = unused * license_data.get('cost_per_license', 0)
+                    total_savings += monthly_savings * 12
+                    
+                    client_optimizations.append({
+                        "license_type": license_type,
+                        "unused_licenses": unused,
+                        "monthly_savings": monthly_savings,
+                        "annual_savings": monthly_savings * 12
+                    })
+            
+            if client_optimizations:
+                license_optimizations.append({
+                    "client_id": client.get('id'),
+                    "client_name": client.get('name'),
+                    "optimizations": client_optimizations
+                })
+        
+        return {
+            "optimizations": license_optimizations,
+            "total_annual_savings": total_savings
+        }
+    
+    @staticmethod
+    def anomaly_data(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+        from client_frame import ClientFrame
+        from anomaly_rules import anomaly_rules
+        
+        return {"anomalies": anomaly_rules.detect(ClientFrame.from_records(clients))["anomalies"]}
+    
+    @staticmethod
+    def upsell_data(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Security and support upsell opportunities per client"""
+        opportunities = []
+        
+        for client in clients:
+            client_opportunities = []
+            
+            # Security upsell based on incidents
+            if client.get('security_incidents', 0) >= 5:
+                client_opportunities.append({
+                    "service": "Premium Cybersecurity Package",
+                    "monthly_value": 2000,
+                    "annual_value": 24000,
+                    "confidence": 85,
+                    "reason": f"{client.get('security_incidents')} security incidents"
+                })
+            
+            # Support upsell based on tickets
+            if client.get('tickets_last_month', 0) > 20:
+                client_opportunities.append({
+                    "service": "Enhanced Support & Monitoring",
+                    "monthly_value": 1200,
+                    "annual_value": 14400,
+                    "confidence": 75,
+                    "reason": f"{client.get('tickets_last_month')} support tickets"
+                })
+            
+            if client_opportunities:
+                opportunities.append({
+                    "client_id": client.get('id'),
+                    "client_name": client.get('name'),
+                    "opportunities": client_opportunities,
+                    "total_potential_annual": sum(o['annual_value'] for o in client_opportunities)
+                })
         
-        old_data = self.data_cache[data_key]
+        return {"opportunities": opportunities}
+    
+    async def publish_topic(self, topic: str, data: Dict[str, Any],
+                            sources: Optional[Dict[Any, Any]] = None) -> Optional[int]:
+        """
+        Publish a topic's latest data if it changed; returns the sequence number used, None when unchanged
+        Subscribers get a keyed delta against the previous version, or the full snapshot when there is no
+        previous version or most rows changed. Every message carries the topic's next sequence number, so a
+        client that sees a gap (a frame dropped by its send queue, or joining mid-stream) asks for a resync.
+        `sources` (row key -> the client record its rows came from) lets unchanged rows skip re-hashing.
+        """
+        spec = REALTIME_TOPICS[topic]
+        previous = self.fingerprints.get(spec.data_key)
+        fingerprint = spec.fingerprint(data, sources, previous)
+        self.delta_counters["rows_hashed"] += fingerprint.hashed
+        self.delta_counters["rows_reused"] += fingerprint.reused
+        if not self._has_data_changed(spec.data_key, fingerprint):
+            # Keep the newer sources so the next cycle compares against the current client objects
+            self.fingerprints[spec.data_key] = fingerprint
+            return None
+        self.fingerprints[spec.data_key] = fingerprint
+        self.data_cache[spec.data_key] = data
+        self.last_update[spec.data_key] = datetime.now()
+        seq = self.sequences[topic] = self.sequences.get(topic, 0) + 1
         
-        # Simple comparison - in production, use more sophisticated diff
-        return json.dumps(old_data, sort_keys=True) != json.dumps(new_data, sort_keys=True)
+        delta = spec.diff(previous, fingerprint, data) if previous is not None else None
+        if delta is None:
+            message = self._snapshot_message(topic)
+            self.delta_counters["snapshots"] += 1
+        else:
+            message = {
+                "type": spec.message_type,
+                "topic": topic,
+                "seq": seq,
+                "delta": delta,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.delta_counters["deltas"] += 1
+        await self.publish(message, topic)
+        logger.info(f"📡 Published {topic} {'delta' if delta is not None else 'snapshot'} #{seq}")
+        return seq
+    
+    def _snapshot_message(self, topic: str) -> Dict[str, Any]:
+        spec = REALTIME_TOPICS[topic]
+        return {
+            "type": spec.message_type,
+            "topic": topic,
+            "seq": self.sequences.get(topic, 0),
+            "snapshot": True,
+            "data": self.data_cache[spec.data_key],
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _snapshot_frame(self, topic: str) -> Optional[str]:
+        """A topic's current snapshot, encoded once per sequence number and shared by every channel"""
+        spec = REALTIME_TOPICS.get(topic)
+        if spec is None or spec.data_key not in self.data_cache:
+            return None
+        seq = self.sequences.get(topic, 0)
+        cached = self.snapshot_frames.get(topic)
+        if cached is None or cached[0] != seq:
+            cached = self.snapshot_frames[topic] = (seq, fast_json.dumps_str(self._snapshot_message(topic)))
+        return cached[1]
+    
+    async def send_snapshot(self, websocket: WebSocket, topics: Optional[List[str]] = None):
+        """
+        Resync one client: the full current data and sequence number of each requested topic
+        Without topics, every topic the client subscribes to. The snapshot is queued behind any frames
+        already pending for the client, so later deltas still apply to it in order.
+        """
+        subscriptions = self.connection_subscriptions.get(websocket, set())
+        if not topics:
+            topics = list(REALTIME_TOPICS) if "all" in subscriptions else list(subscriptions)
+        channel = self.channels.get(websocket)
+        for topic in topics:
+            frame = self._snapshot_frame(topic)
+            if frame is None:
+                continue
+            self.delta_counters["resyncs"] += 1
+            if channel is not None:
+                channel.enqueue(frame, topic)
+            else:
+                await self.send_personal_message(frame, websocket)
+    
+    def _has_data_changed(self, data_key: str, fingerprint: TopicFingerprint) -> bool:
+        """Check if data has changed since last update by comparing fingerprint roots"""
+        previous = self.fingerprints.get(data_key)
+        return previous is None or previous.root != fingerprint.root
     
     async def send_immediate_update(self, update_type: str, data: Dict[str, Any]):
         """Send immediate update to all connected clients"""
@@ -336,24 +752,32 @@ class ConnectionManager:
             "immediate": True
         }
         
-        await self.broadcast(json.dumps(message))
+        await self.publish(message)
         logger.info(f"⚡ Sent immediate update: {update_type}")
     
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get connection statistics"""
         return {
-            "active_connections": len(self.active_connections),
-            "subscription_types": list(set(
-                sub for subs in self.connection_subscriptions.values() 
-                for sub in subs
-            )),
+            "active_connections": len(self.channels),
+            "subscription_types": list(self.topic_subscribers),
+            "subscribers_per_topic": {topic: len(subscribers) for topic, subscribers in self.topic_subscribers.items()},
+            "frames_encoded": self.frames_encoded,
+            "sequences": dict(self.sequences),
+            "delta_stream": dict(self.delta_counters),
             "cached_data_keys": list(self.data_cache.keys()),
             "last_updates": {
                 key: value.isoformat() 
                 for key, value in self.last_update.items()
             },
             "update_interval": self.update_interval,
-            "is_running": self.is_running
+            "is_running": self.is_running,
+            "send_queues": {
+                **self.send_counters,
+                "policy": self.policy,
+                "queue_size": self.queue_size,
+                "queued": sum(len(channel.pending) for channel in self.channels.values()),
+                "deepest_queue": max((len(channel.pending) for channel in self.channels.values()), default=0)
+            }
         }
 
 
@@ -378,26 +802,17 @@ class RealtimeDataService:
     
     async def stop_service(self):
         """Stop the real-time data service"""
-        self.manager.stop_background_updates()
+        await self.manager.stop_background_updates()
         logger.info("⏹️ Real-time data service stopped")
     
     async def trigger_manual_update(self, update_type: str = "all"):
         """Manually trigger a data update"""
         try:
-            if update_type == "all" or update_type == "financial":
-                await self.manager._update_financial_data()
-            
-            if update_type == "all" or update_type == "licenses":
-                await self.manager._update_license_data()
-            
-            if update_type == "all" or update_type == "anomalies":
-                await self.manager._update_anomaly_data()
-            
-            if update_type == "all" or update_type == "upsells":
-                await self.manager._update_upsell_data()
-            
-            self.update_count += 1
-            logger.info(f"🔄 Manual update triggered: {update_type}")
+            if await self.manager.run_update(update_type):
+                self.update_count += 1
+                logger.info(f"🔄 Manual update triggered: {update_type}")
+            else:
+                logger.info(f"🔄 Manual update skipped, a cycle is already running: {update_type}")
             
         except Exception as e:
             logger.error(f"Error in manual update: {e}")
@@ -419,7 +834,8 @@ class RealtimeDataService:
         return {
             "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
             "total_updates": self.update_count,
-            "connection_stats": self.manager.get_connection_stats()
+            "connection_stats": self.manager.get_connection_stats(),
+            "updates": self.manager.get_update_stats()
         }
 
 
@@ -5,15 +5,48 @@ Real-time PSA/RMM data integration for live financial analysis
 import requests
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, AsyncIterable, AsyncIterator, Iterable, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import os
 import asyncio
 import aiohttp
+import numpy as np
+
+from client_frame import ClientFrame
+from flow_control import FlowControl, flow_control_from_env
+from read_through_cache import ReadThroughCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Clients enriched concurrently; each one issues its contracts, tickets and inventory requests in parallel
+ENRICH_CONCURRENCY = int(os.getenv('SUPEROPS_ENRICH_CONCURRENCY', '16'))
+# Pooled session: open connections per SuperOps host, idle keep-alive and DNS cache lifetimes (seconds)
+CONNECTION_LIMIT_PER_HOST = int(os.getenv('SUPEROPS_CONNECTION_LIMIT', '64'))
+KEEPALIVE_TIMEOUT = float(os.getenv('SUPEROPS_KEEPALIVE_SECONDS', '30'))
+DNS_CACHE_TTL = int(os.getenv('SUPEROPS_DNS_CACHE_SECONDS', '300'))
+REQUEST_TIMEOUT = float(os.getenv('SUPEROPS_REQUEST_TIMEOUT', '30'))
+# Records requested per page when following SuperOps pagination cursors
+PAGE_SIZE = int(os.getenv('SUPEROPS_PAGE_SIZE', '100'))
+# Tickets counted towards `tickets_last_month`
+TICKET_WINDOW_DAYS = 30
+# Read-through cache: seconds a response is fresh, then served stale while one background load refreshes it
+CACHE_TTL = float(os.getenv('SUPEROPS_CACHE_TTL', '30'))
+CACHE_STALE_SECONDS = float(os.getenv('SUPEROPS_CACHE_STALE_SECONDS', '120'))
+CACHE_MAX_ENTRIES = int(os.getenv('SUPEROPS_CACHE_MAX_ENTRIES', '4096'))
+# Freshness per cached resource; software inventory changes far less often than tickets and contracts
+CACHE_TTLS = {
+    'clients': CACHE_TTL,
+    'client': CACHE_TTL,
+    'tickets': CACHE_TTL,
+    'licenses': CACHE_TTL * 10,
+    'license_index': CACHE_TTL * 10
+}
+# Inventory is read tenant-wide in one paged pass, so it asks for the largest page SuperOps serves
+INVENTORY_PAGE_SIZE = int(os.getenv('SUPEROPS_INVENTORY_PAGE_SIZE', '500'))
+# Oldest client snapshot (seconds) the dashboard is built from before it waits for a reload
+DASHBOARD_MAX_AGE = float(os.getenv('SUPEROPS_DASHBOARD_MAX_AGE', '300'))
+
 
 class SuperOpsAPI:
     """
@@ -21,22 +54,118 @@ class SuperOpsAPI:
     Provides live client data, tickets, contracts, and financial metrics
     """
     
-    def __init__(self):
-        self.base_url = os.getenv('SUPEROPS_BASE_URL', 'https://api.superops.com/v1')
-        self.api_key = os.getenv('SUPEROPS_API_KEY')
-        self.tenant_id = os.getenv('SUPEROPS_TENANT_ID')
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 tenant_id: Optional[str] = None, enrich_concurrency: int = ENRICH_CONCURRENCY,
+                 flow_control: Optional[FlowControl] = None):
+        self.base_url = base_url or os.getenv('SUPEROPS_BASE_URL', 'https://api.superops.com/v1')
+        self.api_key = api_key or os.getenv('SUPEROPS_API_KEY')
+        self.tenant_id = tenant_id or os.getenv('SUPEROPS_TENANT_ID')
+        self.enrich_concurrency = max(1, enrich_concurrency)
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json',
             'X-Tenant-ID': self.tenant_id
         }
         self.api_available = bool(self.api_key and self.tenant_id)
+        # Local copy kept current by superops_sync; when set and synced, the client list is read from it
+        self.local_source = None
+        self.cache = ReadThroughCache(ttl=CACHE_TTL, stale_ttl=CACHE_STALE_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+        # Adaptive concurrency, per-tenant rate budget and retries, applied to every request on the session
+        self.flow_control = flow_control or flow_control_from_env(CONNECTION_LIMIT_PER_HOST)
+        # Last client snapshot the dashboard was reduced from, and that reduction
+        self._dashboard: Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connection_counters = {
+            'sessions_opened': 0,
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
         
         if self.api_available:
             logger.info("✅ SuperOps API integration initialized")
         else:
             logger.warning("⚠️ SuperOps API credentials not found. Using mock mode.")
     
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count requests, new vs reused connections and DNS cache hits on the pooled session"""
+        counters = self._connection_counters
+        
+        def count(name: str):
+            async def handler(session, context, params):
+                counters[name] += 1
+            return handler
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(count('requests'))
+        trace_config.on_connection_create_end.append(count('connections_created'))
+        trace_config.on_connection_reuseconn.append(count('connections_reused'))
+        trace_config.on_dns_cache_hit.append(count('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(count('dns_cache_misses'))
+        return trace_config
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """Open the process-wide pooled session (called on application startup)"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is loop:
+            return self._session
+        if self._session is not None and self._session_loop is loop:
+            await self._session.close()
+        
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_TTL
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            trace_configs=[self._trace_config()],
+            middlewares=(self.flow_control.middleware,)
+        )
+        self._session_loop = loop
+        self._connection_counters['sessions_opened'] += 1
+        logger.info(f"✅ SuperOps session pool opened ({CONNECTION_LIMIT_PER_HOST} connections per host)")
+        return self._session
+    
+    async def close(self):
+        """Close the pooled session and its connections (called on application shutdown)"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed and self._session_loop is asyncio.get_running_loop():
+            await session.close()
+        self._session_loop = None
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """The pooled session, opened on first use when startup did not open it (scripts, tests)"""
+        if self._session is None or self._session.closed or self._session_loop is not asyncio.get_running_loop():
+            return await self.start()
+        return self._session
+    
+    def invalidate_client(self, client_id: str):
+        """Drop cached data touching one client, including the tenant-wide client list"""
+        self.cache.invalidate(('clients',))
+        self.cache.invalidate_where(lambda key: len(key) > 1 and key[1] == client_id)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+    
+    def flow_control_stats(self) -> Dict[str, Any]:
+        return self.flow_control.stats()
+    
+    def connection_stats(self) -> Dict[str, Any]:
+        """Connection reuse counters for the pooled session"""
+        counters = dict(self._connection_counters)
+        connections = counters['connections_created'] + counters['connections_reused']
+        counters['reuse_ratio'] = round(counters['connections_reused'] / connections, 3) if connections else 0
+        counters['session_open'] = self._session is not None and not self._session.closed
+        counters['limit_per_host'] = CONNECTION_LIMIT_PER_HOST
+        return counters
+    
     async def get_all_clients(self) -> List[Dict[str, Any]]:
         """
         Fetch all clients from SuperOps with financial data
@@ -45,29 +174,115 @@ class SuperOpsAPI:
             return self._get_mock_clients()
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # Get clients
-                clients_url = f"{self.base_url}/clients"
-                async with session.get(clients_url, headers=self.headers) as response:
-                    if response.status == 200:
-                        clients_data = await response.json()
-                        clients = clients_data.get('data', [])
-                        
-                        # Enrich each client with financial data
-                        enriched_clients = []
-                        for client in clients:
-                            enriched_client = await self._enrich_client_data(session, client)
-                            enriched_clients.append(enriched_client)
-                        
-                        logger.info(f"✅ Fetched {len(enriched_clients)} clients from SuperOps")
-                        return enriched_clients
-                    else:
-                        logger.error(f"SuperOps API error: {response.status}")
-                        return self._get_mock_clients()
+            return await self.cache.get(('clients',), self._fetch_all_clients, CACHE_TTLS['clients'])
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"SuperOps API error: {e.status}")
+            return self._get_mock_clients()
         except Exception as e:
             logger.error(f"Error fetching clients from SuperOps: {e}")
             return self._get_mock_clients()
     
+    async def _fetch_all_clients(self) -> List[Dict[str, Any]]:
+        if self.local_source is not None and self.local_source.ready:
+            return await asyncio.to_thread(self.local_source.load_clients)
+        
+        session = await self.get_session()
+        
+        # Enrichment completes out of order; slot each client back into tenant order
+        completed: Dict[int, Dict[str, Any]] = {}
+        async for position, enriched_client in self._fan_out_enrichment(session, self.iter_clients()):
+            completed[position] = enriched_client
+        enriched_clients = [completed[position] for position in range(len(completed))]
+        
+        logger.info(f"✅ Fetched {len(enriched_clients)} clients from SuperOps")
+        return enriched_clients
+    
+    async def refresh_clients(self, client_ids: List[str], inventory_changed: bool = False,
+                              client_records: Optional[Dict[str, Dict[str, Any]]] = None,
+                              removed: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Recompute only the given clients and patch them into the cached client list
+        Reads the local store when it is synced, otherwise re-enriches just those clients upstream, starting
+        from `client_records` (new client fields) or their cached entry; `removed` clients are dropped. Returns
+        the refreshed clients; when no client list is cached there is nothing to patch, and the next read
+        loads it.
+        """
+        removed = set(removed or ())
+        client_ids = [client_id for client_id in client_ids if client_id not in removed]
+        touched = set(client_ids) | removed
+        if inventory_changed:
+            self.cache.invalidate(('license_index',))
+        self.cache.invalidate_where(lambda key: len(key) > 1 and key[1] in touched)
+        
+        snapshot = self.cache.peek(('clients',))
+        if not self.api_available or snapshot is None or not touched:
+            return []
+        
+        if not client_ids:
+            refreshed = []
+        elif self.local_source is not None and self.local_source.ready:
+            refreshed = await asyncio.to_thread(self.local_source.load_clients, client_ids)
+        else:
+            known = {client.get('id'): client for client in snapshot}
+            known.update(client_records or {})
+            bases = [known.get(client_id, {'id': client_id}) for client_id in client_ids]
+            session = await self.get_session()
+            refreshed = [client async for _, client in self._fan_out_enrichment(session, bases)]
+        
+        # Copy-on-write: readers holding the previous list keep a consistent snapshot
+        by_id = {client['id']: client for client in refreshed}
+        patched = [by_id.pop(client.get('id'), client) for client in snapshot if client.get('id') not in removed]
+        patched.extend(by_id.values())
+        self.cache.put(('clients',), patched, CACHE_TTLS['clients'])
+        return refreshed
+    
+    async def iter_all_clients(self, concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream enriched clients as soon as each one completes (completion order, not tenant order)
+        Upstream errors propagate to the caller instead of falling back to mock data mid-stream.
+        """
+        if not self.api_available:
+            for client in self._get_mock_clients():
+                yield client
+            return
+        
+        session = await self.get_session()
+        async for _, enriched_client in self._fan_out_enrichment(session, self.iter_clients(), concurrency):
+            yield enriched_client
+    
+    async def iter_clients(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the tenant's client records (not enriched) page by page, following pagination cursors
+        The next page is requested while the current one is consumed; upstream errors propagate.
+        """
+        if not self.api_available:
+            for client in self._get_mock_clients():
+                yield client
+            return
+        
+        async for page in self.iter_pages('/clients'):
+            for client in page:
+                yield client
+    
+    async def iter_tickets(self, client_id: str, since: Optional[datetime] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a client's tickets created after `since` (default: the last 30 days) across all pages
+        """
+        if not self.api_available:
+            for ticket in self._get_mock_tickets(client_id):
+                yield ticket
+            return
+        
+        async for page in self.iter_pages('/tickets', self._ticket_params(client_id, since)):
+            for ticket in page:
+                yield ticket
+    
+    async def iter_pages(self, path: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream the pages of any paginated SuperOps listing on the pooled session; upstream errors propagate"""
+        session = await self.get_session()
+        async for page in self._iter_pages(session, f"{self.base_url}{path}", params or {}):
+            yield page
+    
     async def get_client_financial_data(self, client_id: str) -> Dict[str, Any]:
         """
         Get comprehensive financial data for a specific client
@@ -76,40 +291,43 @@ class SuperOpsAPI:
             return self._get_mock_client_financial_data(client_id)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # Get client basic info
-                client_url = f"{self.base_url}/clients/{client_id}"
-                async with session.get(client_url, headers=self.headers) as response:
-                    if response.status != 200:
-                        return self._get_mock_client_financial_data(client_id)
-                    
-                    client_data = await response.json()
-                
-                # Get financial data
-                financial_data = await self._get_client_financial_metrics(session, client_id)
-                
-                # Get recent tickets
-                tickets = await self._get_client_tickets(session, client_id)
-                
-                # Get contracts
-                contracts = await self._get_client_contracts(session, client_id)
-                
-                # Combine all data
-                enriched_data = {
-                    **client_data,
-                    **financial_data,
-                    'tickets_last_month': len(tickets),
-                    'contracts': contracts,
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-                logger.info(f"✅ Fetched financial data for client {client_id}")
-                return enriched_data
-                
+            return await self.cache.get(('client', client_id), lambda: self._fetch_client_financial_data(client_id),
+                                        CACHE_TTLS['client'])
         except Exception as e:
             logger.error(f"Error fetching client financial data: {e}")
             return self._get_mock_client_financial_data(client_id)
     
+    async def _fetch_client_financial_data(self, client_id: str) -> Dict[str, Any]:
+        session = await self.get_session()
+        # Get client basic info
+        client_url = f"{self.base_url}/clients/{client_id}"
+        async with session.get(client_url, headers=self.headers) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+            
+            client_data = await response.json()
+        
+        # Get financial data
+        financial_data = await self._get_client_financial_metrics(session, client_id)
+        
+        # Get recent tickets
+        tickets = await self._get_client_tickets(session, client_id)
+        
+        # Get contracts
+        contracts = await self._get_client_contracts(session, client_id)
+        
+        # Combine all data
+        enriched_data = {
+            **client_data,
+            **financial_data,
+            'tickets_last_month': len(tickets),
+            'contracts': contracts,
+            'last_updated': datetime.now().isoformat()
+        }
+        
+        logger.info(f"✅ Fetched financial data for client {client_id}")
+        return enriched_data
+    
     async def get_client_tickets(self, client_id: str, days: int = 30) -> List[Dict[str, Any]]:
         """
         Get recent tickets for a client
@@ -117,23 +335,14 @@ class SuperOpsAPI:
         if not self.api_available:
             return self._get_mock_tickets(client_id)
         
+        async def fetch_tickets() -> List[Dict[str, Any]]:
+            since = datetime.now() - timedelta(days=days)
+            tickets = [ticket async for ticket in self.iter_tickets(client_id, since)]
+            logger.info(f"✅ Fetched {len(tickets)} tickets for client {client_id}")
+            return tickets
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                tickets_url = f"{self.base_url}/tickets"
-                params = {
-                    'client_id': client_id,
-                    'created_after': (datetime.now() - timedelta(days=days)).isoformat(),
-                    'limit': 100
-                }
-                
-                async with session.get(tickets_url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        tickets_data = await response.json()
-                        tickets = tickets_data.get('data', [])
-                        logger.info(f"✅ Fetched {len(tickets)} tickets for client {client_id}")
-                        return tickets
-                    else:
-                        return self._get_mock_tickets(client_id)
+            return await self.cache.get(('tickets', client_id, days), fetch_tickets, CACHE_TTLS['tickets'])
         except Exception as e:
             logger.error(f"Error fetching tickets: {e}")
             return self._get_mock_tickets(client_id)
@@ -145,28 +354,59 @@ class SuperOpsAPI:
         if not self.api_available:
             return self._get_mock_license_data(client_id)
         
+        # A loaded tenant-wide index answers without a request; one client alone is not worth a full pull
+        license_index = self.cache.peek(('license_index',))
+        if license_index is not None:
+            return license_index.get(client_id, {})
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                # Get software inventory
-                inventory_url = f"{self.base_url}/inventory/software"
-                params = {'client_id': client_id}
-                
-                async with session.get(inventory_url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        inventory_data = await response.json()
-                        software_items = inventory_data.get('data', [])
-                        
-                        # Process license data
-                        license_data = self._process_license_inventory(software_items)
-                        
-                        logger.info(f"✅ Fetched license data for client {client_id}")
-                        return license_data
-                    else:
-                        return self._get_mock_license_data(client_id)
+            return await self.cache.get(('licenses', client_id), lambda: self._fetch_license_usage_data(client_id),
+                                        CACHE_TTLS['licenses'])
         except Exception as e:
             logger.error(f"Error fetching license data: {e}")
             return self._get_mock_license_data(client_id)
     
+    async def _fetch_license_usage_data(self, client_id: str) -> Dict[str, Any]:
+        session = await self.get_session()
+        # Get software inventory
+        inventory_url = f"{self.base_url}/inventory/software"
+        params = {'client_id': client_id}
+        
+        async with session.get(inventory_url, headers=self.headers, params=params) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+            inventory_data = await response.json()
+        
+        # Process license data
+        license_data = self._process_license_inventory(inventory_data.get('data', []))
+        
+        logger.info(f"✅ Fetched license data for client {client_id}")
+        return license_data
+    
+    async def get_license_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        License tables for every client (client_id -> license table), built from one paged pass over the
+        tenant's software inventory and cached like the per-client license data
+        """
+        if not self.api_available:
+            return {client['id']: client['licenses'] for client in self._get_mock_clients()}
+        
+        return await self.cache.get(('license_index',), self._load_license_index, CACHE_TTLS['license_index'])
+    
+    async def _load_license_index(self) -> Dict[str, Dict[str, Any]]:
+        items_by_client: Dict[str, List[Dict[str, Any]]] = {}
+        async for page in self.iter_pages('/inventory/software', {'limit': INVENTORY_PAGE_SIZE}):
+            for item in page:
+                client_id = item.get('client_id')
+                if client_id is not None:
+                    items_by_client.setdefault(client_id, []).append(item)
+        
+        license_index = {
+            client_id: self._process_license_inventory(items) for client_id, items in items_by_client.items()
+        }
+        logger.info(f"✅ Indexed software inventory for {len(license_index)} clients")
+        return license_index
+    
     async def create_quote(self, client_id: str, quote_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a quote in SuperOps
@@ -175,23 +415,23 @@ class SuperOpsAPI:
             return self._create_mock_quote(client_id, quote_data)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                quote_url = f"{self.base_url}/quotes"
-                quote_payload = {
-                    'client_id': client_id,
-                    'items': quote_data.get('items', []),
-                    'notes': quote_data.get('notes', ''),
-                    'valid_until': quote_data.get('valid_until')
-                }
-                
-                async with session.post(quote_url, headers=self.headers, json=quote_payload) as response:
-                    if response.status == 201:
-                        quote_result = await response.json()
-                        logger.info(f"✅ Created quote {quote_result.get('id')} for client {client_id}")
-                        return quote_result
-                    else:
-                        logger.error(f"Error creating quote: {response.status}")
-                        return self._create_mock_quote(client_id, quote_data)
+            session = await self.get_session()
+            quote_url = f"{self.base_url}/quotes"
+            quote_payload = {
+                'client_id': client_id,
+                'items': quote_data.get('items', []),
+                'notes': quote_data.get('notes', ''),
+                'valid_until': quote_data.get('valid_until')
+            }
+            
+            async with session.post(quote_url, headers=self.headers, json=quote_payload) as response:
+                if response.status == 201:
+                    quote_result = await response.json()
+                    logger.info(f"✅ Created quote {quote_result.get('id')} for client {client_id}")
+                    return quote_result
+                else:
+                    logger.error(f"Error creating quote: {response.status}")
+                    return self._create_mock_quote(client_id, quote_data)
         except Exception as e:
             logger.error(f"Error creating quote: {e}")
             return self._create_mock_quote(client_id, quote_data)
@@ -204,17 +444,18 @@ class SuperOpsAPI:
             return self._update_mock_contract(client_id, contract_data)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                contract_url = f"{self.base_url}/contracts/{contract_data.get('contract_id')}"
-                
-                async with session.put(contract_url, headers=self.headers, json=contract_data) as response:
-                    if response.status == 200:
-                        update_result = await response.json()
-                        logger.info(f"✅ Updated contract for client {client_id}")
-                        return update_result
-                    else:
-                        logger.error(f"Error updating contract: {response.status}")
-                        return self._update_mock_contract(client_id, contract_data)
+            session = await self.get_session()
+            contract_url = f"{self.base_url}/contracts/{contract_data.get('contract_id')}"
+            
+            async with session.put(contract_url, headers=self.headers, json=contract_data) as response:
+                if response.status == 200:
+                    update_result = await response.json()
+                    self.invalidate_client(client_id)
+                    logger.info(f"✅ Updated contract for client {client_id}")
+                    return update_result
+                else:
+                    logger.error(f"Error updating contract: {response.status}")
+                    return self._update_mock_contract(client_id, contract_data)
         except Exception as e:
             logger.error(f"Error updating contract: {e}")
             return self._update_mock_contract(client_id, contract_data)
@@ -222,41 +463,27 @@ class SuperOpsAPI:
     async def get_financial_dashboard_data(self) -> Dict[str, Any]:
         """
         Get comprehensive financial dashboard data
+        Built from the most recent enriched client snapshot, however it was produced (full load, sync store or
+        webhook patch). A snapshot up to DASHBOARD_MAX_AGE seconds old is used as is, so a dashboard hit never
+        enriches the tenant itself; only a cold start or an older snapshot waits for the shared client load.
+        The payload only changes with the data; how old the snapshot is comes from `dashboard_freshness`.
         """
         if not self.api_available:
             return self._get_mock_dashboard_data()
         
         try:
-            # Get all clients
-            clients = await self.get_all_clients()
-            
-            # Calculate totals
-            total_revenue = sum(client.get('monthly_revenue', 0) for client in clients)
-            total_costs = sum(client.get('monthly_cost', 0) for client in clients)
-            total_margin = total_revenue - total_costs
-            
-            # Get recent tickets count
-            total_tickets = sum(client.get('tickets_last_month', 0) for client in clients)
+            latest = self.cache.latest(('clients',))
+            if latest is None or latest[1] > DASHBOARD_MAX_AGE:
+                # Joins the load get_all_clients would start (or already has in flight) instead of adding another
+                clients = await self.cache.get(('clients',), self._fetch_all_clients, CACHE_TTLS['clients'])
+            else:
+                clients = latest[0]
             
-            # Get license waste data
-            total_license_waste = 0
-            for client in clients:
-                license_data = client.get('licenses', {})
-                for license_type, data in license_data.items():
-                    unused = data.get('total', 0) - data.get('used', 0)
-                    total_license_waste += unused * data.get('cost_per_license', 0)
+            # Snapshots are replaced, never mutated, so the reduction is reused until the next one arrives
+            if self._dashboard is None or self._dashboard[0] is not clients:
+                self._dashboard = (clients, await asyncio.to_thread(self.dashboard_summary, clients))
             
-            dashboard_data = {
-                'total_clients': len(clients),
-                'total_monthly_revenue': total_revenue,
-                'total_monthly_costs': total_costs,
-                'total_margin': total_margin,
-                'margin_percentage': round((total_margin / total_revenue) * 100, 1) if total_revenue > 0 else 0,
-                'total_tickets_last_month': total_tickets,
-                'total_license_waste_monthly': total_license_waste,
-                'unprofitable_clients': [c for c in clients if c.get('margin', 0) < 0],
-                'last_updated': datetime.now().isoformat()
-            }
+            dashboard_data = dict(self._dashboard[1])
             
             logger.info("✅ Generated financial dashboard data from SuperOps")
             return dashboard_data
@@ -265,24 +492,147 @@ class SuperOpsAPI:
             logger.error(f"Error generating dashboard data: {e}")
             return self._get_mock_dashboard_data()
     
-    async def _enrich_client_data(self, session: aiohttp.ClientSession, client: Dict[str, Any]) -> Dict[str, Any]:
-        """Enrich client data with financial metrics"""
-        client_id = client.get('id')
+    def dashboard_freshness(self) -> Dict[str, Any]:
+        """Age of the client snapshot behind the dashboard, kept out of its payload so unchanged data stays equal"""
+        latest = self.cache.latest(('clients',)) if self.api_available else None
+        if latest is None:
+            return {'snapshot_age_seconds': None, 'last_updated': None}
+        age = latest[1]
+        return {
+            'snapshot_age_seconds': round(age, 1),
+            'last_updated': (datetime.now() - timedelta(seconds=age)).isoformat()
+        }
+    
+    @staticmethod
+    def dashboard_summary(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Portfolio totals over enriched clients as column reductions; unprofitable clients as summaries only"""
+        frame = ClientFrame.from_records(clients)
+        total_revenue = frame.monthly_revenue.sum().item()
+        total_costs = frame.monthly_cost.sum().item()
+        total_margin = total_revenue - total_costs
+        unused = frame.license_total - frame.license_used
+        unprofitable = np.flatnonzero(frame.margin < 0)
         
-        # Get financial data
-        financial_data = await self._get_client_financial_metrics(session, client_id)
+        return {
+            'total_clients': len(frame),
+            'total_monthly_revenue': round(total_revenue, 2),
+            'total_monthly_costs': round(total_costs, 2),
+            'total_margin': round(total_margin, 2),
+            'margin_percentage': round((total_margin / total_revenue) * 100, 1) if total_revenue > 0 else 0,
+            'total_tickets_last_month': int(frame.tickets_last_month.sum()),
+            'total_license_waste_monthly': round((unused @ frame.license_cost).item(), 2),
+            'unprofitable_clients': [
+                {
+                    'id': frame.ids[row],
+                    'name': frame.names[row],
+                    'monthly_revenue': frame.monthly_revenue[row].item(),
+                    'margin': frame.margin[row].item()
+                }
+                for row in unprofitable.tolist()
+            ]
+        }
+    
+    async def _iter_pages(self, session: aiohttp.ClientSession, url: str,
+                          params: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield successive pages of a paginated SuperOps listing, raising on any non-200 response
+        The request for page n+1 is in flight while the caller consumes page n; closing the generator early
+        cancels it.
+        """
+        async def fetch(cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            page_params = {'limit': PAGE_SIZE, **params}
+            if cursor:
+                page_params['cursor'] = cursor
+            async with session.get(url, headers=self.headers, params=page_params) as response:
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+                payload = await response.json()
+            next_cursor = payload.get('next_cursor') or (payload.get('meta') or {}).get('next_cursor')
+            return payload.get('data', []), next_cursor
         
-        # Get tickets
-        tickets = await self._get_client_tickets(session, client_id)
+        pending: Optional[asyncio.Task] = asyncio.create_task(fetch(None))
+        try:
+            while pending is not None:
+                page, next_cursor = await pending
+                pending = asyncio.create_task(fetch(next_cursor)) if next_cursor else None
+                yield page
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    def _ticket_params(self, client_id: str, since: Optional[datetime]) -> Dict[str, Any]:
+        since = since or datetime.now() - timedelta(days=TICKET_WINDOW_DAYS)
+        return {'client_id': client_id, 'created_after': since.isoformat()}
+    
+    async def _fan_out_enrichment(self, session: aiohttp.ClientSession,
+                                  clients: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                                  concurrency: Optional[int] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Enrich clients with at most `concurrency` in flight, yielding (position, client) as each one completes
+        New clients are pulled from `clients` (a list or a paginated stream) only as earlier ones finish, so
+        memory stays bounded by the window rather than the tenant size; closing the generator early cancels
+        whatever is still in flight.
+        """
+        limit = max(1, concurrency or self.enrich_concurrency)
+        # Licenses come from one tenant-wide inventory pass, loaded alongside the first clients' enrichment
+        license_index = asyncio.ensure_future(self._license_index_for_enrichment())
+        source = clients if isinstance(clients, AsyncIterable) else self._as_async_iter(clients)
+        queued = source.__aiter__()
+        position = 0
+        exhausted = False
+        pending: Dict[asyncio.Task, int] = {}
+        try:
+            while True:
+                while not exhausted and len(pending) < limit:
+                    try:
+                        client = await queued.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending[asyncio.create_task(self._enrich_client_data(session, client, license_index))] = position
+                    position += 1
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield pending.pop(task), task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            license_index.cancel()
+            if hasattr(queued, 'aclose'):
+                await queued.aclose()
+    
+    @staticmethod
+    async def _as_async_iter(items: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        for item in items:
+            yield item
+    
+    async def _license_index_for_enrichment(self) -> Dict[str, Dict[str, Any]]:
+        """The license index, or an empty one when it cannot be loaded (clients then carry no license data)"""
+        try:
+            return await self.get_license_index()
+        except Exception as e:
+            logger.error(f"Error loading license index: {e}")
+            return {}
+    
+    async def _enrich_client_data(self, session: aiohttp.ClientSession, client: Dict[str, Any],
+                                  license_index: "asyncio.Future[Dict[str, Dict[str, Any]]]") -> Dict[str, Any]:
+        """Enrich client data with financial metrics and tickets (fetched in parallel) and its license table"""
+        client_id = client.get('id')
         
-        # Get license data
-        license_data = await self._get_license_usage_data(client_id)
+        # Shielded: the index is shared by every client in the fan-out, so one cancellation must not stop it
+        financial_data, ticket_count, licenses_by_client = await asyncio.gather(
+            self._get_client_financial_metrics(session, client_id),
+            self._count_client_tickets(session, client_id),
+            asyncio.shield(license_index)
+        )
         
         return {
             **client,
             **financial_data,
-            'tickets_last_month': len(tickets),
-            'licenses': license_data,
+            'tickets_last_month': ticket_count,
+            'licenses': licenses_by_client.get(client_id, {}),
             'last_updated': datetime.now().isoformat()
         }
     
@@ -296,50 +646,50 @@ class SuperOpsAPI:
             async with session.get(contracts_url, headers=self.headers, params=params) as response:
                 if response.status == 200:
                     contracts_data = await response.json()
-                    contracts = contracts_data.get('data', [])
-                    
-                    # Calculate monthly revenue and costs
-                    monthly_revenue = sum(contract.get('monthly_amount', 0) for contract in contracts)
-                    
-                    # Get service costs (this would be calculated from actual service delivery)
-                    monthly_cost = monthly_revenue * 0.7  # Assume 70% cost ratio
-                    
-                    return {
-                        'monthly_revenue': monthly_revenue,
-                        'monthly_cost': monthly_cost,
-                        'margin': monthly_revenue - monthly_cost,
-                        'contract_value': sum(contract.get('total_value', 0) for contract in contracts),
-                        'services': [contract.get('service_name') for contract in contracts if contract.get('service_name')]
-                    }
+                    return self.financial_metrics(contracts_data.get('data', []))
         except Exception as e:
             logger.error(f"Error getting financial metrics: {e}")
         
+        return self.financial_metrics([])
+    
+    @staticmethod
+    def financial_metrics(contracts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Monthly revenue, cost and margin from a client's active contracts"""
+        # Calculate monthly revenue and costs
+        monthly_revenue = sum(contract.get('monthly_amount', 0) for contract in contracts)
+        
+        # Get service costs (this would be calculated from actual service delivery)
+        monthly_cost = monthly_revenue * 0.7  # Assume 70% cost ratio
+        
         return {
-            'monthly_revenue': 0,
-            'monthly_cost': 0,
-            'margin': 0,
-            'contract_value': 0,
-            'services': []
+            'monthly_revenue': monthly_revenue,
+            'monthly_cost': monthly_cost,
+            'margin': monthly_revenue - monthly_cost,
+            'contract_value': sum(contract.get('total_value', 0) for contract in contracts),
+            'services': [contract.get('service_name') for contract in contracts if contract.get('service_name')]
         }
     
     async def _get_client_tickets(self, session: aiohttp.ClientSession, client_id: str) -> List[Dict[str, Any]]:
-        """Get tickets for a client"""
+        """Get tickets for a client (every page)"""
+        tickets = []
         try:
-            tickets_url = f"{self.base_url}/tickets"
-            params = {
-                'client_id': client_id,
-                'created_after': (datetime.now() - timedelta(days=30)).isoformat(),
-                'limit': 100
-            }
-            
-            async with session.get(tickets_url, headers=self.headers, params=params) as response:
-                if response.status == 200:
-                    tickets_data = await response.json()
-                    return tickets_data.get('data', [])
+            async for page in self._iter_pages(session, f"{self.base_url}/tickets", self._ticket_params(client_id, None)):
+                tickets.extend(page)
         except Exception as e:
             logger.error(f"Error getting tickets: {e}")
         
-        return []
+        return tickets
+    
+    async def _count_client_tickets(self, session: aiohttp.ClientSession, client_id: str) -> int:
+        """Count a client's recent tickets page by page without keeping them"""
+        count = 0
+        try:
+            async for page in self._iter_pages(session, f"{self.base_url}/tickets", self._ticket_params(client_id, None)):
+                count += len(page)
+        except Exception as e:
+            logger.error(f"Error getting tickets: {e}")
+        
+        return count
     
     async def _get_client_contracts(self, session: aiohttp.ClientSession, client_id: str) -> List[Dict[str, Any]]:
         """Get contracts for a client"""
@@ -356,7 +706,8 @@ class SuperOpsAPI:
         
         return []
     
-    def _process_license_inventory(self, software_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def _process_license_inventory(software_items: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Process software inventory into license data"""
         license_data = {}
         
@@ -485,8 +836,10 @@ class SuperOpsAPI:
             'total_margin': total_revenue - total_costs,
             'margin_percentage': round(((total_revenue - total_costs) / total_revenue) * 100, 1),
             'total_tickets_last_month': sum(client['tickets_last_month'] for client in clients),
-            'unprofitable_clients': [c for c in clients if c['margin'] < 0],
-            'last_updated': datetime.now().isoformat()
+            'unprofitable_clients': [
+                {'id': c['id'], 'name': c['name'], 'monthly_revenue': c['monthly_revenue'], 'margin': c['margin']}
+                for c in clients if c['margin'] < 0
+            ]
         }
 
 
@@ -0,0 +1,456 @@
+"""
+SuperOps Stand-in
+Local aiohttp server serving the SuperOps REST endpoints the integration calls, with injected latency
+
+Run from src/backend to point the app at a synthetic tenant:
+    python -m superops_standin --clients 2000 --tickets 20 --latency 0.02 --port 8765
+then start the app with SUPEROPS_BASE_URL=http://127.0.0.1:8765 and any SUPEROPS_API_KEY / SUPEROPS_TENANT_ID.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+TABLES = ("clients", "contracts", "tickets", "inventory")
+# Object name used in webhook event types (`ticket.created`, ...)
+EVENT_OBJECTS = {"clients": "client", "contracts": "contract", "tickets": "ticket", "inventory": "inventory"}
+# Query parameters derived from the clock at request time; replay falls back to matching without them
+VOLATILE_PARAMS = ("created_after", "updated_since")
+# Request headers forwarded to a recorded upstream
+FORWARDED_HEADERS = ("Authorization", "X-Tenant-ID", "Content-Type")
+
+
+class ResponseRecording:
+    """
+    Captured responses keyed by method, path and query, saved as JSON lines
+    Lookups try the exact query first, then the query without VOLATILE_PARAMS, since a replayed client asks
+    for "the last 30 days" relative to a different now.
+    """
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self._exact: Dict[tuple, Dict[str, Any]] = {}
+        self._loose: Dict[tuple, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _key(method: str, path: str, query, loose: bool) -> Tuple[str, str, tuple]:
+        items = sorted((name, value) for name, value in query.items() if not (loose and name in VOLATILE_PARAMS))
+        return method.upper(), path, tuple(items)
+
+    def add(self, method: str, path: str, query, status: int, body: str):
+        entry = {"method": method.upper(), "path": path, "query": dict(query), "status": status, "body": body}
+        self.entries.append(entry)
+        self._exact[self._key(method, path, query, loose=False)] = entry
+        self._loose[self._key(method, path, query, loose=True)] = entry
+
+    def lookup(self, method: str, path: str, query) -> Optional[Dict[str, Any]]:
+        return (self._exact.get(self._key(method, path, query, loose=False))
+                or self._loose.get(self._key(method, path, query, loose=True)))
+
+    def save(self, path: str):
+        with open(path, "w") as handle:
+            for entry in self.entries:
+                handle.write(json.dumps(entry) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "ResponseRecording":
+        recording = cls()
+        with open(path) as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    recording.add(entry["method"], entry["path"], entry["query"], entry["status"], entry["body"])
+        return recording
+
+
+class SuperOpsStandIn:
+    """
+    Serves MOCK_CLIENTS-shaped portfolios as SuperOps clients, contracts, tickets and software inventory
+    Every request sleeps `latency` seconds before answering; request counts and the peak number of requests
+    in flight are recorded so callers can check how hard a client drives the API. Listings are paginated
+    (`limit`, opaque `cursor`, `next_cursor` in the response) like the real API, so callers that ignore the
+    cursor see only the first page. Every record carries `updated_at` (tickets also `created_at`) and the
+    listings accept `updated_since` / `created_after`; the mutation helpers move those timestamps forward so
+    incremental sync can be exercised, and `webhook_event` wraps a changed record as a SuperOps change event.
+
+    Faults can be injected to exercise client-side flow control: `rate_limit` answers requests beyond that
+    many per second with 429 and a Retry-After (fractional seconds until capacity frees up), `error_rate`
+    fails that fraction of the remaining requests with 502, and beyond `capacity` concurrent requests the
+    latency grows in proportion to the overload.
+
+    Responses can come from elsewhere: with `upstream` every request is proxied to that base URL (e.g. the
+    real SuperOps API), and with `replay` they are served from a ResponseRecording. `record_path` saves every
+    response served (synthetic, proxied or replayed) on stop, so a captured session can be replayed later
+    with the same latency and fault settings.
+    """
+
+    def __init__(self, clients: Optional[Dict[str, Dict[str, Any]]] = None, latency: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, capacity: Optional[int] = None,
+                 seed: Optional[int] = None, upstream: Optional[str] = None,
+                 replay: Optional[ResponseRecording] = None, record_path: Optional[str] = None):
+        self.clients = clients if clients is not None else {}
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.replay = replay
+        self.record_path = record_path
+        self.recording = ResponseRecording() if record_path else None
+        self._upstream_session: Optional[aiohttp.ClientSession] = None
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.capacity = capacity
+        self._rng = random.Random(seed)
+        self._tokens = rate_limit
+        self._refilled = time.monotonic()
+        self.requests: Counter = Counter()
+        self.rejections: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.base_url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+        # Seeded timestamps are fixed relative to start-up so that paging and time filters are stable
+        self.now = datetime.now()
+        self._clock = self.now
+
+        self._tables: Dict[str, Dict[str, Dict[str, Any]]] = {table: {} for table in TABLES}
+        self._by_client: Dict[str, Dict[str, List[str]]] = {table: {} for table in TABLES}
+        self._version = 0
+        self._views: Dict[tuple, tuple] = {}
+        self._events = 0
+        self._seed()
+
+        self.app = web.Application(middlewares=[self._track])
+        self.app.router.add_get("/clients", self._get_clients)
+        self.app.router.add_get("/clients/{client_id}", self._get_client)
+        self.app.router.add_get("/contracts", self._get_contracts)
+        self.app.router.add_get("/tickets", self._get_tickets)
+        self.app.router.add_get("/inventory/software", self._get_inventory)
+        self.app.router.add_route("*", "/{tail:.*}", self._not_found)
+
+    @web.middleware
+    async def _track(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        self.requests[resource.canonical if resource is not None else request.path] += 1
+        rejection = self._inject_fault()
+        if rejection is not None:
+            self.rejections[rejection.status] += 1
+            return rejection
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                overload = self.in_flight / self.capacity if self.capacity else 1.0
+                await asyncio.sleep(self.latency * max(1.0, overload))
+            if self.replay is not None:
+                response = self._replayed(request)
+            elif self.upstream is not None:
+                response = await self._proxy(request)
+            else:
+                response = await handler(request)
+            if self.recording is not None:
+                self.recording.add(request.method, request.path, request.query, response.status, response.text)
+            return response
+        finally:
+            self.in_flight -= 1
+
+    def _replayed(self, request: web.Request) -> web.Response:
+        entry = self.replay.lookup(request.method, request.path, request.query)
+        if entry is None:
+            return web.json_response({"error": "Not recorded"}, status=404)
+        return web.Response(status=entry["status"], text=entry["body"], content_type="application/json")
+
+    async def _proxy(self, request: web.Request) -> web.Response:
+        if self._upstream_session is None:
+            self._upstream_session = aiohttp.ClientSession()
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        async with self._upstream_session.request(request.method, f"{self.upstream}{request.path}",
+                                                  params=request.query, headers=headers,
+                                                  data=await request.read()) as upstream:
+            return web.Response(status=upstream.status, text=await upstream.text(), content_type="application/json")
+
+    def _inject_fault(self) -> Optional[web.Response]:
+        if self.rate_limit:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                retry_after = (1 - self._tokens) / self.rate_limit
+                return web.json_response({"error": "Rate limit exceeded"}, status=429,
+                                         headers={"Retry-After": f"{retry_after:.3f}"})
+            self._tokens -= 1
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return web.json_response({"error": "Bad gateway"}, status=502)
+        return None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL (an ephemeral port by default)"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{bound_host}:{bound_port}"
+        source = (f"replaying {len(self.replay)} responses" if self.replay is not None
+                  else f"proxying {self.upstream}" if self.upstream else f"serving {len(self.clients)} clients")
+        logger.info(f"✅ SuperOps stand-in {source} at {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._upstream_session is not None:
+            await self._upstream_session.close()
+            self._upstream_session = None
+        if self.recording is not None:
+            self.recording.save(self.record_path)
+            logger.info(f"💾 Recorded {len(self.recording)} responses to {self.record_path}")
+
+    def reset_stats(self):
+        self.requests.clear()
+        self.rejections.clear()
+        self.peak_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.requests),
+            "total_requests": sum(self.requests.values()),
+            "rejections": dict(self.rejections),
+            "peak_in_flight": self.peak_in_flight,
+            "latency_seconds": self.latency
+        }
+
+    # Data
+
+    def _seed(self):
+        # Spread seeded timestamps one second apart per client, as a real tenant's history would be
+        for position, (client_id, client) in enumerate(self.clients.items()):
+            seeded = (self.now - timedelta(days=1, seconds=position)).isoformat()
+            self._put("clients", client_id, self._client_record(client_id, client, seeded))
+            for contract in self._contract_records(client_id, client, seeded):
+                self._put("contracts", contract["id"], contract)
+            for item in self._inventory_records(client_id, client, seeded):
+                self._put("inventory", item["id"], item)
+            for i in range(client.get("tickets_last_month", 0)):
+                created_at = (self.now - timedelta(hours=i + 1, seconds=position)).isoformat()
+                self._put("tickets", f"ticket_{client_id}_{i}", self._ticket_record(client_id, i, created_at))
+
+    def _put(self, table: str, record_id: str, record: Dict[str, Any]):
+        if record_id not in self._tables[table]:
+            self._by_client[table].setdefault(record.get("client_id", record_id), []).append(record_id)
+        self._tables[table][record_id] = record
+        self._version += 1
+
+    def _tick(self) -> str:
+        """A timestamp strictly after every one handed out so far"""
+        self._clock = max(datetime.now(), self._clock + timedelta(microseconds=1))
+        return self._clock.isoformat()
+
+    @staticmethod
+    def _client_record(client_id: str, client: Dict[str, Any], updated_at: str) -> Dict[str, Any]:
+        return {"id": client_id, "name": client["name"], "security_incidents": client.get("security_incidents", 0),
+                "updated_at": updated_at}
+
+    @staticmethod
+    def _contract_records(client_id: str, client: Dict[str, Any], updated_at: str) -> List[Dict[str, Any]]:
+        services = client.get("services") or ["Managed Services"]
+        share = client["monthly_revenue"] / len(services)
+        return [
+            {
+                "id": f"contract_{client_id}_{i}",
+                "client_id": client_id,
+                "status": "active",
+                "service_name": service,
+                "monthly_amount": share,
+                "total_value": share * 12,
+                "updated_at": updated_at
+            }
+            for i, service in enumerate(services)
+        ]
+
+    @staticmethod
+    def _inventory_records(client_id: str, client: Dict[str, Any], updated_at: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": f"inventory_{client_id}_{name}",
+                "name": name,
+                "client_id": client_id,
+                "total_licenses": data["total"],
+                "used_licenses": data["used"],
+                "monthly_cost": data["total"] * data["cost_per_license"],
+                "updated_at": updated_at
+            }
+            for name, data in client.get("licenses", {}).items()
+        ]
+
+    @staticmethod
+    def _ticket_record(client_id: str, number: Any, created_at: str) -> Dict[str, Any]:
+        return {
+            "id": f"ticket_{client_id}_{number}",
+            "client_id": client_id,
+            "subject": f"Support Request {number}",
+            "status": "closed",
+            "created_at": created_at,
+            "updated_at": created_at
+        }
+
+    # Mutations (each moves `updated_at` forward on the records it touches)
+
+    def update_client(self, client_id: str, **fields):
+        self.clients[client_id].update(fields)
+        self._put("clients", client_id, self._client_record(client_id, self.clients[client_id], self._tick()))
+
+    def set_monthly_revenue(self, client_id: str, monthly_revenue: float):
+        client = self.clients[client_id]
+        client["monthly_revenue"] = monthly_revenue
+        for contract in self._contract_records(client_id, client, self._tick()):
+            self._put("contracts", contract["id"], contract)
+
+    def set_license_usage(self, client_id: str, name: str, used: int):
+        client = self.clients[client_id]
+        client["licenses"][name]["used"] = used
+        for item in self._inventory_records(client_id, client, self._tick()):
+            if item["name"] == name:
+                self._put("inventory", item["id"], item)
+
+    def add_ticket(self, client_id: str) -> str:
+        client = self.clients[client_id]
+        client["tickets_last_month"] = client.get("tickets_last_month", 0) + 1
+        ticket = self._ticket_record(client_id, f"new_{self._version}", self._tick())
+        self._put("tickets", ticket["id"], ticket)
+        return ticket["id"]
+
+    def delete_client(self, client_id: str):
+        """Remove a client and every record attached to it, as deleting it in SuperOps would"""
+        self.clients.pop(client_id)
+        for table, rows in self._tables.items():
+            for record_id in self._by_client[table].pop(client_id, []):
+                rows.pop(record_id, None)
+        self._version += 1
+
+    def records(self, table: str, client_id: str) -> List[Dict[str, Any]]:
+        """A client's current records in one table"""
+        return [self._tables[table][record_id] for record_id in self._by_client[table].get(client_id, [])]
+
+    def webhook_event(self, table: str, record: Dict[str, Any], action: str = "updated") -> Dict[str, Any]:
+        """The change event SuperOps would deliver for `record`"""
+        self._events += 1
+        return {
+            "event_id": f"evt_{self._events}",
+            "event_type": f"{EVENT_OBJECTS[table]}.{action}",
+            "occurred_at": self._tick(),
+            "data": record
+        }
+
+    # Listings
+
+    def _select(self, table: str, query) -> List[Dict[str, Any]]:
+        """Records matching the query filters; incremental queries are ordered by (timestamp, id)"""
+        client_id = query.get("client_id")
+        status = query.get("status")
+        since_field, since = ("created_at", query.get("created_after")) if query.get("created_after") \
+            else ("updated_at", query.get("updated_since"))
+        view_key = (table, client_id, status, since_field, since)
+        cached = self._views.get(view_key)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+
+        rows = self._tables[table]
+        ids = self._by_client[table].get(client_id, []) if client_id else rows.keys()
+        records = [rows[record_id] for record_id in ids]
+        if status:
+            records = [record for record in records if record.get("status") == status]
+        if since:
+            threshold = datetime.fromisoformat(since)
+            records = [record for record in records if datetime.fromisoformat(record[since_field]) > threshold]
+            records.sort(key=lambda record: (record[since_field], record["id"]))
+        if len(self._views) > 10_000:
+            self._views.clear()
+        self._views[view_key] = (self._version, records)
+        return records
+
+    @staticmethod
+    def _page(request: web.Request, records: List[Any]) -> Dict[str, Any]:
+        """One page of `records`; the cursor is the offset of the next page"""
+        limit = min(int(request.query.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.query.get("cursor", 0))
+        end = offset + limit
+        return {"data": records[offset:end], "next_cursor": str(end) if end < len(records) else None}
+
+    async def _get_clients(self, request: web.Request) -> web.Response:
+        return web.json_response(self._page(request, self._select("clients", request.query)))
+
+    async def _get_client(self, request: web.Request) -> web.Response:
+        client = self._tables["clients"].get(request.match_info["client_id"])
+        if client is None:
+            return web.json_response({"error": "Client not found"}, status=404)
+        return web.json_response(client)
+
+    async def _get_contracts(self, request: web.Request) -> web.Response:
+        return web.json_response(self._page(request, self._select("contracts", request.query)))
+
+    async def _get_tickets(self, request: web.Request) -> web.Response:
+        return web.json_response(self._page(request, self._select("tickets", request.query)))
+
+    async def _get_inventory(self, request: web.Request) -> web.Response:
+        return web.json_response(self._page(request, self._select("inventory", request.query)))
+
+    async def _not_found(self, request: web.Request) -> web.Response:
+        return web.json_response({"error": "Not found"}, status=404)
+
+
+async def serve(standin: SuperOpsStandIn, host: str, port: int):
+    await standin.start(host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic (or recorded) SuperOps tenant")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--tickets", type=int, default=None, help="tickets per client (default: random 0-60)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 502")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429s (0: none)")
+    parser.add_argument("--capacity", type=int, default=None, help="concurrent requests before latency grows")
+    parser.add_argument("--upstream", help="proxy every request to this base URL instead")
+    parser.add_argument("--record", help="save every response served to this file on exit")
+    parser.add_argument("--replay", help="serve the responses recorded in this file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    clients = None
+    if not args.upstream and not args.replay:
+        from benchmarks.synthetic import make_clients
+        clients = make_clients(args.clients, args.seed, tickets_per_client=args.tickets)
+    standin = SuperOpsStandIn(
+        clients, latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit,
+        capacity=args.capacity, seed=args.seed, upstream=args.upstream,
+        replay=ResponseRecording.load(args.replay) if args.replay else None, record_path=args.record
+    )
+    try:
+        asyncio.run(serve(standin, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+SuperOps Sync
+Watermark-based incremental sync of SuperOps clients, contracts, tickets and inventory into a local SQLite store
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import fast_json
+from superops_integration import SuperOpsAPI, superops_api, TICKET_WINDOW_DAYS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite file for the local copy; sync is disabled when unset
+SYNC_DB = os.getenv('SUPEROPS_SYNC_DB', '')
+SYNC_INTERVAL = float(os.getenv('SUPEROPS_SYNC_INTERVAL', '30'))
+# Each pull re-reads this far behind the watermark so records committed upstream with a slightly older
+# timestamp are not skipped; upserts make the overlap harmless
+WATERMARK_OVERLAP = float(os.getenv('SUPEROPS_SYNC_OVERLAP_SECONDS', '1'))
+# Sync reads whole tenant-wide listings, so it asks for larger pages than interactive calls
+SYNC_PAGE_SIZE = int(os.getenv('SUPEROPS_SYNC_PAGE_SIZE', '500'))
+# Seconds between full passes that drop local records deleted upstream (0 = never reconcile)
+RECONCILE_INTERVAL = float(os.getenv('SUPEROPS_SYNC_RECONCILE_SECONDS', '3600'))
+
+
+class SyncEntity:
+    """One synced listing: its endpoint, the watermark query parameter and the record field it filters on"""
+
+    def __init__(self, name: str, path: str, since_param: str, since_field: str):
+        self.name = name
+        self.path = path
+        self.since_param = since_param
+        self.since_field = since_field
+
+
+ENTITIES = (
+    SyncEntity('clients', '/clients', 'updated_since', 'updated_at'),
+    SyncEntity('contracts', '/contracts', 'updated_since', 'updated_at'),
+    SyncEntity('tickets', '/tickets', 'created_after', 'created_at'),
+    SyncEntity('inventory', '/inventory/software', 'updated_since', 'updated_at'),
+)
+
+
+class SyncStore:
+    """
+    SQLite copy of the synced entities (WAL journal, so analytics reads never wait on a sync write)
+    Every table keeps the raw record as JSON plus the columns the local queries filter on.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self.journal_mode = self._conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for entity in ENTITIES:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {entity.name} ("
+                    "id TEXT PRIMARY KEY, client_id TEXT, status TEXT, ts TEXT, data TEXT NOT NULL)"
+                )
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {entity.name}_client ON {entity.name} (client_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks ("
+                "entity TEXT PRIMARY KEY, watermark TEXT, synced_at TEXT, records INTEGER)"
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _record_id(entity: SyncEntity, record: Dict[str, Any]) -> str:
+        if record.get('id') is not None:
+            return str(record['id'])
+        # Inventory items without their own id are keyed by client and product
+        return f"{record.get('client_id')}:{record.get('name')}"
+
+    def apply(self, entity: SyncEntity, records: List[Dict[str, Any]]) -> Optional[str]:
+        """Upsert one page of records in a single transaction; returns the page's newest timestamp"""
+        rows = [
+            (
+                self._record_id(entity, record),
+                record.get('id') if entity.name == 'clients' else record.get('client_id'),
+                record.get('status'),
+                record.get(entity.since_field),
+                fast_json.dumps_str(record)
+            )
+            for record in records
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT INTO {entity.name} (id, client_id, status, ts, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET client_id=excluded.client_id, status=excluded.status, "
+                "ts=excluded.ts, data=excluded.data",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        stamps = [row[3] for row in rows if row[3]]
+        return max(stamps, key=datetime.fromisoformat) if stamps else None
+
+    def watermark(self, entity: SyncEntity) -> Optional[datetime]:
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM watermarks WHERE entity = ?", (entity.name,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def set_watermark(self, entity: SyncEntity, watermark: Optional[datetime], records: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watermarks (entity, watermark, synced_at, records) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(entity) DO UPDATE SET watermark=excluded.watermark, synced_at=excluded.synced_at, "
+                "records=excluded.records",
+                (entity.name, watermark.isoformat() if watermark else None, datetime.now().isoformat(), records)
+            )
+
+    def prune_tickets(self, cutoff: datetime) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM tickets WHERE ts <= ?", (cutoff.isoformat(),)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {entity.name: self._conn.execute(f"SELECT COUNT(*) FROM {entity.name}").fetchone()[0]
+                    for entity in ENTITIES}
+
+    def reconcile(self, entity: SyncEntity, listed_ids: Set[str], listed_until: Optional[datetime]) -> int:
+        """
+        Delete the rows a full upstream listing no longer contains; returns how many were deleted
+        Rows stamped after `listed_until` (the newest timestamp the listing saw) may have been written by a
+        webhook while the listing ran, so they are kept until the next reconciliation.
+        """
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, ts FROM {entity.name}").fetchall()
+            stale = [
+                (record_id,) for record_id, ts in rows
+                if record_id not in listed_ids and not self._is_newer(ts, listed_until)
+            ]
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"DELETE FROM {entity.name} WHERE id = ?", stale)
+            self._conn.execute("COMMIT")
+        return len(stale)
+
+    @staticmethod
+    def _is_newer(ts: Optional[str], cutoff: Optional[datetime]) -> bool:
+        if not ts or cutoff is None:
+            return False
+        try:
+            return datetime.fromisoformat(ts) > cutoff
+        except (TypeError, ValueError):
+            return False
+
+    def delete(self, entity: SyncEntity, record_ids: List[str]) -> int:
+        with self._lock:
+            return self._conn.executemany(
+                f"DELETE FROM {entity.name} WHERE id = ?", [(record_id,) for record_id in record_ids]
+            ).rowcount
+
+    def load_clients(self, ticket_cutoff: datetime,
+                     client_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Enriched clients (the shape SuperOpsAPI.get_all_clients returns) built from the local tables
+        With `client_ids`, only those clients are rebuilt (in the order given, skipping unknown ids).
+        """
+        if client_ids is None:
+            where, args = "", ()
+        else:
+            where = f"client_id IN ({', '.join('?' * len(client_ids))})"
+            args = tuple(client_ids)
+        with self._lock:
+            if client_ids is None:
+                clients = self._conn.execute("SELECT id, data FROM clients ORDER BY rowid").fetchall()
+            else:
+                found = dict(self._conn.execute(f"SELECT id, data FROM clients WHERE {where}", args).fetchall())
+                clients = [(client_id, found[client_id]) for client_id in client_ids if client_id in found]
+            contracts = self._conn.execute(
+                f"SELECT client_id, data FROM contracts WHERE status = 'active' {'AND ' + where if where else ''} "
+                "ORDER BY rowid", args
+            ).fetchall()
+            ticket_counts = dict(self._conn.execute(
+                f"SELECT client_id, COUNT(*) FROM tickets WHERE ts > ? {'AND ' + where if where else ''} "
+                "GROUP BY client_id", (ticket_cutoff.isoformat(), *args)
+            ).fetchall())
+            inventory = self._conn.execute(
+                f"SELECT client_id, data FROM inventory {'WHERE ' + where if where else ''} ORDER BY rowid", args
+            ).fetchall()
+
+        contracts_by_client: Dict[str, List[Dict[str, Any]]] = {}
+        for client_id, data in contracts:
+            contracts_by_client.setdefault(client_id, []).append(fast_json.loads(data))
+        inventory_by_client: Dict[str, List[Dict[str, Any]]] = {}
+        for client_id, data in inventory:
+            inventory_by_client.setdefault(client_id, []).append(fast_json.loads(data))
+
+        last_updated = datetime.now().isoformat()
+        return [
+            {
+                **fast_json.loads(data),
+                **SuperOpsAPI.financial_metrics(contracts_by_client.get(client_id, [])),
+                'tickets_last_month': ticket_counts.get(client_id, 0),
+                'licenses': SuperOpsAPI._process_license_inventory(inventory_by_client.get(client_id, [])),
+                'last_updated': last_updated
+            }
+            for client_id, data in clients
+        ]
+
+
+class SuperOpsSync:
+    """
+    Pulls only records changed since each entity's watermark and applies them to the local store
+    Once the first full pass has landed, SuperOpsAPI serves the client list from the store, so dashboard
+    reads no longer wait on SuperOps; a background task repeats the pull every `interval` seconds. Every
+    SQLite call runs in a worker thread, never on the event loop.
+    
+    Watermark pulls only see records that still exist, so deletions reach the store two ways: delete events
+    through the webhook receiver, and a full listing every `reconcile_interval` seconds that drops local
+    records SuperOps no longer returns. Without webhooks, a deleted record is served for up to one
+    reconcile interval; tickets are only reconciled inside the reporting window the store keeps.
+    """
+
+    def __init__(self, api: SuperOpsAPI, db_path: str = SYNC_DB, interval: float = SYNC_INTERVAL,
+                 overlap: float = WATERMARK_OVERLAP, reconcile_interval: float = RECONCILE_INTERVAL):
+        self.api = api
+        self.db_path = db_path
+        self.interval = interval
+        self.overlap = overlap
+        self.reconcile_interval = reconcile_interval
+        self.enabled = bool(db_path)
+        self.store: Optional[SyncStore] = None
+        self.ready = False
+        self.syncs = 0
+        self.sync_errors = 0
+        self.reconciliations = 0
+        self.last_sync: Dict[str, Any] = {}
+        # Record counts and watermarks as of the last pass, so status reads never touch SQLite
+        self.store_status: Dict[str, Any] = {}
+        self._reconciled_at = time.monotonic()
+        self._syncing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _open_store(self) -> SyncStore:
+        if self.store is None:
+            self.store = SyncStore(self.db_path)
+            logger.info(f"✅ SuperOps sync store at {self.db_path} (journal: {self.store.journal_mode})")
+        return self.store
+
+    def _since(self, entity: SyncEntity, watermark: Optional[datetime], full: bool) -> Optional[datetime]:
+        if watermark is not None and not full:
+            return watermark - timedelta(seconds=self.overlap)
+        if entity.name == 'tickets':
+            # Tickets only matter inside the reporting window; never pull the full history
+            return datetime.now() - timedelta(days=TICKET_WINDOW_DAYS)
+        return None
+
+    def _reconcile_due(self) -> bool:
+        return self.reconcile_interval > 0 and time.monotonic() - self._reconciled_at >= self.reconcile_interval
+
+    async def sync(self, full: Optional[bool] = None) -> Dict[str, int]:
+        """
+        One pass over every entity; returns the number of records pulled per entity
+        A full pass (`full=True`, or when the reconcile interval has elapsed) lists every record instead of
+        only the changed ones and deletes local records missing from the listing.
+        """
+        if self._syncing:
+            return {}
+        self._syncing = True
+        full = self._reconcile_due() if full is None else full
+        started = time.perf_counter()
+        try:
+            store = await asyncio.to_thread(self._open_store)
+            # Entities are independent listings, so their pulls run side by side
+            results = await asyncio.gather(*(self._sync_entity(entity, store, full) for entity in ENTITIES))
+            await asyncio.to_thread(store.prune_tickets, datetime.now() - timedelta(days=TICKET_WINDOW_DAYS))
+            self.store_status = await asyncio.to_thread(self._read_status, store)
+        finally:
+            self._syncing = False
+        pulled = {entity.name: records for entity, (records, _, _) in zip(ENTITIES, results)}
+        removed = {entity.name: deleted for entity, (_, _, deleted) in zip(ENTITIES, results)}
+        pages = sum(entity_pages for _, entity_pages, _ in results)
+
+        self.ready = True
+        self.syncs += 1
+        if full:
+            self.reconciliations += 1
+            self._reconciled_at = time.monotonic()
+        self.last_sync = {
+            'pulled': pulled,
+            'requests': pages,
+            'full': full,
+            'removed': removed,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'finished_at': datetime.now().isoformat()
+        }
+        if any(pulled.values()) or any(removed.values()):
+            self.api.cache.invalidate(('clients',))
+        return pulled
+
+    async def _sync_entity(self, entity: SyncEntity, store: SyncStore, full: bool = False) -> Tuple[int, int, int]:
+        """
+        Pull and apply one entity's changes; returns (records pulled, pages, records deleted)
+        The watermark only advances once every page has landed.
+        """
+        watermark = await asyncio.to_thread(store.watermark, entity)
+        since = self._since(entity, watermark, full)
+        params = {'limit': SYNC_PAGE_SIZE}
+        if since is not None:
+            params[entity.since_param] = since.isoformat()
+        listed_ids: Set[str] = set()
+        listed_until: Optional[datetime] = None
+        records = pages = 0
+        async for page in self.api.iter_pages(entity.path, params):
+            pages += 1
+            records += len(page)
+            newest = await asyncio.to_thread(store.apply, entity, page)
+            if full:
+                listed_ids.update(SyncStore._record_id(entity, record) for record in page)
+            if newest is not None:
+                newest = datetime.fromisoformat(newest)
+                listed_until = newest if listed_until is None else max(listed_until, newest)
+                watermark = newest if watermark is None else max(watermark, newest)
+        deleted = await asyncio.to_thread(store.reconcile, entity, listed_ids, listed_until) if full else 0
+        await asyncio.to_thread(store.set_watermark, entity, watermark, records)
+        return records, pages, deleted
+
+    @staticmethod
+    def _read_status(store: SyncStore) -> Dict[str, Any]:
+        watermarks = {}
+        for entity in ENTITIES:
+            watermark = store.watermark(entity)
+            watermarks[entity.name] = watermark.isoformat() if watermark else None
+        return {'records': store.counts(), 'watermarks': watermarks}
+
+    def load_clients(self, client_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._open_store().load_clients(datetime.now() - timedelta(days=TICKET_WINDOW_DAYS), client_ids)
+
+    def attach(self):
+        """Serve SuperOpsAPI's client list from the local store once it has synced"""
+        self.api.local_source = self
+
+    async def start(self):
+        """Attach to the API and start the periodic sync task (no-op unless SUPEROPS_SYNC_DB is set)"""
+        if not self.enabled or not self.api.api_available or self._task is not None:
+            return
+        self.attach()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                pulled = await self.sync()
+                logger.info(f"🔄 SuperOps sync pulled {sum(pulled.values())} changed records")
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error(f"SuperOps sync failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.api.local_source is self:
+            self.api.local_source = None
+        self.close()
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'enabled': self.enabled,
+            'ready': self.ready,
+            'syncs': self.syncs,
+            'sync_errors': self.sync_errors,
+            'reconciliations': self.reconciliations,
+            'interval_seconds': self.interval,
+            'reconcile_interval_seconds': self.reconcile_interval,
+            'last_sync': self.last_sync
+        }
+        if self.store is not None:
+            stats.update(self.store_status)
+        return stats
+
+
+# Global sync engine
+superops_sync = SuperOpsSync(superops_api)
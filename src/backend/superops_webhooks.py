@@ -0,0 +1,303 @@
+"""
+SuperOps Webhooks
+Validates SuperOps change events, queues them and applies them in micro-batches to the local client data
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Awaitable, Callable, Optional
+
+from superops_integration import SuperOpsAPI, superops_api
+from superops_sync import SuperOpsSync, superops_sync, ENTITIES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shared secret for the X-SuperOps-Signature HMAC; without it every delivery is refused
+WEBHOOK_SECRET = os.getenv('SUPEROPS_WEBHOOK_SECRET', '')
+# Local development only: accept unsigned deliveries when no secret is configured
+WEBHOOK_ALLOW_UNSIGNED = os.getenv('SUPEROPS_WEBHOOK_ALLOW_UNSIGNED', '').lower() in ('1', 'true', 'yes')
+# Events waiting to be applied; beyond this the receiver answers 503 and SuperOps redelivers later
+WEBHOOK_QUEUE_SIZE = int(os.getenv('SUPEROPS_WEBHOOK_QUEUE_SIZE', '10000'))
+# A batch closes at this many events or this many seconds after its first event, whichever comes first
+WEBHOOK_BATCH_SIZE = int(os.getenv('SUPEROPS_WEBHOOK_BATCH_SIZE', '500'))
+WEBHOOK_BATCH_WINDOW = float(os.getenv('SUPEROPS_WEBHOOK_BATCH_WINDOW', '0.05'))
+# Event ids remembered to drop redeliveries
+WEBHOOK_DEDUP_SIZE = 10000
+
+# Event object -> synced entity
+EVENT_ENTITIES = {'client': 'clients', 'contract': 'contracts', 'ticket': 'tickets', 'inventory': 'inventory'}
+EVENT_ACTIONS = ('created', 'updated', 'deleted')
+# Entity -> every realtime topic built from the client fields it feeds: contracts set revenue and margin
+# (financial, anomalies), tickets set support load and cost (all four), inventory sets license usage and waste
+ENTITY_TOPICS = {
+    'clients': ('financial', 'licenses', 'anomalies', 'upsells'),
+    'contracts': ('financial', 'anomalies'),
+    'tickets': ('financial', 'licenses', 'anomalies', 'upsells'),
+    'inventory': ('financial', 'licenses', 'anomalies')
+}
+
+# publish(topic, refreshed clients, removed client ids) republishes a realtime topic once those changes are
+# patched into the snapshot
+Publisher = Callable[[str, List[Dict[str, Any]], List[str]], Awaitable[None]]
+
+
+class WebhookEvent:
+    """One validated change event: which record changed, how, and the client it belongs to"""
+
+    __slots__ = ('event_id', 'entity', 'action', 'record', 'client_id')
+
+    def __init__(self, event_id: Optional[str], entity: str, action: str, record: Dict[str, Any], client_id: str):
+        self.event_id = event_id
+        self.entity = entity
+        self.action = action
+        self.record = record
+        self.client_id = client_id
+
+    @classmethod
+    def parse(cls, payload: Any, tenant_id: Optional[str] = None) -> "WebhookEvent":
+        if not isinstance(payload, dict):
+            raise ValueError("event must be an object")
+        event_type = payload.get('event_type')
+        if not isinstance(event_type, str) or event_type.count('.') != 1:
+            raise ValueError(f"invalid event_type: {event_type!r}")
+        kind, action = event_type.split('.')
+        if kind not in EVENT_ENTITIES or action not in EVENT_ACTIONS:
+            raise ValueError(f"unsupported event_type: {event_type}")
+        if tenant_id and payload.get('tenant_id') not in (None, tenant_id):
+            raise ValueError(f"event for another tenant: {payload.get('tenant_id')}")
+        record = payload.get('data')
+        if not isinstance(record, dict) or record.get('id') is None:
+            raise ValueError(f"{event_type} event without a data.id")
+        entity = EVENT_ENTITIES[kind]
+        client_id = record['id'] if entity == 'clients' else record.get('client_id')
+        if client_id is None:
+            raise ValueError(f"{event_type} event without a data.client_id")
+        return cls(payload.get('event_id'), entity, action, record, str(client_id))
+
+
+class WebhookProcessor:
+    """
+    Receives SuperOps change events and applies them in micro-batches
+    `submit` validates and enqueues, returning immediately. A single consumer task drains the queue a batch
+    at a time: records are written to the local sync store (when enabled), only the clients touched by the
+    batch are recomputed and patched into the cached client list, and each affected realtime topic is
+    republished once, which reaches subscribers as a sequenced delta of just those clients' rows.
+    """
+
+    def __init__(self, api: SuperOpsAPI, sync: Optional[SuperOpsSync] = None, secret: str = WEBHOOK_SECRET,
+                 queue_size: int = WEBHOOK_QUEUE_SIZE, batch_size: int = WEBHOOK_BATCH_SIZE,
+                 batch_window: float = WEBHOOK_BATCH_WINDOW, publish: Optional[Publisher] = None,
+                 allow_unsigned: bool = WEBHOOK_ALLOW_UNSIGNED):
+        self.api = api
+        self.sync = sync
+        self.secret = secret
+        self.allow_unsigned = allow_unsigned and not secret
+        if self.allow_unsigned:
+            logger.warning("⚠️ SuperOps webhook signatures are NOT verified (SUPEROPS_WEBHOOK_ALLOW_UNSIGNED); "
+                           "local development only")
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.publish = publish
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.counters = {
+            'received': 0,
+            'rejected': 0,
+            'duplicates': 0,
+            'overflowed': 0,
+            'applied': 0,
+            'batches': 0,
+            'clients_refreshed': 0,
+            'pushes': 0,
+            'apply_errors': 0
+        }
+        self.last_batch: Dict[str, Any] = {}
+
+    @property
+    def configured(self) -> bool:
+        """Whether deliveries can be authenticated at all: a secret is set, or unsigned ones are allowed"""
+        return bool(self.secret) or self.allow_unsigned
+
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """
+        Check `X-SuperOps-Signature: sha256=<hex HMAC of the raw body>`
+        Without a secret nothing verifies, unless unsigned deliveries were explicitly allowed.
+        """
+        if not self.secret:
+            return self.allow_unsigned
+        if not signature:
+            return False
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature.removeprefix('sha256='), expected)
+
+    def parse(self, payload: Any) -> List[WebhookEvent]:
+        """Validate a single event or an {"events": [...]} delivery; any invalid event rejects the delivery"""
+        items = payload.get('events') if isinstance(payload, dict) and 'events' in payload else [payload]
+        if not isinstance(items, list):
+            raise ValueError("events must be a list")
+        try:
+            return [WebhookEvent.parse(item, self.api.tenant_id) for item in items]
+        except ValueError:
+            self.counters['rejected'] += len(items)
+            raise
+
+    def submit(self, events: List[WebhookEvent]) -> int:
+        """
+        Queue validated events for the next batch; returns how many were new
+        Raises asyncio.QueueFull (nothing queued) when the delivery does not fit, so the sender can retry.
+        """
+        queue = self._ensure_running()
+        fresh = [event for event in events if not self._is_duplicate(event)]
+        if len(fresh) > self.queue_size - queue.qsize():
+            self.counters['overflowed'] += len(fresh)
+            for event in fresh:
+                self._seen.pop(event.event_id, None)
+            raise asyncio.QueueFull()
+        for event in fresh:
+            queue.put_nowait(event)
+        self.counters['received'] += len(events)
+        self.counters['duplicates'] += len(events) - len(fresh)
+        return len(fresh)
+
+    def _is_duplicate(self, event: WebhookEvent) -> bool:
+        """Ids are remembered from submission so in-flight redeliveries are dropped; a failed batch forgets them"""
+        if event.event_id is None:
+            return False
+        if event.event_id in self._seen:
+            return True
+        self._seen[event.event_id] = None
+        if len(self._seen) > WEBHOOK_DEDUP_SIZE:
+            self._seen.popitem(last=False)
+        return False
+
+    def _ensure_running(self) -> asyncio.Queue:
+        """The queue, with its consumer started on first use (or restarted on a new event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._consume(self._queue))
+        return self._queue
+
+    async def start(self):
+        self._ensure_running()
+
+    async def stop(self):
+        """Apply what is already queued, then stop the consumer"""
+        task, self._task = self._task, None
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            return
+        await self.drain()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def drain(self):
+        """Wait until every queued event has been applied"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                if queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            try:
+                await self.apply(batch)
+            except Exception as e:
+                self.counters['apply_errors'] += 1
+                logger.error(f"Error applying {len(batch)} SuperOps webhook events: {e}")
+                # Forget the batch's ids so SuperOps redeliveries are applied instead of dropped as duplicates
+                for event in batch:
+                    self._seen.pop(event.event_id, None)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def apply(self, batch: List[WebhookEvent]):
+        """Apply one batch: store writes, one recompute per dirty client, one push per affected topic"""
+        started = time.perf_counter()
+        # Later events for the same record supersede earlier ones within the batch
+        latest: Dict[tuple, WebhookEvent] = {}
+        for event in batch:
+            latest[(event.entity, str(event.record['id']))] = event
+
+        store = self.sync.store if self.sync is not None and self.sync.ready else None
+        if store is not None:
+            for entity in ENTITIES:
+                changes = [event for event in latest.values() if event.entity == entity.name]
+                upserts = [event.record for event in changes if event.action != 'deleted']
+                deletes = [str(event.record['id']) for event in changes if event.action == 'deleted']
+                if upserts:
+                    await asyncio.to_thread(store.apply, entity, upserts)
+                if deletes:
+                    await asyncio.to_thread(store.delete, entity, deletes)
+
+        dirty = list(dict.fromkeys(event.client_id for event in latest.values()))
+        client_events = [event for event in latest.values() if event.entity == 'clients']
+        removed = [event.client_id for event in client_events if event.action == 'deleted']
+        refreshed = await self.api.refresh_clients(
+            dirty,
+            inventory_changed=any(event.entity == 'inventory' for event in latest.values()),
+            client_records={event.client_id: event.record for event in client_events if event.action != 'deleted'},
+            removed=removed
+        )
+
+        if self.publish is not None and (refreshed or removed):
+            # A removed client is pushed too, so its rows leave the topics as delta removes
+            changed = {client['id']: client for client in refreshed}
+            changed.update((client_id, None) for client_id in removed)
+            topics: Dict[str, set] = {}
+            for event in latest.values():
+                if event.client_id in changed:
+                    for topic in ENTITY_TOPICS[event.entity]:
+                        topics.setdefault(topic, set()).add(event.client_id)
+            for topic, client_ids in topics.items():
+                await self.publish(topic,
+                                   [changed[client_id] for client_id in client_ids if changed[client_id] is not None],
+                                   [client_id for client_id in client_ids if changed[client_id] is None])
+                self.counters['pushes'] += 1
+
+        self.counters['applied'] += len(batch)
+        self.counters['batches'] += 1
+        self.counters['clients_refreshed'] += len(refreshed)
+        self.last_batch = {
+            'events': len(batch),
+            'dirty_clients': len(dirty),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters['batches']
+        return {
+            **self.counters,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'average_batch': round(self.counters['applied'] / batches, 1) if batches else 0,
+            'last_batch': self.last_batch,
+            'batch_size': self.batch_size,
+            'batch_window_seconds': self.batch_window,
+            'configured': self.configured,
+            'signature_required': not self.allow_unsigned
+        }
+
+
+# Global webhook processor
+superops_webhooks = WebhookProcessor(superops_api, superops_sync)
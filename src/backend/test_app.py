@@ -1,6 +1,18 @@
+import asyncio
+import json
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from app import app
+from response_cache import ResponseCache
+from anomaly_rules import AnomalyRuleSet
+from client_frame import ClientFrame
+from performance_scoreboard import performance_scoreboard
+from compute_pool import ComputePool, scenario_batch_task
+import digital_twin
+import fast_json
+from alerts_integration import AlertPriority
+from datetime import datetime
 
 client = TestClient(app)
 
@@ -28,6 +40,32 @@ def test_dashboard_overview():
     assert "client_count" in data
     assert "unprofitable_clients" in data
 
+def test_dashboard_overview_tracks_mutations():
+    """Test that overview totals and the data version follow client mutations"""
+    before = client.get("/dashboard/overview").json()
+    payload = {
+        "name": "Overview Probe",
+        "monthly_revenue": 2000,
+        "monthly_cost": 2500,
+        "contract_value": 24000,
+        "services": [],
+        "margin": -500
+    }
+    client_id = client.post("/clients", json=payload).json()["client_id"]
+    try:
+        during = client.get("/dashboard/overview").json()
+        assert during["data_version"] > before["data_version"]
+        assert during["total_monthly_revenue"] == before["total_monthly_revenue"] + 2000
+        assert during["client_count"] == before["client_count"] + 1
+        assert client_id in [c["id"] for c in during["unprofitable_clients"]]
+    finally:
+        client.delete(f"/clients/{client_id}")
+
+    after = client.get("/dashboard/overview").json()
+    assert after["total_monthly_revenue"] == before["total_monthly_revenue"]
+    assert after["unprofitable_clients"] == before["unprofitable_clients"]
+    assert after["data_version"] > during["data_version"]
+
 def test_client_profitability():
     """Test the client profitability endpoint"""
     response = client.get("/profitability/clients")
@@ -51,6 +89,120 @@ def test_license_optimization():
     assert "optimizations" in data
     assert "total_annual_savings" in data
 
+def test_profitability_cursor_pagination():
+    """Test walking /profitability/clients with a cursor yields every client once, in order"""
+    full = client.get("/profitability/clients").json()["clients"]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/profitability/clients", params=params).json()
+        assert page["count"] == len(page["clients"]) <= 2
+        seen.extend(page["clients"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == full
+
+def test_list_filters_and_projection():
+    """Test index-backed filters and fields= projection on the list endpoints"""
+    response = client.get("/clients", params={"risk_level": "high", "fields": "id,margin"})
+    assert response.status_code == 200
+    assert response.json()["clients"] == [{"id": "client_x", "margin": -500}]
+
+    response = client.get("/profitability/clients", params={"min_margin": 0, "fields": "id"})
+    margins = {c["id"]: c["margin"] for c in client.get("/profitability/clients").json()["clients"]}
+    ids = [c["id"] for c in response.json()["clients"]]
+    assert ids == sorted((i for i in margins if margins[i] >= 0), key=margins.get)
+
+    response = client.get("/licenses/optimization", params={"license_type": "Adobe Creative"})
+    assert {o["license_type"] for o in response.json()["optimizations"]} == {"Adobe Creative"}
+
+    assert client.get("/clients", params={"fields": "no_such_field"}).status_code == 400
+    assert client.get("/clients", params={"cursor": "not-a-cursor"}).status_code == 400
+    cursor = client.get("/clients", params={"limit": 1}).json()["next_cursor"]
+    assert client.get("/clients", params={"cursor": cursor, "risk_level": "low"}).status_code == 400
+
+def test_superops_clients_index_is_built_once_per_snapshot(monkeypatch):
+    """Test later pages of /superops/clients reuse the index built for the cached client snapshot"""
+    import app as app_module
+    snapshot = [{"id": f"client_{i}", "name": f"Client {i}", "monthly_revenue": 1000 + i, "monthly_cost": 900,
+                 "licenses": {}} for i in range(30)]
+
+    async def get_all_clients():
+        return snapshot
+    monkeypatch.setattr(app_module.superops_api, "get_all_clients", get_all_clients)
+    built = []
+    original = app_module.ClientFrame.from_records
+    monkeypatch.setattr(app_module.ClientFrame, "from_records", lambda records: built.append(1) or original(records))
+
+    first = client.get("/superops/clients", params={"limit": 10, "min_margin": 110}).json()
+    second = client.get("/superops/clients", params={"limit": 10, "min_margin": 110,
+                                                     "cursor": first["next_cursor"]}).json()
+    assert len(built) == 1
+    assert [c["id"] for c in first["clients"] + second["clients"]] == [f"client_{i}" for i in range(10, 30)]
+
+    snapshot = snapshot[:5]
+    assert client.get("/superops/clients", params={"limit": 10}).json()["count"] <= 5
+    assert len(built) == 2
+
+def test_analytics_conditional_get():
+    """Test analytics endpoints emit ETags, answer If-None-Match with 304 and change after mutations"""
+    first = client.get("/profitability/clients")
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+
+    cached = client.get("/profitability/clients", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client_id = client.post("/clients", json={
+        "name": "ETag Probe", "monthly_revenue": 100, "monthly_cost": 50,
+        "contract_value": 1200, "services": [], "margin": 50
+    }).json()["client_id"]
+    try:
+        changed = client.get("/profitability/clients", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+    finally:
+        client.delete(f"/clients/{client_id}")
+
+def test_analytics_cache_skips_error_bodies_and_unversioned_paths(monkeypatch):
+    """Test error payloads are never cached or 304'd, and the scoreboard is not cached under the client version"""
+    import app as app_module
+    monkeypatch.setattr(app_module, "get_portfolio_analysis", lambda: {"upsells": {"error": "analytics down"}})
+    failed = client.get("/upsell/opportunities", params={"probe": "error"})
+    assert failed.json() == {"error": "analytics down"}
+    assert "etag" not in failed.headers
+    monkeypatch.undo()
+
+    recovered = client.get("/upsell/opportunities", params={"probe": "error"})
+    assert "error" not in recovered.json() and "etag" in recovered.headers
+    assert "etag" not in client.get("/performance/scoreboard").headers
+
+def test_fast_json_encodes_enums_and_datetimes():
+    """Test both serializer backends encode Enum, datetime and numpy values alike"""
+    payload = {"priority": AlertPriority.CRITICAL, "at": datetime(2024, 1, 2, 3, 4, 5), "count": np.int64(3)}
+    expected = {"priority": "critical", "at": "2024-01-02T03:04:05", "count": 3}
+    previous = fast_json.backend
+    try:
+        for name in fast_json.BACKENDS:
+            fast_json.set_backend(name)
+            assert json.loads(fast_json.dumps(payload)) == expected
+    finally:
+        fast_json.set_backend(previous)
+    assert client.get("/health").headers["content-type"] == "application/json"
+
+def test_response_cache_lru_eviction():
+    """Test the response cache evicts least recently used entries when full"""
+    cache = ResponseCache(max_entries=2, max_bytes=1024)
+    cache.put("a", b"1", "application/json")
+    cache.put("b", b"2", "application/json")
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", b"3", "application/json")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
 def test_upsell_opportunities():
     """Test the upsell opportunities endpoint"""
     response = client.get("/upsell/opportunities")
@@ -64,6 +216,47 @@ def test_anomaly_detection():
     assert response.status_code == 200
     data = response.json()
     assert "anomalies" in data
+    assert set(data["rule_stats"]["per_rule"]) == {"low_margin", "high_support_load", "license_waste"}
+
+def test_custom_anomaly_rules():
+    """Test a custom rule set compiles, shares predicates and renders templates"""
+    rules = AnomalyRuleSet([
+        {"id": "busy", "when": {"tickets_last_month": {"ge": 40}}, "description": "{tickets_last_month} tickets"},
+        {"id": "busy_and_losing", "severity": "high",
+         "when": {"tickets_last_month": {"ge": 40}, "margin": {"lt": 0}}, "description": "losing {margin}"},
+        {"id": "idle_seats", "table": "licenses", "when": {"unused": {"between": [5, 10]}},
+         "description": "{license_name}: {unused} idle"}
+    ])
+    frame = ClientFrame.from_records([
+        {"id": "a", "name": "A", "monthly_revenue": 100, "monthly_cost": 300, "tickets_last_month": 45,
+         "licenses": {"antivirus": {"total": 20, "used": 12, "cost_per_license": 8}}},
+        {"id": "b", "name": "B", "monthly_revenue": 500, "monthly_cost": 100, "tickets_last_month": 50}
+    ])
+    result = rules.detect(frame)
+    assert [(a["type"], a["client_id"]) for a in result["anomalies"]] == [
+        ("busy", "a"), ("busy_and_losing", "a"), ("idle_seats", "a"), ("busy", "b")
+    ]
+    assert result["anomalies"][1]["description"] == "losing -200"
+    assert result["anomalies"][2]["description"] == "Antivirus: 8 idle"
+    assert result["rule_stats"]["per_rule"]["busy"]["hits"] == 2
+
+    with pytest.raises(ValueError):
+        AnomalyRuleSet([{"id": "bad", "when": {"no_such_column": {"lt": 1}}}])
+
+def test_alert_thresholds_fall_back_when_a_rule_file_omits_them(tmp_path, monkeypatch):
+    """Test a custom rule file without low_margin still yields the unprofitable-client alert threshold"""
+    import alerts_integration
+    from anomaly_rules import load_rules
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text("rules:\n  - id: busy\n    when: {tickets_last_month: {gt: 40}}\n")
+    monkeypatch.setattr(alerts_integration, "anomaly_rules", AnomalyRuleSet(load_rules(str(rules_file))))
+    manager = alerts_integration.AlertsManager()
+    assert manager.alert_rules["unprofitable_client"]["threshold"] == {"margin": 0}
+
+    monkeypatch.setattr(alerts_integration, "anomaly_rules", AnomalyRuleSet([
+        {"id": "low_margin", "when": {"margin": {"lt": -250}}}
+    ]))
+    assert alerts_integration.AlertsManager().alert_rules["unprofitable_client"]["threshold"] == {"margin": -250}
 
 def test_weekly_report():
     """Test the weekly report endpoint"""
@@ -74,6 +267,80 @@ def test_weekly_report():
     assert "key_metrics" in data
     assert "action_items" in data
 
+def test_weekly_report_matches_endpoint_views():
+    """Test that the weekly report and the individual endpoints share one analysis"""
+    report = client.get("/reports/weekly").json()
+    licenses = client.get("/licenses/optimization").json()
+    upsells = client.get("/upsell/opportunities").json()
+    anomalies = client.get("/anomalies/detect").json()["anomalies"]
+
+    assert report["key_metrics"]["potential_savings"] == licenses["total_annual_savings"]
+    assert report["key_metrics"]["upsell_potential"] == sum(
+        opp["total_potential_annual"] for opp in upsells["opportunities"]
+    )
+    high_priority = [a for a in report["action_items"] if a["priority"] == "high"]
+    assert len(high_priority) == len([a for a in anomalies if a["severity"] == "high"])
+
+def test_integer_amounts_render_as_integers():
+    """Test whole-dollar inputs come back as integers while fractional ones stay floats"""
+    licenses = client.get("/licenses/optimization").json()
+    row = licenses["optimizations"][0]
+    assert all(type(row[field]) is int for field in ("cost_per_license", "monthly_savings", "annual_savings"))
+    assert type(licenses["total_annual_savings"]) is int
+    upsell = client.get("/upsell/opportunities").json()["opportunities"][0]
+    assert type(upsell["current_monthly_revenue"]) is int
+
+    frame = ClientFrame.from_records([{"id": "a", "monthly_revenue": 1500, "monthly_cost": 999.5}])
+    assert frame.monthly_revenue.dtype == np.int64 and frame.monthly_cost.dtype == np.float64
+
+def test_weekly_report_with_superops_enabled(monkeypatch):
+    """Test the weekly report and dashboard read the SuperOps overview when the API is available"""
+    import app as app_module
+    snapshot = [{"id": "client_a", "name": "Client A", "monthly_revenue": 2000, "monthly_cost": 2500, "licenses": {}},
+                {"id": "client_b", "name": "Client B", "monthly_revenue": 3000, "monthly_cost": 1000, "licenses": {}}]
+
+    async def get_financial_dashboard_data():
+        return app_module.superops_api.dashboard_summary(snapshot)
+    monkeypatch.setattr(app_module.superops_api, "api_available", True)
+    monkeypatch.setattr(app_module.superops_api, "get_financial_dashboard_data", get_financial_dashboard_data)
+    monkeypatch.setattr(app_module.superops_api, "dashboard_freshness",
+                        lambda: {"snapshot_age_seconds": 12.5, "last_updated": None})
+
+    response = client.get("/reports/weekly")
+    assert response.status_code == 200
+    metrics = response.json()["key_metrics"]
+    assert metrics["total_revenue"] == 5000 and metrics["total_margin"] == 1500
+    assert metrics["at_risk_clients"] == 1
+    overview = client.get("/dashboard/overview")
+    assert overview.headers["X-Snapshot-Age"] == "12.5"
+    assert overview.json() == response.json()["overview"]
+
+def test_client_mutations_reach_analytics():
+    """Test that created, updated and deleted clients show up in the analytics routes"""
+    payload = {
+        "name": "Loss Leader LLC",
+        "monthly_revenue": 1000,
+        "monthly_cost": 1400,
+        "contract_value": 12000,
+        "services": ["IT Support"],
+        "margin": -400
+    }
+    client_id = client.post("/clients", json=payload).json()["client_id"]
+    try:
+        ids = [c["id"] for c in client.get("/profitability/clients").json()["clients"]]
+        assert client_id in ids
+        anomalies = client.get("/anomalies/detect").json()["anomalies"]
+        assert any(a["client_id"] == client_id and a["type"] == "low_margin" for a in anomalies)
+
+        client.put(f"/clients/{client_id}", json={"margin": 900})
+        clients = client.get("/profitability/clients").json()["clients"]
+        assert next(c for c in clients if c["id"] == client_id)["risk_level"] == "low"
+    finally:
+        client.delete(f"/clients/{client_id}")
+
+    ids = [c["id"] for c in client.get("/profitability/clients").json()["clients"]]
+    assert client_id not in ids
+
 def test_scenario_simulation_client_churn():
     """Test scenario simulation for client churn"""
     payload = {
@@ -118,6 +385,100 @@ def test_scenario_simulation_price_increase():
     assert "scenario" in data
     assert "churn_risk" in data
 
+def test_scenario_simulation_monte_carlo_is_reproducible():
+    """Test Monte Carlo mode returns ordered percentile bands and honors the seed"""
+    payload = {
+        "scenario_type": "price_increase",
+        "client_id": "client_z",
+        "parameters": {"percentage": 10, "mode": "monte_carlo", "trials": 50000, "seed": 42}
+    }
+    first = client.post("/scenario/simulate", json=payload).json()
+    second = client.post("/scenario/simulate", json=payload).json()
+
+    bands = first["monte_carlo"]
+    assert bands["trials"] == 50000
+    for metric in ("margin", "cashflow"):
+        assert bands[metric]["p5"] <= bands[metric]["p50"] <= bands[metric]["p95"]
+    assert bands["margin"] == second["monte_carlo"]["margin"]
+    assert bands["cashflow"] == second["monte_carlo"]["cashflow"]
+    # Deterministic point estimate is still returned alongside the bands
+    assert "annual_margin_improvement" in first
+
+def test_scenario_simulation_monte_carlo_rejects_bad_trials():
+    """Test Monte Carlo mode validates the trial count"""
+    payload = {
+        "scenario_type": "client_churn",
+        "client_id": "client_x",
+        "parameters": {"mode": "monte_carlo", "trials": 0}
+    }
+    response = client.post("/scenario/simulate", json=payload)
+    assert response.status_code == 400
+
+def test_scenario_batch_matches_single_simulation():
+    """Test the batch grid returns one matrix cell per (client, combination) matching /scenario/simulate"""
+    payload = {
+        "scenario_type": "price_increase",
+        "grid": {"percentage": [5, 10, 20]},
+        "clients": {"ids": ["client_y", "client_z"]}
+    }
+    response = client.post("/scenario/simulate/batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["client_ids"] == ["client_y", "client_z"]
+    assert data["grid"] == [[5], [10], [20]]
+    matrix = data["results"]["annual_margin_improvement"]
+    assert len(matrix) == 2 and len(matrix[0]) == 3
+
+    single = client.post("/scenario/simulate", json={
+        "scenario_type": "price_increase", "client_id": "client_z", "parameters": {"percentage": 20}
+    }).json()
+    assert matrix[1][2] == single["annual_margin_improvement"]
+
+def test_scenario_batch_streams_rows():
+    """Test the batch grid can stream NDJSON rows"""
+    payload = {
+        "scenario_type": "client_churn",
+        "grid": {"months": [1, 3, 6]},
+        "clients": {"risk_level": "high"},
+        "stream": True
+    }
+    response = client.post("/scenario/simulate/batch", json=payload)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "header"
+    assert [row["client_id"] for row in lines[1:]] == ["client_x"]
+    assert len(lines[1]["net_impact"]) == 3
+
+def test_compute_pool_workers_match_inline():
+    """Test a worker process reading shared client columns returns the same batch body as inline"""
+    frame = ClientFrame.from_records([
+        {"id": f"c{i}", "name": f"C{i}", "monthly_revenue": 1000 + i, "monthly_cost": 900} for i in range(50)
+    ])
+    combos = digital_twin.build_parameter_grid("price_increase", {"percentage": [5, 10]})
+    rows = np.arange(10, 40)
+    header = {"scenario": "price_increase"}
+
+    async def run(pool):
+        try:
+            body = await pool.run(scenario_batch_task, pool.share_frame(frame, 1), "price_increase", rows, combos, header)
+            scoreboard = await pool.run_service(performance_scoreboard, "get_overall_scoreboard")
+            return body, [c["client_id"] for c in scoreboard["scoreboard"]], pool.stats()
+        finally:
+            pool.shutdown()
+
+    inline_body, inline_ids, _ = asyncio.run(run(ComputePool(workers=0)))
+    worker_body, worker_ids, stats = asyncio.run(run(ComputePool(workers=1)))
+    assert worker_body == inline_body
+    assert json.loads(worker_body)["client_ids"][0] == "c10"
+    assert sorted(worker_ids) == sorted(inline_ids)
+    assert stats["mode"] == "processes" and stats["completed"] == 2
+
+def test_scenario_batch_rejects_unknown_parameters():
+    """Test the batch grid validates parameter names"""
+    payload = {"scenario_type": "price_increase", "grid": {"discount": [1, 2]}}
+    response = client.post("/scenario/simulate/batch", json=payload)
+    assert response.status_code == 400
+
 def test_scenario_simulation_invalid_client():
     """Test scenario simulation with invalid client"""
     payload = {
@@ -138,5 +499,72 @@ def test_scenario_simulation_invalid_type():
     response = client.post("/scenario/simulate", json=payload)
     assert response.status_code == 400
 
+def test_superops_webhook_accepts_validates_and_dedupes_events(monkeypatch):
+    """Test the webhook receiver checks signatures, validates events and drops redeliveries"""
+    import hashlib
+    import hmac
+    from app import superops_webhooks
+    event = {"event_id": "evt_app_1", "event_type": "ticket.created",
+             "data": {"id": "ticket_1", "client_id": "client_x", "created_at": "2024-01-01T00:00:00"}}
+
+    def post(payload, secret="s3cret"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return client.post("/superops/webhooks", content=body, headers={"X-SuperOps-Signature": signature})
+
+    monkeypatch.setattr(superops_webhooks, "secret", "")
+    monkeypatch.setattr(superops_webhooks, "allow_unsigned", False)
+    assert post(event).status_code == 503
+
+    monkeypatch.setattr(superops_webhooks, "secret", "s3cret")
+    assert client.post("/superops/webhooks", json=event).status_code == 401
+    assert post(event, secret="forged").status_code == 401
+    first = post({"events": [event]})
+    assert first.status_code == 202
+    assert first.json() == {"accepted": 1, "duplicates": 0}
+    assert post(event).json() == {"accepted": 0, "duplicates": 1}
+
+    invalid = post({"event_type": "ticket.created", "data": {"id": "t"}})
+    assert invalid.status_code == 400
+    assert post(b"not json").status_code == 400
+    assert "webhooks" in client.get("/superops/status").json()
+
+def test_realtime_service_runs_with_the_app():
+    """Test startup runs the realtime updater and WebSocket clients can resync its topic snapshots"""
+    import time
+    with TestClient(app) as live:
+        deadline = time.monotonic() + 10
+        while live.get("/realtime/status").json()["service_stats"]["updates"]["cycles"] < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        with live.websocket_connect("/ws") as websocket:
+            websocket.send_text(json.dumps({"type": "subscribe", "subscriptions": ["licenses"]}))
+            assert websocket.receive_json()["type"] == "subscription_updated"
+            websocket.send_text(json.dumps({"type": "resync"}))
+            frame = websocket.receive_json()
+            assert (frame["topic"], frame["snapshot"]) == ("licenses", True)
+            assert "optimizations" in frame["data"]
+        assert live.get("/realtime/status").json()["service_stats"]["updates"]["running"]
+    assert not client.get("/realtime/status").json()["service_stats"]["updates"]["running"]
+
+def test_superops_status_reports_connection_pool():
+    """Test SuperOps status exposes connection pool reuse counters"""
+    response = client.get("/superops/status")
+    assert response.status_code == 200
+    pool = response.json()["connection_pool"]
+    assert {"requests", "connections_created", "connections_reused", "reuse_ratio"} <= set(pool)
+
+def test_superops_status_reports_read_through_cache():
+    """Test SuperOps status exposes read-through cache counters"""
+    response = client.get("/superops/status")
+    assert response.status_code == 200
+    assert {"hits", "misses", "coalesced", "stale_hits"} <= set(response.json()["cache"])
+
+def test_superops_status_reports_flow_control():
+    """Test SuperOps status exposes request flow control counters"""
+    response = client.get("/superops/status")
+    assert response.status_code == 200
+    assert {"requests", "retries", "throttled", "concurrency"} <= set(response.json()["flow_control"])
+
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
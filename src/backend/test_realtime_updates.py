@@ -0,0 +1,417 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi.websockets import WebSocketState
+from realtime_updates import ConnectionManager, RealtimeDataService, UPDATE_STAGES
+
+
+def make_manager(stage_seconds=0.0, interval=0.02):
+    manager = ConnectionManager()
+    manager.update_interval = interval
+    manager.update_jitter = 0.5
+    calls = []
+
+    def stage(name):
+        async def run():
+            calls.append((name, asyncio.get_running_loop()))
+            await asyncio.sleep(stage_seconds)
+        return run
+
+    for name in UPDATE_STAGES.values():
+        setattr(manager, name, stage(name))
+    return manager, calls
+
+
+def test_updater_runs_on_the_application_loop_and_stops_cleanly():
+    """Test the updater runs every stage on the application loop and stops on request"""
+    async def scenario():
+        manager, calls = make_manager()
+        manager.start_background_updates()
+        manager.start_background_updates()
+        await asyncio.sleep(0.15)
+        task = manager.update_task
+        await manager.stop_background_updates()
+        return asyncio.get_running_loop(), manager, calls, task
+
+    loop, manager, calls, task = asyncio.run(scenario())
+
+    assert task.cancelled() and manager.update_task is None
+    assert manager.cycles >= 2
+    assert all(call_loop is loop for _, call_loop in calls)
+    # Every cycle runs the stages in order
+    assert [name for name, _ in calls[:4]] == list(UPDATE_STAGES.values())
+    stats = manager.get_update_stats()
+    assert not stats["running"]
+    assert set(stats["stages"]) == set(UPDATE_STAGES.values())
+    assert all(timing["runs"] >= 2 and timing["errors"] == 0 for timing in stats["stages"].values())
+
+
+def test_cycles_never_overlap_and_failed_stages_are_counted():
+    """Test a cycle requested mid-run is skipped and a failing stage is counted"""
+    async def scenario():
+        manager, calls = make_manager(stage_seconds=0.02)
+
+        async def broken():
+            raise RuntimeError("upstream down")
+        manager._update_license_data = broken
+
+        service = RealtimeDataService()
+        service.manager = manager
+        first = asyncio.ensure_future(service.trigger_manual_update())
+        await asyncio.sleep(0)
+        await service.trigger_manual_update("financial")
+        await first
+        return manager, service, service.get_service_stats()
+
+    manager, service, stats = asyncio.run(scenario())
+
+    assert service.update_count == 1 and manager.skipped_cycles == 1
+    stages = stats["updates"]["stages"]
+    assert stages["_update_license_data"]["errors"] == 1
+    assert stages["_update_financial_data"]["runs"] == 1
+    assert stages["_update_financial_data"]["last_ms"] >= 15
+
+
+def test_updater_restarts_after_an_unexpected_failure(monkeypatch):
+    """Test the updater restarts after a failure outside the stages"""
+    import realtime_updates
+    monkeypatch.setattr(realtime_updates, "UPDATER_RESTART_DELAY", 0)
+
+    async def scenario():
+        manager, calls = make_manager()
+        failures = []
+
+        async def flaky():
+            if not failures:
+                failures.append(1)
+                raise SystemError("bug outside a stage")
+            return await ConnectionManager.run_update(manager, "all")
+        manager._perform_background_update = flaky
+        manager.start_background_updates()
+        await asyncio.sleep(0.1)
+        await manager.stop_background_updates()
+        return manager
+
+    manager = asyncio.run(scenario())
+
+    assert manager.updater_restarts == 1 and manager.cycles >= 1
+
+
+class FakeSocket:
+    """Stands in for a Starlette WebSocket; `gate` (when set) holds every send until it opens"""
+
+    def __init__(self, delay=0.0, gate=None, fail=False):
+        self.client_state = WebSocketState.CONNECTED
+        self.delay = delay
+        self.gate = gate
+        self.fail = fail
+        self.received = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.fail:
+            raise ConnectionResetError("gone")
+        if self.gate is not None:
+            await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.received.append(message)
+
+    async def close(self, code=1000):
+        self.close_code = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+@pytest.fixture
+def connect():
+    """Connects a FakeSocket to `manager` (a fresh ConnectionManager by default); await it inside the test's loop"""
+    async def connect(topics, manager=None, **socket_options):
+        manager = manager or ConnectionManager()
+        socket = FakeSocket(**socket_options)
+        await manager.connect(socket, topics)
+        return manager, socket
+    return connect
+
+
+def test_broadcast_only_enqueues_so_a_slow_client_delays_nobody_else(connect):
+    """Test broadcast returns at enqueue speed and a slow socket holds up no other client"""
+    async def scenario():
+        manager, slow = await connect(["all"], delay=1.0)
+        fast = [(await connect(["all"], manager))[1] for _ in range(5)]
+        started = time.perf_counter()
+        for i in range(3):
+            await manager.broadcast(f"update {i}", "financial")
+        enqueue_seconds = time.perf_counter() - started
+        await asyncio.sleep(0.05)
+        stats = manager.get_connection_stats()["send_queues"]
+        for socket in [slow, *fast]:
+            manager.disconnect(socket)
+        return enqueue_seconds, slow, fast, stats
+
+    enqueue_seconds, slow, fast, stats = asyncio.run(scenario())
+
+    assert enqueue_seconds < 0.05
+    assert all(socket.received == ["update 0", "update 1", "update 2"] for socket in fast)
+    assert slow.received == []
+    assert stats["enqueued"] == 18 and stats["sent"] == 15
+
+
+def run_blocked_client(connect, policy, messages):
+    async def scenario():
+        gate = asyncio.Event()
+        manager, socket = await connect(["all"], ConnectionManager(queue_size=3, policy=policy), gate=gate)
+        for message, topic in messages:
+            await manager.broadcast(message, topic)
+        stats = dict(manager.send_counters)
+        connected = socket in manager.active_connections
+        gate.set()
+        await asyncio.sleep(0.01)
+        manager.disconnect(socket)
+        return socket, stats, connected
+
+    return asyncio.run(scenario())
+
+
+BURST = [("f1", "financial"), ("l1", "licenses"), ("f2", "financial"), ("f3", "financial"),
+         ("f4", "financial"), ("l2", "licenses")]
+
+
+def test_drop_oldest_keeps_the_newest_frames(connect):
+    """Test drop_oldest discards the oldest queued frames once the queue is full"""
+    socket, stats, connected = run_blocked_client(connect, "drop_oldest", BURST)
+    assert socket.received == ["f3", "f4", "l2"]
+    assert stats["dropped"] == 3 and connected
+
+
+def test_coalesce_keeps_the_latest_frame_per_topic(connect):
+    """Test coalesce replaces queued frames with the latest one for the same topic"""
+    socket, stats, connected = run_blocked_client(connect, "coalesce", BURST)
+    # f1 and f2 give way to f3, then l1 to l2; f3 and f4 both fit without pressure
+    assert socket.received == ["f3", "f4", "l2"]
+    assert stats["coalesced"] == 3 and stats["dropped"] == 0 and connected
+
+
+def test_disconnect_policy_closes_a_client_that_falls_behind(connect):
+    """Test the disconnect policy closes a client whose queue overflows"""
+    socket, stats, connected = run_blocked_client(connect, "disconnect", BURST)
+    assert not connected and socket.close_code == 1013
+    assert stats["slow_disconnects"] == 1
+
+
+def test_failed_send_drops_the_connection(connect):
+    """Test a socket that fails to send is removed along with its channel"""
+    async def scenario():
+        manager, socket = await connect(["financial"], fail=True)
+        await manager.broadcast("update", "financial")
+        await asyncio.sleep(0.01)
+        return manager
+
+    manager = asyncio.run(scenario())
+
+    assert manager.active_connections == [] and manager.channels == {}
+    assert manager.send_counters["send_errors"] == 1
+
+
+def test_publish_encodes_once_and_reaches_only_the_topic_subscribers(connect):
+    """Test publish encodes each message once and delivers it only to subscribers of its topic"""
+    async def scenario():
+        manager, licenses = await connect(["licenses"])
+        _, financial = await connect(["financial"], manager)
+        _, both = await connect(["licenses", "all"], manager)
+        _, everything = await connect(["all"], manager)
+        await manager.publish({"type": "license_update"}, "licenses")
+        await asyncio.sleep(0.01)
+        manager.update_subscription(financial, ["licenses"])
+        manager.disconnect(licenses)
+        await manager.publish({"type": "license_update", "n": 2}, "licenses")
+        await asyncio.sleep(0.01)
+        frames = [socket.received for socket in (licenses, financial, both, everything)]
+        return manager, frames
+
+    manager, (licenses, financial, both, everything) = asyncio.run(scenario())
+
+    assert manager.frames_encoded == 2
+    assert len(licenses) == 1 and len(financial) == 1 and len(both) == 2 and len(everything) == 2
+    # Recipients share the one encoded frame
+    assert both[0] is everything[0] is licenses[0]
+    assert manager.get_connection_stats()["subscribers_per_topic"] == {"licenses": 2, "all": 2}
+
+
+def apply_delta(data, delta, rows_field):
+    """What a dashboard does with a delta frame"""
+    touched = {row[delta["key"]] for row in delta["upserts"]} | set(delta["removes"])
+    rows = [row for row in data[rows_field] if row[delta["key"]] not in touched] + delta["upserts"]
+    return {**data, **delta["fields"], rows_field: rows}
+
+
+def portfolio(count=40):
+    from benchmarks.synthetic import make_clients
+    return [{"id": client_id, **client} for client_id, client in make_clients(count).items()]
+
+
+def test_topics_stream_keyed_deltas_with_sequence_numbers(connect):
+    """Test a topic sends one snapshot, then keyed deltas, and nothing when the data is unchanged"""
+    async def scenario():
+        manager, socket = await connect(["licenses"])
+        clients = portfolio()
+        first = manager.license_optimization_data(clients)
+        await manager.publish_topic("licenses", first)
+
+        clients[3] = {**clients[3], "licenses": {"antivirus": {"total": 90, "used": 10, "cost_per_license": 8}}}
+        clients[5] = {**clients[5], "licenses": {}}
+        second = manager.license_optimization_data(clients)
+        seq = await manager.publish_topic("licenses", second)
+        unchanged = await manager.publish_topic("licenses", manager.license_optimization_data(clients))
+        await asyncio.sleep(0.01)
+        return manager, socket, first, second, seq, unchanged
+
+    manager, socket, first, second, seq, unchanged = asyncio.run(scenario())
+    snapshot, delta = [json.loads(frame) for frame in socket.received]
+
+    assert seq == 2 and unchanged is None
+    assert snapshot["snapshot"] and snapshot["seq"] == 1 and snapshot["data"] == first
+    assert delta["seq"] == 2 and "data" not in delta
+    assert [row["client_id"] for row in delta["delta"]["upserts"]] == ["client_3"]
+    assert delta["delta"]["removes"] == ["client_5"]
+    assert set(delta["delta"]["fields"]) == {"total_annual_savings"}
+    rebuilt = apply_delta(snapshot["data"], delta["delta"], "optimizations")
+    key = lambda row: row["client_id"]
+    assert sorted(rebuilt["optimizations"], key=key) == sorted(second["optimizations"], key=key)
+    assert rebuilt["total_annual_savings"] == second["total_annual_savings"]
+    assert len(socket.received[1]) < len(socket.received[0]) / 5
+
+
+def test_resync_sends_current_snapshots_for_subscribed_topics(connect):
+    """Test a resync sends the current snapshot of each subscribed topic only"""
+    async def scenario():
+        manager = ConnectionManager()
+        clients = portfolio()
+        await manager.publish_topic("licenses", manager.license_optimization_data(clients))
+        await manager.publish_topic("upsells", manager.upsell_data(clients))
+        clients[0] = {**clients[0], "tickets_last_month": 55}
+        await manager.publish_topic("upsells", manager.upsell_data(clients))
+        _, socket = await connect(["upsells"], manager)
+        await manager.send_snapshot(socket)
+        await asyncio.sleep(0.01)
+        return manager, socket
+
+    manager, socket = asyncio.run(scenario())
+    frames = [json.loads(frame) for frame in socket.received]
+
+    assert [(frame["topic"], frame["seq"], frame["snapshot"]) for frame in frames] == [("upsells", 2, True)]
+    assert frames[0]["data"] == manager.data_cache["upsell_opportunities"]
+    counters = manager.delta_counters
+    assert (counters["snapshots"], counters["deltas"], counters["resyncs"]) == (2, 1, 1)
+
+
+def test_fingerprints_rehash_only_changed_clients_and_catch_every_change():
+    """Test fingerprints rehash only the clients whose source records changed"""
+    async def scenario():
+        manager = ConnectionManager()
+        clients = portfolio()
+        await manager.publish_topic("upsells", manager.upsell_data(clients), manager.client_sources(clients))
+        first = manager.fingerprints["upsell_opportunities"]
+        unchanged = await manager.publish_topic("upsells", manager.upsell_data(clients),
+                                                manager.client_sources(clients))
+        reused = manager.delta_counters["rows_reused"]
+
+        clients[1] = {**clients[1], "tickets_last_month": 57, "security_incidents": 9}
+        seq = await manager.publish_topic("upsells", manager.upsell_data(clients), manager.client_sources(clients))
+        # No sources: every row is hashed, and an equal payload still reads as unchanged
+        again = await manager.publish_topic("upsells", manager.upsell_data(clients))
+        return manager, first, unchanged, reused, seq, again
+
+    manager, first, unchanged, reused, seq, again = asyncio.run(scenario())
+    latest = manager.fingerprints["upsell_opportunities"]
+
+    assert unchanged is None and reused == first.hashed > 0
+    assert seq == 2 and again is None
+    assert latest.root != first.root
+    assert [key for key in latest.group_hashes if first.group_hashes.get(key) != latest.group_hashes[key]] == \
+        ["client_1"]
+    assert manager.delta_counters["deltas"] == 1
+
+
+def test_refresh_topic_publishes_webhook_changes_as_a_sequenced_delta(monkeypatch, connect):
+    """Test refreshing a topic after a webhook change publishes only the changed client as a delta"""
+    from superops_integration import superops_api
+    clients = portfolio()
+
+    async def get_all_clients():
+        return clients
+    monkeypatch.setattr(superops_api, "get_all_clients", get_all_clients)
+
+    async def scenario():
+        nonlocal clients
+        manager, socket = await connect(["upsells"])
+        await manager.refresh_topic("upsells")
+        clients = [*clients[:2], {**clients[2], "tickets_last_month": 58, "security_incidents": 7}, *clients[3:]]
+        await manager.refresh_topic("upsells")
+        await asyncio.sleep(0.01)
+        return manager, socket
+
+    manager, socket = asyncio.run(scenario())
+    snapshot, delta = [json.loads(frame) for frame in socket.received]
+
+    assert (snapshot["seq"], snapshot["snapshot"]) == (1, True)
+    assert delta["seq"] == 2 and delta["topic"] == "upsells"
+    assert [row["client_id"] for row in delta["delta"]["upserts"]] == ["client_2"]
+    assert manager.delta_counters["rows_hashed"] == len(snapshot["data"]["opportunities"]) + 1
+
+
+def test_refresh_topic_lays_webhook_changes_over_the_snapshot(monkeypatch, connect):
+    """Test refresh_topic pushes the given changed and removed clients even if the snapshot lacks them"""
+    from superops_integration import superops_api
+    clients = portfolio()
+
+    async def get_all_clients():
+        return clients
+    monkeypatch.setattr(superops_api, "get_all_clients", get_all_clients)
+
+    async def scenario():
+        manager, socket = await connect(["licenses"])
+        await manager.refresh_topic("licenses")
+        changed = {**clients[4], "licenses": {"antivirus": {"total": 70, "used": 5, "cost_per_license": 8}}}
+        await manager.refresh_topic("licenses", [changed], ["client_6"])
+        await asyncio.sleep(0.01)
+        return socket
+
+    socket = asyncio.run(scenario())
+    snapshot, delta = [json.loads(frame) for frame in socket.received]
+
+    assert delta["seq"] == 2
+    assert [row["client_id"] for row in delta["delta"]["upserts"]] == ["client_4"]
+    assert delta["delta"]["removes"] == ["client_6"]
+
+
+def test_coalesced_deltas_are_replaced_by_a_fresh_snapshot(connect):
+    """Test coalescing a topic's deltas sends a fresh snapshot the client can rebuild from"""
+    async def scenario():
+        gate = asyncio.Event()
+        manager, socket = await connect(["licenses"], ConnectionManager(queue_size=3, policy="coalesce"), gate=gate)
+        clients = portfolio()
+        versions = []
+        for i in range(6):
+            clients[i] = {**clients[i], "licenses": {"antivirus": {"total": 50 + i, "used": 1, "cost_per_license": 8}}}
+            versions.append(manager.license_optimization_data(clients))
+            await manager.publish_topic("licenses", versions[-1], manager.client_sources(clients))
+        gate.set()
+        await asyncio.sleep(0.01)
+        return manager, socket, versions
+
+    manager, socket, versions = asyncio.run(scenario())
+    frames = [json.loads(frame) for frame in socket.received]
+
+    # Snapshot #1 and deltas 2-3 fill the queue; delta 4 finds it full and all four give way to snapshot #4
+    assert [(frame["seq"], frame.get("snapshot", False)) for frame in frames] == [(4, True), (5, False), (6, False)]
+    assert manager.send_counters["coalesced"] == 3 and manager.send_counters["resnapshots"] == 1
+    # Following the protocol, the client ends up with exactly the latest data
+    state = None
+    for frame in frames:
+        state = frame["data"] if frame.get("snapshot") else apply_delta(state, frame["delta"], "optimizations")
+    key = lambda row: row["client_id"]
+    assert sorted(state["optimizations"], key=key) == sorted(versions[-1]["optimizations"], key=key)
+    assert state["total_annual_savings"] == versions[-1]["total_annual_savings"]
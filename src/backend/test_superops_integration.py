@@ -0,0 +1,707 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+import superops_integration
+from superops_integration import SuperOpsAPI
+from superops_standin import SuperOpsStandIn, ResponseRecording
+from read_through_cache import ReadThroughCache
+from flow_control import AIMDLimiter, FlowControl, RetryPolicy, TokenBucket, parse_retry_after
+from superops_sync import SuperOpsSync
+from superops_webhooks import WebhookProcessor
+from benchmarks.synthetic import make_clients
+
+
+def run_against_standin(clients, latency, scenario, flow_control=None, **faults):
+    async def run():
+        standin = SuperOpsStandIn(clients, latency=latency, **faults)
+        api = SuperOpsAPI(base_url=await standin.start(), api_key="test", tenant_id="tenant",
+                          flow_control=flow_control)
+        try:
+            return await scenario(api, standin)
+        finally:
+            await api.close()
+            await standin.stop()
+    return asyncio.run(run())
+
+
+def test_enrichment_fan_out_is_bounded_and_ordered():
+    clients = make_clients(24)
+
+    async def scenario(api, standin):
+        api.enrich_concurrency = 4
+        return await api.get_all_clients(), standin.stats()
+
+    enriched, stats = run_against_standin(clients, 0.02, scenario)
+
+    assert [client["id"] for client in enriched] == list(clients)
+    for client in enriched:
+        source = clients[client["id"]]
+        assert client["tickets_last_month"] == source["tickets_last_month"]
+        assert client["monthly_revenue"] == source["monthly_revenue"]
+        assert set(client["licenses"]) == set(source["licenses"])
+    # Licenses come from one tenant-wide inventory page instead of a request per client
+    assert stats["requests"]["/inventory/software"] == 1
+    # Sub-requests run in parallel, but never more than three per client in the window
+    assert 4 <= stats["peak_in_flight"] <= 3 * 4
+
+
+def test_iter_all_clients_streams_before_enrichment_finishes():
+    clients = make_clients(20)
+
+    async def scenario(api, standin):
+        stream = api.iter_all_clients(concurrency=2)
+        first = await stream.__anext__()
+        served_at_first = standin.stats()["total_requests"]
+        rest = [client async for client in stream]
+        return first, served_at_first, rest
+
+    first, served_at_first, rest = run_against_standin(clients, 0.01, scenario)
+
+    assert served_at_first < 1 + 3 * len(clients)
+    assert {first["id"], *(client["id"] for client in rest)} == set(clients)
+
+
+def test_get_all_clients_falls_back_to_mock_on_upstream_error():
+    async def scenario(api, standin):
+        api.base_url += "/missing"
+        return await api.get_all_clients()
+
+    clients = run_against_standin(make_clients(3), 0, scenario)
+
+    assert [client["id"] for client in clients] == ["client_x", "client_y", "client_z"]
+
+
+def test_pooled_session_reuses_connections():
+    async def scenario(api, standin):
+        await api.start()
+        await api.get_all_clients()
+        for client_id in ("client_0", "client_1"):
+            await api.get_client_tickets(client_id)
+            await api.get_license_usage_data(client_id)
+        return api.connection_stats()
+
+    stats = run_against_standin(make_clients(100), 0.005, scenario)
+
+    assert stats["sessions_opened"] == 1
+    # Client page, contracts and tickets per client, one inventory page, then two ticket reads; the license
+    # reads are answered by the inventory index
+    assert stats["requests"] == 1 + 2 * 100 + 1 + 2
+    assert stats["connections_created"] <= 3 * 16
+    assert stats["connections_reused"] == stats["requests"] - stats["connections_created"]
+    assert stats["reuse_ratio"] > 0.8
+
+
+def test_iterators_follow_pagination_cursors():
+    clients = make_clients(250)
+    clients["client_0"]["tickets_last_month"] = 240
+
+    async def scenario(api, standin):
+        listed = [client["id"] async for client in api.iter_clients()]
+        tickets = [ticket async for ticket in api.iter_tickets("client_0")]
+        recent = [ticket async for ticket in api.iter_tickets("client_0", standin.now - timedelta(hours=10.5))]
+        enriched = await api.get_all_clients()
+        return listed, tickets, recent, enriched, standin.stats()["requests"]
+
+    listed, tickets, recent, enriched, requests = run_against_standin(clients, 0, scenario)
+
+    assert listed == list(clients)
+    assert len(tickets) == 240 and len({ticket["id"] for ticket in tickets}) == 240
+    assert len(recent) == 10
+    assert [client["id"] for client in enriched] == list(clients)
+    assert enriched[0]["tickets_last_month"] == 240
+    assert requests["/clients"] == 2 * 3
+
+
+def test_dashboard_totals_cover_all_pages():
+    clients = make_clients(150)
+
+    async def scenario(api, standin):
+        return await api.get_financial_dashboard_data(), await api.get_all_clients()
+
+    dashboard, enriched = run_against_standin(clients, 0, scenario)
+
+    assert dashboard["total_clients"] == 150
+    assert dashboard["total_monthly_revenue"] == pytest.approx(sum(c["monthly_revenue"] for c in enriched))
+    assert dashboard["total_tickets_last_month"] == sum(c["tickets_last_month"] for c in enriched)
+    expected_waste = sum((data["total"] - data["used"]) * data["cost_per_license"]
+                         for c in enriched for data in c["licenses"].values())
+    assert dashboard["total_license_waste_monthly"] == pytest.approx(expected_waste)
+
+
+def test_dashboard_is_built_from_the_snapshot_within_its_freshness_bound(monkeypatch):
+    monkeypatch.setattr(superops_integration, "DASHBOARD_MAX_AGE", 600)
+    now = [0.0]
+
+    async def scenario(api, standin):
+        api.cache.clock = lambda: now[0]
+        enriched = await api.get_all_clients()
+        standin.reset_stats()
+        # Past the cache TTL and stale window, but inside the dashboard bound
+        now[0] = 500
+        first = await api.get_financial_dashboard_data()
+        first_age = api.dashboard_freshness()["snapshot_age_seconds"]
+        now[0] = 520
+        second = await api.get_financial_dashboard_data()
+        served = standin.stats()["total_requests"]
+        now[0] = 700
+        reloaded = await api.get_financial_dashboard_data()
+        ages = (first_age, api.dashboard_freshness()["snapshot_age_seconds"])
+        return enriched, first, second, served, reloaded, standin.stats()["total_requests"], ages
+
+    enriched, first, second, served, reloaded, reload_requests, ages = run_against_standin(make_clients(60), 0,
+                                                                                           scenario)
+
+    assert served == 0
+    assert ages == (500, 0)
+    # Freshness lives outside the payload, so the same snapshot yields an equal dashboard (and realtime hash)
+    assert second == first and "last_updated" not in first
+    # The reduction is computed once per snapshot
+    assert second["unprofitable_clients"] is first["unprofitable_clients"]
+    assert reload_requests > 0
+    assert first["total_monthly_revenue"] == pytest.approx(sum(c["monthly_revenue"] for c in enriched))
+
+    losses = [dict(client, margin=-100.0) if i % 7 == 0 else client for i, client in enumerate(enriched)]
+    summary = SuperOpsAPI.dashboard_summary(losses)
+    assert [c["id"] for c in summary["unprofitable_clients"]] == [c["id"] for c in losses if c["margin"] < 0]
+    assert all(set(c) == {"id", "name", "monthly_revenue", "margin"} for c in summary["unprofitable_clients"])
+
+
+def test_concurrent_reads_share_one_upstream_fetch():
+    async def scenario(api, standin):
+        results = await asyncio.gather(*(api.get_all_clients() for _ in range(10)),
+                                       api.get_financial_dashboard_data())
+        cached = await api.get_all_clients()
+        return results, cached, standin.stats()["requests"], api.cache_stats()
+
+    results, cached, requests, stats = run_against_standin(make_clients(40), 0.01, scenario)
+
+    assert requests["/clients"] == 1 and requests["/contracts"] == 40
+    assert all(result is results[0] for result in results[:10]) and cached is results[0]
+    assert results[10]["total_clients"] == 40
+    # One miss for the client list and one for the license index it is enriched from
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (2, 10, 1)
+
+
+def test_stale_entries_are_served_while_one_refresh_runs():
+    now = [0.0]
+    loads = []
+
+    async def loader():
+        loads.append(now[0])
+        await asyncio.sleep(0.01)
+        return len(loads)
+
+    async def scenario():
+        cache = ReadThroughCache(ttl=10, stale_ttl=20, clock=lambda: now[0])
+        first = await cache.get("key", loader)
+        now[0] = 15.0
+        stale = await asyncio.gather(*(cache.get("key", loader) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        refreshed = await cache.get("key", loader)
+        now[0] = 100.0
+        expired = await cache.get("key", loader)
+        return first, stale, refreshed, expired, cache.stats()
+
+    first, stale, refreshed, expired, stats = asyncio.run(scenario())
+
+    assert (first, stale, refreshed, expired) == (1, [1] * 5, 2, 3)
+    assert (stats["stale_hits"], stats["refreshes"], stats["hits"], stats["misses"]) == (5, 1, 1, 2)
+
+
+def test_loader_errors_are_not_cached():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def scenario():
+        cache = ReadThroughCache(ttl=10)
+        with pytest.raises(RuntimeError):
+            await cache.get("key", flaky)
+        return await cache.get("key", flaky), cache.stats()
+
+    value, stats = asyncio.run(scenario())
+
+    assert value == "ok" and stats["load_errors"] == 1 and stats["misses"] == 2
+
+
+def test_incremental_sync_pulls_only_changed_records(tmp_path):
+    clients = make_clients(60)
+    license_name = next(iter(clients["client_7"]["licenses"]))
+    seeded_tickets = sum(client["tickets_last_month"] for client in clients.values())
+
+    async def scenario(api, standin):
+        # No watermark overlap, so every pull is exactly the set of records changed since the last one
+        sync = SuperOpsSync(api, str(tmp_path / "superops.db"), overlap=0)
+        initial = await sync.sync()
+        standin.reset_stats()
+        idle = await sync.sync()
+        idle_requests = standin.stats()["total_requests"]
+
+        standin.set_monthly_revenue("client_3", 9999)
+        standin.add_ticket("client_5")
+        standin.set_license_usage("client_7", license_name, 0)
+        standin.update_client("client_9", name="Renamed Client")
+        changed = await sync.sync()
+
+        local = sync.load_clients()
+        upstream = await api._fetch_all_clients()
+        journal_mode = sync.store.journal_mode
+        sync.close()
+        return initial, idle, idle_requests, changed, local, upstream, journal_mode
+
+    initial, idle, idle_requests, changed, local, upstream, journal_mode = run_against_standin(clients, 0, scenario)
+
+    assert journal_mode == "wal"
+    assert initial["clients"] == 60 and initial["tickets"] == seeded_tickets
+    assert idle == {"clients": 0, "contracts": 0, "tickets": 0, "inventory": 0} and idle_requests == 4
+    assert changed == {"clients": 1, "contracts": 2, "tickets": 1, "inventory": 1}
+
+    def comparable(client):
+        return {key: value for key, value in client.items() if key != "last_updated"}
+    assert [comparable(client) for client in local] == [comparable(client) for client in upstream]
+    by_id = {client["id"]: client for client in local}
+    assert by_id["client_3"]["monthly_revenue"] == pytest.approx(9999)
+    assert by_id["client_9"]["name"] == "Renamed Client"
+    assert by_id["client_7"]["licenses"][license_name]["used"] == 0
+
+
+def test_synced_store_serves_client_list_without_upstream_calls(tmp_path):
+    async def scenario(api, standin):
+        sync = SuperOpsSync(api, str(tmp_path / "superops.db"))
+        sync.attach()
+        await sync.sync()
+        standin.reset_stats()
+        clients = await api.get_all_clients()
+        dashboard = await api.get_financial_dashboard_data()
+        requests = standin.stats()["total_requests"]
+        await sync.stop()
+        return clients, dashboard, requests
+
+    clients, dashboard, requests = run_against_standin(make_clients(30), 0.01, scenario)
+
+    assert len(clients) == 30 and dashboard["total_clients"] == 30
+    assert requests == 0
+
+
+def test_full_sync_reconciles_records_deleted_upstream(tmp_path):
+    async def scenario(api, standin):
+        sync = SuperOpsSync(api, str(tmp_path / "superops.db"), overlap=0, reconcile_interval=0)
+        await sync.sync()
+        standin.delete_client("client_4")
+        incremental = await sync.sync()
+        kept = len(sync.load_clients())
+        await sync.sync(full=True)
+        local = sync.load_clients()
+        stats = sync.stats()
+        sync.close()
+        return incremental, kept, local, stats
+
+    clients = make_clients(20)
+    deleted = dict(clients["client_4"])
+    incremental, kept, local, stats = run_against_standin(clients, 0, scenario)
+
+    # Watermark pulls cannot see a deletion; the full listing drops the client and its records
+    assert sum(incremental.values()) == 0 and kept == 20
+    assert [client["id"] for client in local] == [f"client_{i}" for i in range(20) if i != 4]
+    removed = stats["last_sync"]["removed"]
+    assert stats["last_sync"]["full"] and stats["reconciliations"] == 1
+    assert removed["clients"] == 1 and removed["contracts"] == len(deleted["services"])
+    assert removed["tickets"] == deleted["tickets_last_month"]
+    assert stats["records"]["clients"] == 19
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("0.25") == 0.25
+    assert parse_retry_after("Mon, 01 Jan 2024 12:00:05 GMT", now=now) == 5.0
+    assert parse_retry_after("Mon, 01 Jan 2024 11:00:00 GMT", now=now) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_aimd_grows_additively_and_halves_once_per_window():
+    now = [0.0]
+    limiter = AIMDLimiter(initial=8, maximum=16, latency_target=1.0, clock=lambda: now[0])
+
+    async def scenario():
+        started = []
+        for _ in range(8):
+            await limiter.acquire()
+            started.append(now[0])
+        # Every request of the window is throttled, but the window only halves once
+        for start in started:
+            limiter.release(start, overloaded=True)
+        assert limiter.limit == 4
+        now[0] += 0.1
+        for _ in range(8):
+            await limiter.acquire()
+            limiter.release(now[0])
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["decreases"] == 1
+    assert 5 < stats["limit"] < 6
+
+
+def test_aimd_limits_requests_in_flight():
+    limiter = AIMDLimiter(initial=3, maximum=3)
+    in_flight = peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        await limiter.acquire()
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        limiter.release(time.monotonic())
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(20)))
+
+    asyncio.run(run())
+
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+def test_token_bucket_caps_request_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(bucket.acquire() for _ in range(25)))
+        return time.perf_counter() - start
+
+    # The first five ride the burst; the other twenty wait for refills at 100/s
+    assert asyncio.run(run()) >= 0.18
+    assert bucket.waits == 20
+
+
+def test_flow_control_recovers_from_throttling_and_server_errors():
+    clients = make_clients(30)
+    flow_control = FlowControl(retry=RetryPolicy(max_attempts=6))
+
+    async def scenario(api, standin):
+        return await api.get_all_clients(), standin.stats()
+
+    enriched, stats = run_against_standin(clients, 0.005, scenario, flow_control=flow_control,
+                                          rate_limit=50, error_rate=0.1, seed=7)
+    control = flow_control.stats()
+
+    # Every client carries real upstream data despite the 429s and 502s along the way
+    assert [client["id"] for client in enriched] == list(clients)
+    for client in enriched:
+        source = clients[client["id"]]
+        assert client["monthly_revenue"] == source["monthly_revenue"]
+        assert client["tickets_last_month"] == source["tickets_last_month"]
+        assert set(client["licenses"]) == set(source["licenses"])
+    assert stats["rejections"].get(429, 0) > 0 and stats["rejections"].get(502, 0) > 0
+    assert control["throttled"] + control["server_errors"] == sum(stats["rejections"].values())
+    assert control["retry_after_honored"] > 0
+    assert control["concurrency"]["decreases"] > 0
+    assert control["gave_up"] == 0
+
+
+def test_flow_control_waits_out_retry_after_beyond_its_own_backoff_cap():
+    class Response:
+        def __init__(self, status, retry_after=None):
+            self.status = status
+            self.headers = {"Retry-After": retry_after} if retry_after else {}
+
+        def release(self):
+            pass
+
+    def run(retry_after, policy):
+        flow_control = FlowControl(retry=policy)
+        responses = [Response(429, retry_after), Response(200)]
+        request = type("Request", (), {"method": "GET", "headers": {"X-Tenant-ID": "tenant"}})()
+
+        async def handler(request):
+            return responses.pop(0)
+
+        async def scenario():
+            start = time.perf_counter()
+            response = await flow_control.middleware(request, handler)
+            return response.status, time.perf_counter() - start
+
+        status, elapsed = asyncio.run(scenario())
+        return status, elapsed, flow_control
+
+    # Our own backoff is capped at 10 ms, yet the server's 150 ms is waited in full
+    status, elapsed, flow_control = run("0.15", RetryPolicy(base_delay=0.001, max_delay=0.01))
+    stats = flow_control.stats()
+    assert status == 200 and elapsed >= 0.15
+    assert stats["retry_after_honored"] == 1 and stats["bucket_waited_seconds"] == 0
+    assert RetryPolicy(max_delay=10).delay(0, 60) >= 60
+
+    # Beyond the sanity cap the 429 is surfaced at once rather than retried early, and the tenant is not paused
+    status, elapsed, flow_control = run("60", RetryPolicy(max_delay=10, max_retry_after=30))
+    stats = flow_control.stats()
+    assert status == 429 and elapsed < 1
+    assert stats["retry_after_too_long"] == 1 and stats["retry_after_honored"] == 0 and stats["gave_up"] == 1
+    assert flow_control.bucket("tenant").paused_until == 0
+
+
+def test_paused_tenant_does_not_hold_concurrency_slots():
+    flow_control = FlowControl(limiter=AIMDLimiter(initial=1, maximum=1))
+    finished = []
+
+    async def handler(request):
+        finished.append(request.headers["X-Tenant-ID"])
+        return type("Response", (), {"status": 200, "headers": {}})()
+
+    async def scenario():
+        flow_control.bucket("paused").pause(0.2)
+        requests = [type("Request", (), {"method": "GET", "headers": {"X-Tenant-ID": tenant}})()
+                    for tenant in ("paused", "other")]
+        paused = asyncio.ensure_future(flow_control.middleware(requests[0], handler))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(flow_control.middleware(requests[1], handler), 0.1)
+        await paused
+
+    asyncio.run(scenario())
+
+    # The only slot was free for the other tenant while the paused one waited for its bucket
+    assert finished == ["other", "paused"]
+
+
+def test_flow_control_gives_up_after_max_attempts():
+    flow_control = FlowControl(retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+
+    async def scenario(api, standin):
+        return await api.get_client_financial_data("client_0"), standin.stats()
+
+    data, stats = run_against_standin(make_clients(1), 0, scenario, flow_control=flow_control, error_rate=1.0)
+
+    # After the last attempt the 502 surfaces and the caller falls back as before
+    assert stats["requests"]["/clients/{client_id}"] == 3
+    assert flow_control.stats()["gave_up"] == 1
+    assert data == {}
+
+
+def test_enrichment_joins_licenses_from_one_inventory_pass():
+    clients = make_clients(250)
+    items = sum(len(client["licenses"]) for client in clients.values())
+
+    async def scenario(api, standin):
+        enriched = await api.get_all_clients()
+        first_pass = standin.stats()["requests"]["/inventory/software"]
+        standin.reset_stats()
+        api.cache.invalidate(("clients",))
+        await api.get_all_clients()
+        licenses = await api.get_license_usage_data("client_5")
+        return enriched, first_pass, licenses, standin.stats()["requests"]
+
+    enriched, first_pass, licenses, requests = run_against_standin(clients, 0, scenario)
+
+    for client in enriched:
+        source = clients[client["id"]]["licenses"]
+        assert {name: data["used"] for name, data in client["licenses"].items()} == \
+            {name: data["used"] for name, data in source.items()}
+    assert first_pass == -(-items // 500) > 1
+    # The cached index serves the next refresh and single-client reads without touching the inventory
+    assert "/inventory/software" not in requests
+    assert licenses == enriched[5]["licenses"]
+
+
+def _webhook_processor(api, sync=None, **options):
+    pushes = []
+
+    async def publish(topic, clients, removed):
+        pushes.append((topic, sorted(client["id"] for client in clients), sorted(removed)))
+
+    return WebhookProcessor(api, sync, secret="s3cret", publish=publish, **options), pushes
+
+
+def test_webhooks_refresh_only_dirty_clients_from_the_store(tmp_path):
+    clients = make_clients(50)
+    license_name = next(iter(clients["client_5"]["licenses"]))
+
+    async def scenario(api, standin):
+        sync = SuperOpsSync(api, str(tmp_path / "superops.db"))
+        sync.attach()
+        await sync.sync()
+        before = await api.get_all_clients()
+        processor, pushes = _webhook_processor(api, sync, batch_window=0.01)
+
+        standin.set_monthly_revenue("client_3", 9999)
+        ticket_id = standin.add_ticket("client_4")
+        standin.set_license_usage("client_5", license_name, 0)
+        events = [standin.webhook_event("contracts", record) for record in standin.records("contracts", "client_3")]
+        events += [standin.webhook_event("tickets", record, "created")
+                   for record in standin.records("tickets", "client_4") if record["id"] == ticket_id]
+        events += [standin.webhook_event("inventory", record) for record in standin.records("inventory", "client_5")]
+        standin.reset_stats()
+
+        accepted = processor.submit(processor.parse({"events": events}))
+        redelivered = processor.submit(processor.parse(events[0]))
+        await processor.drain()
+        after = await api.get_all_clients()
+        await processor.stop()
+        await sync.stop()
+        return before, after, accepted, redelivered, pushes, processor.stats(), standin.stats()["total_requests"]
+
+    before, after, accepted, redelivered, pushes, stats, requests = run_against_standin(clients, 0, scenario)
+
+    by_id = {client["id"]: client for client in after}
+    assert by_id["client_3"]["monthly_revenue"] == pytest.approx(9999)
+    assert by_id["client_4"]["tickets_last_month"] == clients["client_4"]["tickets_last_month"]
+    assert by_id["client_5"]["licenses"][license_name]["used"] == 0
+    # Untouched clients are the very same objects; nothing was refetched upstream
+    assert all(a is b for a, b in zip(before, after) if a["id"] not in ("client_3", "client_4", "client_5"))
+    assert requests == 0
+    assert redelivered == 0 and stats["duplicates"] == 1 and stats["applied"] == accepted
+    assert stats["batches"] == 1 and stats["clients_refreshed"] == 3
+    # Each topic is pushed once, with every refreshed client whose change feeds it
+    assert sorted(pushes) == [("anomalies", ["client_3", "client_4", "client_5"], []),
+                              ("financial", ["client_3", "client_4", "client_5"], []),
+                              ("licenses", ["client_4", "client_5"], []),
+                              ("upsells", ["client_4"], [])]
+
+
+def test_webhooks_reenrich_dirty_clients_upstream_without_a_store():
+    clients = make_clients(40)
+
+    async def scenario(api, standin):
+        await api.get_all_clients()
+        processor, pushes = _webhook_processor(api, batch_window=0.01)
+        standin.set_monthly_revenue("client_8", 4321)
+        standin.update_client("client_9", name="Renamed Client")
+        events = [standin.webhook_event("contracts", record) for record in standin.records("contracts", "client_8")]
+        events += [standin.webhook_event("clients", record) for record in standin.records("clients", "client_9")]
+        standin.reset_stats()
+        processor.submit(processor.parse({"events": events}))
+        await processor.drain()
+        after = await api.get_all_clients()
+        await processor.stop()
+        return after, standin.stats()["requests"]
+
+    after, requests = run_against_standin(clients, 0, scenario)
+
+    by_id = {client["id"]: client for client in after}
+    assert [client["id"] for client in after] == list(clients)
+    assert by_id["client_8"]["monthly_revenue"] == pytest.approx(4321)
+    assert by_id["client_9"]["name"] == "Renamed Client"
+    # Contracts and tickets for the two dirty clients only; the license index is still cached
+    assert requests == {"/contracts": 2, "/tickets": 2}
+
+
+def test_webhook_deletions_are_pushed_as_removals():
+    clients = make_clients(20)
+
+    async def scenario(api, standin):
+        await api.get_all_clients()
+        processor, pushes = _webhook_processor(api, batch_window=0.01)
+        deleted = standin.records("clients", "client_7")
+        standin.delete_client("client_7")
+        processor.submit(processor.parse(standin.webhook_event("clients", deleted[0], "deleted")))
+        await processor.drain()
+        after = await api.get_all_clients()
+        await processor.stop()
+        return after, pushes
+
+    after, pushes = run_against_standin(clients, 0, scenario)
+
+    assert "client_7" not in {client["id"] for client in after}
+    assert sorted(pushes) == [(topic, [], ["client_7"]) for topic in ("anomalies", "financial", "licenses", "upsells")]
+
+
+def test_failed_webhook_batches_accept_redeliveries():
+    class FlakyAPI:
+        tenant_id = None
+        calls = 0
+
+        async def refresh_clients(self, client_ids, **changes):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("store unavailable")
+            return [{"id": client_id} for client_id in client_ids]
+
+    async def scenario():
+        processor = WebhookProcessor(FlakyAPI(), secret="s3cret", batch_window=0)
+        event = {"event_id": "evt_1", "event_type": "ticket.updated", "data": {"id": "t1", "client_id": "c1"}}
+        accepted = []
+        for _ in range(3):
+            accepted.append(processor.submit(processor.parse(event)))
+            await processor.drain()
+        await processor.stop()
+        return accepted, processor.stats()
+
+    accepted, stats = asyncio.run(scenario())
+
+    # The failed first attempt does not turn SuperOps' redelivery into a duplicate; once applied, it is one
+    assert accepted == [1, 1, 0]
+    assert stats["apply_errors"] == 1 and stats["applied"] == 1 and stats["duplicates"] == 1
+
+
+def test_webhook_events_are_validated():
+    processor = WebhookProcessor(SuperOpsAPI(api_key="key", tenant_id="tenant"), secret="s3cret")
+    body = b'{"event_type": "ticket.created"}'
+    signature = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+
+    assert processor.verify_signature(body, signature)
+    assert not processor.verify_signature(body, "sha256=" + "0" * 64)
+    assert not processor.verify_signature(body, None)
+    # No secret: nothing verifies unless unsigned deliveries are explicitly allowed for local development
+    api = processor.api
+    assert not WebhookProcessor(api, secret="").verify_signature(body, None)
+    assert not WebhookProcessor(api, secret="").configured
+    unsigned = WebhookProcessor(api, secret="", allow_unsigned=True)
+    assert unsigned.configured and unsigned.verify_signature(body, None)
+    assert not WebhookProcessor(api, secret="s3cret", allow_unsigned=True).verify_signature(body, None)
+    for payload in (
+        {"event_type": "ticket.created"},
+        {"event_type": "ticket.created", "data": {"id": "t1"}},
+        {"event_type": "invoice.created", "data": {"id": "i1", "client_id": "c1"}},
+        {"event_type": "ticket.created", "tenant_id": "other", "data": {"id": "t1", "client_id": "c1"}},
+        {"events": {"not": "a list"}},
+    ):
+        with pytest.raises(ValueError):
+            processor.parse(payload)
+    [event] = processor.parse({"event_type": "client.updated", "data": {"id": "c1", "name": "C"}})
+    assert (event.entity, event.action, event.client_id) == ("clients", "updated", "c1")
+
+
+def test_standin_replays_a_recorded_session(tmp_path):
+    record_path = str(tmp_path / "superops.jsonl")
+    clients = make_clients(30, tickets_per_client=5)
+
+    async def record():
+        standin = SuperOpsStandIn(clients, record_path=record_path)
+        api = SuperOpsAPI(base_url=await standin.start(), api_key="test", tenant_id="tenant")
+        try:
+            return await api.get_all_clients()
+        finally:
+            await api.close()
+            await standin.stop()
+
+    async def replay():
+        # No synthetic data at all: every response comes from the recording
+        standin = SuperOpsStandIn(replay=ResponseRecording.load(record_path), latency=0.001)
+        api = SuperOpsAPI(base_url=await standin.start(), api_key="test", tenant_id="tenant")
+        try:
+            return await api.get_all_clients(), await api.get_client_tickets("client_3"), standin.stats()
+        finally:
+            await api.close()
+            await standin.stop()
+
+    recorded = asyncio.run(record())
+    replayed, tickets, stats = asyncio.run(replay())
+
+    def comparable(client):
+        return {key: value for key, value in client.items() if key != "last_updated"}
+    assert all(client["tickets_last_month"] == 5 for client in recorded)
+    assert [comparable(client) for client in replayed] == [comparable(client) for client in recorded]
+    # Ticket windows are relative to now, so they match the recording without their timestamp
+    assert len(tickets) == 5
+    assert stats["total_requests"] == 1 + 2 * 30 + 1 + 1